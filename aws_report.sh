@@ -1,4 +1,10 @@
 #!/bin/bash
 
 pip3 install -r requirements.txt
+
+# Reuse CloudWatch datapoints fetched by earlier runs
+export METRICS_CACHE_PATH="${METRICS_CACHE_PATH:-reports/.metrics_cache.sqlite3}"
+# Reuse S3 bucket regions resolved by earlier runs
+export BUCKET_REGION_CACHE_PATH="${BUCKET_REGION_CACHE_PATH:-reports/.bucket_regions.sqlite3}"
+
 python3 -m src.core.aws.cost_manager
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional
+
+from src.core.aws.config import Config
+from src.core.aws.constants import BUCKET_REGION_CACHE_TTL_SECONDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket_regions (
+    bucket TEXT PRIMARY KEY,
+    region TEXT NOT NULL,
+    resolved_at INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class BucketRegionCache:
+    """
+    On-disk map of S3 bucket names to their home regions, backed by SQLite.
+
+    Bucket names are globally unique, so a region resolved once is reused by later runs
+    instead of another GetBucketLocation call. A name is only unique while its bucket
+    exists, though: once deleted it can be created again in another region. Entries are
+    therefore trusted for ttl seconds, and callers replace them whenever S3 reports a
+    different region.
+    """
+
+    def __init__(self, path: str, ttl: float = BUCKET_REGION_CACHE_TTL_SECONDS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._ttl = ttl
+        self._connection = sqlite3.connect(path)
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(bucket_regions)")]
+        if columns and "resolved_at" not in columns:
+            # Caches written before entries expired cannot tell how old they are
+            self._connection.execute("DROP TABLE bucket_regions")
+        self._connection.executescript(_SCHEMA)
+
+    def get_regions(self, buckets: Iterable[str]) -> Dict[str, str]:
+        """Return the cached region of every given bucket that has one that has not expired."""
+        buckets = list(buckets)
+        regions = {}
+        resolved_after = int(time.time() - self._ttl)
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(buckets), 500):
+            chunk = buckets[start : start + 500]
+            rows = self._connection.execute(
+                "SELECT bucket, region FROM bucket_regions "
+                f"WHERE resolved_at > ? AND bucket IN ({', '.join('?' * len(chunk))})",
+                [resolved_after, *chunk],
+            )
+            regions.update(rows)
+        return regions
+
+    def put_regions(self, regions: Dict[str, str]):
+        resolved_at = int(time.time())
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO bucket_regions (bucket, region, resolved_at) VALUES (?, ?, ?)",
+            [(bucket, region, resolved_at) for bucket, region in regions.items()],
+        )
+        self._connection.commit()
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+
+_shared_cache: Optional[BucketRegionCache] = None
+
+
+def get_bucket_region_cache() -> Optional[BucketRegionCache]:
+    """Return the process-wide bucket region cache, or None when no cache path is configured."""
+    global _shared_cache
+
+    if _shared_cache is None:
+        path = Config().get_bucket_region_cache_path
+        if path:
+            _shared_cache = BucketRegionCache(path)
+
+    return _shared_cache
@@ -1,8 +1,19 @@
 import os
 from dataclasses import dataclass
-from typing import List, Any
+from typing import Dict, List, Any, Optional
 
-from src.core.aws.constants import CONFIG_MAP
+from src.core.aws.constants import (
+    AWS_MAX_POOL_CONNECTIONS,
+    CONFIG_MAP,
+    DEFAULT_REPORT_FORMATS,
+    DEFAULT_SERVICE_TIMEOUT_SECONDS,
+    EBS_IDLE_IOPS_THRESHOLD,
+    MAX_CONCURRENT_ACCOUNT_SCANS,
+    MAX_CONCURRENT_REGIONS,
+    MAX_CONCURRENT_SERVICE_SCANS,
+    MAX_SCANS_PER_ACCOUNT,
+    S3_INVENTORY_PREFIX_DEPTH,
+)
 
 
 @dataclass
@@ -17,3 +28,115 @@ class Config:
     @property
     def get_supported_services(self) -> List[str]:
         return self._config.get("services")
+
+    @property
+    def get_metrics_cache_path(self) -> Optional[str]:
+        return os.getenv("METRICS_CACHE_PATH", self._config.get("metrics_cache_path"))
+
+    @property
+    def get_bucket_region_cache_path(self) -> Optional[str]:
+        return os.getenv("BUCKET_REGION_CACHE_PATH", self._config.get("bucket_region_cache_path"))
+
+    @property
+    def get_s3_inventory_paths(self) -> List[str]:
+        """S3 Inventory manifests, or directories holding delivered inventories, to analyze offline."""
+        paths = os.getenv("S3_INVENTORY_PATHS", "")
+        return [path.strip() for path in paths.split(",") if path.strip()]
+
+    @property
+    def get_s3_inventory_prefix_depth(self) -> int:
+        return int(
+            os.getenv(
+                "S3_INVENTORY_PREFIX_DEPTH", self._config.get("s3_inventory_prefix_depth", S3_INVENTORY_PREFIX_DEPTH)
+            )
+        )
+
+    @property
+    def get_use_fleet_metrics(self) -> bool:
+        use_fleet_metrics = os.getenv("USE_FLEET_METRICS")
+        if use_fleet_metrics is not None:
+            return use_fleet_metrics.lower() in ("1", "true", "yes")
+        return self._config.get("fleet_metrics", False)
+
+    @property
+    def get_ebs_idle_iops_threshold(self) -> float:
+        return float(
+            os.getenv("EBS_IDLE_IOPS_THRESHOLD", self._config.get("ebs_idle_iops_threshold", EBS_IDLE_IOPS_THRESHOLD))
+        )
+
+    @property
+    def get_max_pool_connections(self) -> int:
+        return int(
+            os.getenv("AWS_MAX_POOL_CONNECTIONS", self._config.get("max_pool_connections", AWS_MAX_POOL_CONNECTIONS))
+        )
+
+    @property
+    def get_max_concurrent_service_scans(self) -> int:
+        return int(
+            os.getenv(
+                "MAX_CONCURRENT_SERVICE_SCANS",
+                self._config.get("max_concurrent_service_scans", MAX_CONCURRENT_SERVICE_SCANS),
+            )
+        )
+
+    @property
+    def get_service_timeouts(self) -> Dict[str, float]:
+        return self._config.get("service_timeouts", {})
+
+    def get_service_timeout(self, service: str) -> float:
+        return self.get_service_timeouts.get(service, DEFAULT_SERVICE_TIMEOUT_SECONDS)
+
+    @property
+    def get_max_concurrent_regions(self) -> int:
+        return int(
+            os.getenv("MAX_CONCURRENT_REGIONS", self._config.get("max_concurrent_regions", MAX_CONCURRENT_REGIONS))
+        )
+
+    @property
+    def get_scan_regions(self) -> Optional[List[str]]:
+        """Regions to scan in multi-region mode: a list, [] to discover every enabled region, or None."""
+        regions = os.getenv("AWS_REGIONS")
+        if regions is None:
+            return None
+        if regions.strip().lower() == "all":
+            return []
+        return [region.strip() for region in regions.split(",") if region.strip()]
+
+    @property
+    def get_organization_role_name(self) -> Optional[str]:
+        return os.getenv("ORGANIZATION_ROLE_NAME", self._config.get("organization_role_name"))
+
+    @property
+    def get_organization_external_id(self) -> Optional[str]:
+        return os.getenv("ORGANIZATION_EXTERNAL_ID")
+
+    @property
+    def get_organization_accounts(self) -> List[str]:
+        accounts = os.getenv("ORGANIZATION_ACCOUNTS", "")
+        return [account.strip() for account in accounts.split(",") if account.strip()]
+
+    @property
+    def get_organization_accounts_file(self) -> Optional[str]:
+        return os.getenv("ORGANIZATION_ACCOUNTS_FILE")
+
+    @property
+    def get_max_concurrent_account_scans(self) -> int:
+        return int(
+            os.getenv(
+                "MAX_CONCURRENT_ACCOUNT_SCANS",
+                self._config.get("max_concurrent_account_scans", MAX_CONCURRENT_ACCOUNT_SCANS),
+            )
+        )
+
+    @property
+    def get_max_scans_per_account(self) -> int:
+        return int(os.getenv("MAX_SCANS_PER_ACCOUNT", self._config.get("max_scans_per_account", MAX_SCANS_PER_ACCOUNT)))
+
+    @property
+    def get_report_formats(self) -> List[str]:
+        report_formats = os.getenv("REPORT_FORMATS")
+        if report_formats:
+            return [
+                report_format.strip().lower() for report_format in report_formats.split(",") if report_format.strip()
+            ]
+        return self._config.get("report_formats", DEFAULT_REPORT_FORMATS)
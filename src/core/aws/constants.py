@@ -1 +1,147 @@
-CONFIG_MAP = {"test": {"services": ["ebs", "lb", "rds"]}, "prod": {"services": ["ebs", "lb", "rds"]}}
+CONFIG_MAP = {
+    "test": {
+        "services": ["ebs", "lb", "rds", "s3", "s3_waste", "s3_inventory"],
+        "fleet_metrics": False,
+        "service_timeouts": {"ebs": 300, "lb": 600, "rds": 900, "s3": 1800, "s3_waste": 3600, "s3_inventory": 3600},
+    },
+    "prod": {
+        "services": ["ebs", "lb", "rds", "s3", "s3_waste", "s3_inventory"],
+        "fleet_metrics": False,
+        "service_timeouts": {"ebs": 300, "lb": 600, "rds": 900, "s3": 1800, "s3_waste": 3600, "s3_inventory": 3600},
+    },
+}
+
+# GetMetricData accepts at most 500 MetricDataQueries per request.
+CLOUDWATCH_MAX_QUERIES_PER_REQUEST = 500
+
+# How long CloudWatch waits for more get_metrics calls before sending a batch.
+CLOUDWATCH_BATCH_WINDOW_SECONDS = 0.05
+
+# Datapoints returned per GetMetricData page before NextToken pagination kicks in.
+CLOUDWATCH_MAX_DATAPOINTS_PER_PAGE = 100800
+
+# Datapoint chunks buffered per metric subscriber; a full buffer pauses pagination until the subscriber catches up.
+CLOUDWATCH_SUBSCRIPTION_QUEUE_SIZE = 16
+
+# Datapoints newer than this may still be revised by CloudWatch, so the metric cache refetches them.
+CLOUDWATCH_CACHE_SETTLE_SECONDS = 900
+
+# Series written to the metric cache between two commits, so SQLite syncs stay off the event loop's hot path.
+CLOUDWATCH_CACHE_COMMIT_INTERVAL = 500
+
+# A SEARCH expression returns at most this many time series.
+CLOUDWATCH_MAX_SEARCH_RESULTS = 500
+
+# Sustained request rates (calls per second) the shared rate limiter starts from, keyed by
+# "service" or "service.operation". Rates back off on throttling and recover on success.
+AWS_DEFAULT_RATE_LIMIT = 10
+AWS_RATE_LIMITS = {
+    "cloudwatch": 20,
+    "cloudwatch.get_metric_data": 40,
+    "ec2": 20,
+    "elb": 10,
+    "elbv2": 10,
+    "rds": 10,
+    "s3": 50,
+    "sts": 10,
+}
+
+# Attempts per AWS call, including the first one, before an error is raised.
+AWS_MAX_ATTEMPTS = 5
+
+# Connections each pooled AWS client keeps open, and how long idle ones are kept alive.
+AWS_MAX_POOL_CONNECTIONS = 50
+AWS_KEEPALIVE_TIMEOUT_SECONDS = 60
+
+# describe_instance_health calls one load balancer handler keeps in flight.
+MAX_CONCURRENT_HEALTH_CHECKS = 20
+
+# Attached EBS volumes are idle when their busiest day over the lookback window averaged
+# fewer read and write operations per second than the threshold.
+EBS_IDLE_IOPS_THRESHOLD = 1.0
+EBS_IDLE_LOOKBACK_DAYS = 14
+
+# Buckets whose request and size metrics one S3 handler has queued at once.
+MAX_CONCURRENT_BUCKET_CHECKS = 1000
+
+# GetBucketLocation calls one S3 handler keeps in flight while resolving bucket regions.
+MAX_CONCURRENT_BUCKET_LOCATION_LOOKUPS = 50
+
+# How long a cached bucket region is trusted. A deleted bucket's name can be reused in another region.
+BUCKET_REGION_CACHE_TTL_SECONDS = 7 * 86400
+
+# Buckets whose multipart uploads and object versions one S3 handler lists at once. Multi-region and
+# organization scans run a handler per region or account, so up to MAX_CONCURRENT_REGIONS times as many.
+MAX_CONCURRENT_BUCKET_LISTINGS_PER_HANDLER = 20
+
+# Abandoned multipart uploads of one bucket whose parts are listed at once.
+MAX_CONCURRENT_PART_LISTINGS = 10
+
+# Multipart uploads started longer ago than this are considered abandoned.
+S3_INCOMPLETE_UPLOAD_MIN_AGE_DAYS = 7
+
+# Abandoned uploads or non-current versions are reported once a bucket holds this many bytes of them.
+S3_MIN_RECLAIMABLE_BYTES = 1024**3
+
+# Listing a bucket stops early once this many reclaimable bytes, or object versions, were found;
+# the finding is then a lower bound.
+S3_MAX_RECLAIMABLE_SCAN_BYTES = 1024**4
+S3_MAX_VERSIONS_LISTED_PER_BUCKET = 5_000_000
+
+# Service scans allowed to run at the same time, and how long a scan may take by default.
+MAX_CONCURRENT_SERVICE_SCANS = 8
+DEFAULT_SERVICE_TIMEOUT_SECONDS = 900
+
+# Regions scanned at the same time in multi-region mode, and the region used to discover them.
+MAX_CONCURRENT_REGIONS = 4
+REGION_DISCOVERY_REGION = "us-east-1"
+
+# Role session name and lifetime used when assuming roles in member accounts.
+ORGANIZATION_ROLE_SESSION_NAME = "cloud-cost-optimizer"
+ASSUME_ROLE_DURATION_SECONDS = 3600
+
+# Service scans running at once in organization mode, and how many of them one account may hold.
+MAX_CONCURRENT_ACCOUNT_SCANS = 16
+MAX_SCANS_PER_ACCOUNT = 4
+
+# Findings buffered between the service scans and the report sinks.
+FINDINGS_QUEUE_SIZE = 1000
+
+# Report formats written by default; see src/core/utils/report_sinks.py for the supported ones.
+DEFAULT_REPORT_FORMATS = ["xlsx"]
+
+# Rows buffered per resource type before they are written as one Parquet row group.
+PARQUET_ROW_GROUP_SIZE = 10000
+
+# Worker processes rendering Excel reports, so several reports can build on separate cores.
+MAX_REPORT_RENDER_WORKERS = 4
+
+# S3 Inventory rows decoded per chunk: CSV files are read in blocks of this many bytes,
+# Parquet files in batches of this many rows.
+S3_INVENTORY_CSV_BLOCK_BYTES = 64 * 1024 * 1024
+S3_INVENTORY_BATCH_ROWS = 1_000_000
+
+# Object ages, in days, separating the age buckets of the S3 Inventory analysis.
+S3_INVENTORY_AGE_BUCKET_DAYS = [30, 90, 180, 365]
+
+# Key prefix depth S3 Inventory objects are grouped by, e.g. 1 groups "logs/2024/a.gz" under "logs/".
+S3_INVENTORY_PREFIX_DEPTH = 1
+
+# S3 storage prices in USD per GB-month (us-east-1), used to estimate savings.
+S3_STORAGE_PRICES_PER_GB_MONTH = {
+    "STANDARD": 0.023,
+    "STANDARD_IA": 0.0125,
+    "GLACIER_IR": 0.004,
+    "GLACIER": 0.0036,
+    "DEEP_ARCHIVE": 0.00099,
+}
+S3_INTELLIGENT_TIERING_MONITORING_PER_1000_OBJECTS = 0.0025
+
+# Lifecycle transitions recommended for STANDARD objects, as (age in days, storage class).
+S3_LIFECYCLE_TRANSITIONS = [(30, "STANDARD_IA"), (90, "GLACIER_IR")]
+
+# Infrequent access classes bill every object as at least this size.
+S3_IA_MIN_OBJECT_BYTES = 128 * 1024
+
+# Recommendations saving less than this many USD per month are not reported.
+S3_MIN_MONTHLY_SAVINGS = 1.0
@@ -1,62 +1,380 @@
 import os
 import asyncio
 from dataclasses import dataclass
-from typing import List
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aioboto3
 
 from src.core.aws.config import Config
+from src.core.aws.metric_cache import close_metric_cache
+from src.core.aws.organization import AssumedRoleSessions, load_accounts
 from src.core.aws.resource_handlers.ebs import EbsResourceHandlers
 from src.core.aws.resource_handlers.lb import LoadBalancerResourceHandlers
 from src.core.aws.resource_handlers.rds import RdsHandler
-from src.core.utils.excel_report_generator import ExcelReportGenerator
-from src.core.utils import get_common_elements, get_logger
+from src.core.aws.resource_handlers.s3 import S3ResourceHandlers, S3StorageWasteHandlers
+from src.core.aws.resource_handlers.s3_inventory import S3InventoryAnalyzer
+from src.core.aws.constants import FINDINGS_QUEUE_SIZE, REGION_DISCOVERY_REGION
+from src.core.utils import AsyncClientManager, close_client_pool, get_common_elements, get_logger
+from src.core.utils.fair_scheduler import FairScheduler
+from src.models.finding import to_record
+from src.core.utils.report_sinks import (
+    ReportSink,
+    close_sinks,
+    create_report_sink,
+    create_report_sinks,
+    shutdown_report_executor,
+)
 
 logger = get_logger()
 
+# Put by stream_findings into its queue once a producer has finished
+_PRODUCER_DONE = object()
+
 
 @dataclass
 class AwsCostManager:
 
-    def __init__(self, region: str):
+    def __init__(
+        self,
+        region: str,
+        scan_semaphore: Optional[asyncio.Semaphore] = None,
+        client_manager: Optional[AsyncClientManager] = None,
+        all_bucket_regions: bool = True,
+    ):
         self._config = Config()
+        # Callers scanning several managers at once pass one semaphore to share the budget
+        self._scan_semaphore = scan_semaphore or asyncio.Semaphore(self._config.get_max_concurrent_service_scans)
         self._supported_services = self._config.get_supported_services
         self._region = region
+        # Member accounts pass a client manager bound to their assumed-role session
+        client_manager = client_manager or AsyncClientManager(region)
+        use_fleet_metrics = self._config.get_use_fleet_metrics
         self._resource_strategy = {
-            "ebs": EbsResourceHandlers(self._region),
-            "lb": LoadBalancerResourceHandlers(self._region),
-            "rds": RdsHandler(self._region),
+            "ebs": EbsResourceHandlers(
+                self._region, use_fleet_metrics=use_fleet_metrics, client_manager=client_manager
+            ),
+            "lb": LoadBalancerResourceHandlers(
+                self._region, use_fleet_metrics=use_fleet_metrics, client_manager=client_manager
+            ),
+            "rds": RdsHandler(self._region, use_fleet_metrics=use_fleet_metrics, client_manager=client_manager),
+            # S3 is global: a lone regional scan covers every bucket by default, while each region of a
+            # multi-region scan passes all_bucket_regions=False to cover only the buckets homed in it
+            "s3": S3ResourceHandlers(
+                self._region,
+                use_fleet_metrics=use_fleet_metrics,
+                client_manager=client_manager,
+                all_regions=all_bucket_regions,
+            ),
+            # Listing uploads and versions is slow, so it runs apart from the request checks with its own timeout
+            "s3_waste": S3StorageWasteHandlers(
+                self._region, client_manager=client_manager, all_regions=all_bucket_regions
+            ),
+            # Local inventories cover whole buckets, so only the scan covering every bucket reads them
+            "s3_inventory": S3InventoryAnalyzer(
+                self._region, inventory_paths=None if all_bucket_regions else [], client_manager=client_manager
+            ),
         }
 
+    def get_services(self, services: List[str] = []) -> List[str]:
+        """The requested services that are supported, or every supported service if none are requested."""
+        if len(services) != 0:
+            return get_common_elements(self._supported_services, services)
+        return self._supported_services
+
     async def get_unused_resources(self, services: List[str] = []):
         unused_resources = []
 
-        if len(services) != 0:
-            services = get_common_elements(self._supported_services, services)
-        else:
-            services = self._supported_services
+        services = self.get_services(services)
 
-        for service in services:
-            result = await self._resource_strategy[service].find_under_utilized_resource()
+        results = await asyncio.gather(*(self.scan_service(service) for service in services))
+        for service, result in zip(services, results):
             unused_resources.append({service: result})
 
         return unused_resources
 
+    async def scan_service(self, service: str) -> Dict:
+        """Run one service handler, turning a failure or timeout into an error entry."""
+        timeout = self._config.get_service_timeout(service)
+
+        async with self._scan_semaphore:
+            try:
+                return await asyncio.wait_for(self._resource_strategy[service].find_under_utilized_resource(), timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Scanning {service} in {self._region} timed out after {timeout} seconds")
+                return {"errors": [{"Error": f"Timed out after {timeout} seconds"}]}
+            except Exception as e:
+                logger.exception(f"Scanning {service} in {self._region} failed")
+                return {"errors": [{"Error": str(e)}]}
+
+    async def stream_unused_resources(self, services: List[str] = []) -> AsyncIterator[Tuple[str, str, Dict]]:
+        """
+        Yield (service, resource_type, resource) findings from every service as they are confirmed.
+
+        Services run concurrently and feed a bounded queue, so a slow consumer holds the
+        scans back instead of letting findings pile up in memory.
+        """
+        services = self.get_services(services)
+        async for finding in stream_findings([partial(self.feed_service, service) for service in services]):
+            yield finding
+
+    async def feed_service(self, service: str, queue: asyncio.Queue, tags: Optional[Dict[str, str]] = None):
+        """
+        Put one service's (service, resource_type, resource) findings into the queue as they are confirmed,
+        turning a failure or timeout into an error entry. With tags, every resource is put as a report
+        record prefixed with them, e.g. the region and account it was found in.
+        """
+        timeout = self._config.get_service_timeout(service)
+
+        async def put(resource_type: str, resource):
+            await queue.put((service, resource_type, {**tags, **to_record(resource)} if tags else resource))
+
+        async with self._scan_semaphore:
+            try:
+                async with asyncio.timeout(timeout):
+                    async for resource_type, resource in self._resource_strategy[
+                        service
+                    ].stream_under_utilized_resources():
+                        await put(resource_type, resource)
+            except TimeoutError:
+                logger.error(f"Scanning {service} in {self._region} timed out after {timeout} seconds")
+                await put("errors", {"Error": f"Timed out after {timeout} seconds"})
+            except Exception as e:
+                logger.exception(f"Scanning {service} in {self._region} failed")
+                await put("errors", {"Error": str(e)})
+
+    async def write_unused_resources(self, sinks: List[ReportSink], services: List[str] = []) -> List[str]:
+        """Stream every finding into the sinks as it arrives and return the paths of the finished reports."""
+        return await write_to_sinks(self.stream_unused_resources(services), sinks)
+
+    async def get_unused_resources_report(self, services: List[str] = [], output_path: str = None) -> str:
+        """
+        Generate a report for unused resources, in the format matching the output path's extension.
+
+        Args:
+            services: List of services to analyze. If empty, analyzes all supported services.
+            output_path: Optional custom path; its extension (.xlsx, .csv, .jsonl or .parquet) picks the format.
+
+        Returns:
+            Path to the generated report.
+        """
+        [report_path] = await self.write_unused_resources([create_report_sink(self._region, output_path)], services)
+
+        return report_path
+
+
+async def collect_findings(findings: AsyncIterator[Tuple[str, str, Dict]]) -> List[Dict]:
+    """Collect streamed findings into one {service: {resource_type: [resources]}} entry per service."""
+    collected: Dict[str, Dict[str, List]] = {}
+    async for service, resource_type, resource in findings:
+        collected.setdefault(service, {}).setdefault(resource_type, []).append(resource)
+
+    return [{service: resources} for service, resources in collected.items()]
+
+
+async def stream_findings(
+    producers: List[Callable[[asyncio.Queue], Awaitable[None]]],
+) -> AsyncIterator[Tuple[str, str, Dict]]:
+    """
+    Run producers that put (service, resource_type, resource) findings into one queue, yielding
+    the findings as they arrive.
+
+    The queue holds at most FINDINGS_QUEUE_SIZE findings, so producers wait for a slow consumer.
+    """
+    queue = asyncio.Queue(maxsize=FINDINGS_QUEUE_SIZE)
+
+    async def run(producer):
+        try:
+            await producer(queue)
+        except Exception:
+            # Producers report their own scan errors, so this is a bug rather than a failed scan
+            logger.exception("Producing findings failed")
+        await queue.put(_PRODUCER_DONE)
+
+    tasks = [asyncio.create_task(run(producer)) for producer in producers]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            finding = await queue.get()
+            if finding is _PRODUCER_DONE:
+                remaining -= 1
+                continue
+            yield finding
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def write_to_sinks(findings: AsyncIterator[Tuple[str, str, Dict]], sinks: List[ReportSink]) -> List[str]:
+    """Write every streamed finding into the sinks as it arrives and return the paths of the finished reports."""
+    async for service, resource_type, resource in findings:
+        for sink in sinks:
+            sink.write(service, resource_type, resource)
+
+    return await close_sinks(sinks)
+
+
+async def get_enabled_regions(client_manager: AsyncClientManager) -> List[str]:
+    """List the regions enabled for the account the client manager's credentials belong to."""
+    async with client_manager as manager:
+        async with manager.get_client("ec2") as ec2:
+            response = await ec2.describe_regions(
+                Filters=[{"Name": "opt-in-status", "Values": ["opt-in-not-required", "opted-in"]}]
+            )
+
+    return sorted(region["RegionName"] for region in response.get("Regions", []))
+
+
+@dataclass
+class MultiRegionCostManager:
+    """
+    Scans several regions concurrently in one process and merges them into one report.
+
+    Regions share the client pool, the rate limiter and the service scan budget. When no
+    regions are given, every region enabled for the account is discovered and scanned.
+    """
+
+    def __init__(self, regions: Optional[List[str]] = None, max_concurrent_regions: Optional[int] = None):
+        self._config = Config()
+        self._regions = regions
+        self._region_semaphore = asyncio.Semaphore(max_concurrent_regions or self._config.get_max_concurrent_regions)
+        self._scan_semaphore = asyncio.Semaphore(self._config.get_max_concurrent_service_scans)
+
+    async def get_enabled_regions(self) -> List[str]:
+        return await get_enabled_regions(AsyncClientManager(REGION_DISCOVERY_REGION))
+
+    async def get_unused_resources(self, services: List[str] = []):
+        """Collect the findings of every region, tagged with it, into one entry per service."""
+        return await collect_findings(self.stream_unused_resources(services))
+
+    async def _feed_region(self, region: str, services: List[str], queue: asyncio.Queue):
+        async with self._region_semaphore:
+            logger.info(f"Scanning {region}")
+            cost_manager = AwsCostManager(region, scan_semaphore=self._scan_semaphore, all_bucket_regions=False)
+            await asyncio.gather(
+                *(
+                    cost_manager.feed_service(service, queue, tags={"Region": region})
+                    for service in cost_manager.get_services(services)
+                )
+            )
+
+    async def stream_unused_resources(self, services: List[str] = []) -> AsyncIterator[Tuple[str, str, Dict]]:
+        """Yield (service, resource_type, record) findings of every region as they are confirmed, tagged with it."""
+        regions = self._regions or await self.get_enabled_regions()
+
+        async for finding in stream_findings([partial(self._feed_region, region, services) for region in regions]):
+            yield finding
+
+    async def write_unused_resources(self, sinks: List[ReportSink], services: List[str] = []) -> List[str]:
+        return await write_to_sinks(self.stream_unused_resources(services), sinks)
+
     async def get_unused_resources_report(self, services: List[str] = [], output_path: str = None) -> str:
         """
-        Generate an Excel report for unused resources.
+        Generate one report covering every scanned region.
 
         Args:
             services: List of services to analyze. If empty, analyzes all supported services.
-            output_path: Optional custom path for the Excel file.
+            output_path: Optional custom path; its extension (.xlsx, .csv, .jsonl or .parquet) picks the format.
 
         Returns:
-            Path to the generated Excel report file.
+            Path to the generated report.
         """
-        unused_resources = await self.get_unused_resources(services)
+        [report_path] = await self.write_unused_resources([create_report_sink("multi-region", output_path)], services)
+
+        return report_path
+
+
+@dataclass
+class OrganizationCostManager:
+    """
+    Scans many accounts of an organization through a role assumed in each of them.
+
+    Every account is scanned per region and service. The scans run on a fair scheduler that
+    takes turns between accounts and caps how many scans one account holds, so the first
+    findings of every account arrive early even when one account is far larger than the rest.
+    """
+
+    def __init__(
+        self,
+        accounts: List[str],
+        role_name: str,
+        regions: Optional[List[str]] = None,
+        external_id: Optional[str] = None,
+    ):
+        self._config = Config()
+        self._accounts = accounts
+        self._regions = regions
+        self._sessions = AssumedRoleSessions(role_name, external_id=external_id)
+        self._scheduler = FairScheduler(
+            self._config.get_max_concurrent_account_scans, max_per_tenant=self._config.get_max_scans_per_account
+        )
 
-        report_generator = ExcelReportGenerator()
-        report_path = report_generator.generate_report(
-            unused_resources=unused_resources, region=self._region, output_path=output_path
+    async def _get_account_regions(self, account_id: str) -> Tuple[aioboto3.Session, List[str]]:
+        session = await self._sessions.get_session(account_id)
+        regions = self._regions or await get_enabled_regions(
+            AsyncClientManager(REGION_DISCOVERY_REGION, session=session, account_id=account_id)
         )
+        return session, regions
+
+    async def stream_unused_resources(self, services: List[str] = []) -> AsyncIterator[Tuple[str, str, Dict]]:
+        """
+        Yield (service, resource_type, record) findings of every account and region as they are
+        confirmed, tagged with both. The scans take turns on the fair scheduler.
+        """
+        # Roles are assumed for every account at once before any scan starts
+        account_regions = await asyncio.gather(
+            *(self._get_account_regions(account_id) for account_id in self._accounts), return_exceptions=True
+        )
+
+        jobs = {}
+        for account_id, account_region in zip(self._accounts, account_regions):
+            if isinstance(account_region, Exception):
+                logger.error(f"Could not access account {account_id}: {account_region}")
+                yield "sts", "errors", {"Account": account_id, "Error": str(account_region)}
+                continue
+
+            session, regions = account_region
+            jobs[account_id] = []
+            for region in regions:
+                cost_manager = AwsCostManager(
+                    region,
+                    client_manager=AsyncClientManager(region, session=session, account_id=account_id),
+                    all_bucket_regions=False,
+                )
+                tags = {"Account": account_id, "Region": region}
+                jobs[account_id].extend(
+                    partial(cost_manager.feed_service, service, tags=tags)
+                    for service in cost_manager.get_services(services)
+                )
+
+        async def feed_scans(queue: asyncio.Queue):
+            await self._scheduler.run(
+                {account_id: [partial(job, queue) for job in account_jobs] for account_id, account_jobs in jobs.items()}
+            )
+
+        async for finding in stream_findings([feed_scans]):
+            yield finding
+
+    async def get_unused_resources(self, services: List[str] = []):
+        """Collect the findings of every account and region, tagged with both, into one entry per service."""
+        return await collect_findings(self.stream_unused_resources(services))
+
+    async def write_unused_resources(self, sinks: List[ReportSink], services: List[str] = []) -> List[str]:
+        return await write_to_sinks(self.stream_unused_resources(services), sinks)
+
+    async def get_unused_resources_report(self, services: List[str] = [], output_path: str = None) -> str:
+        """
+        Generate one report covering every scanned account.
+
+        Args:
+            services: List of services to analyze. If empty, analyzes all supported services.
+            output_path: Optional custom path; its extension (.xlsx, .csv, .jsonl or .parquet) picks the format.
+
+        Returns:
+            Path to the generated report.
+        """
+        [report_path] = await self.write_unused_resources([create_report_sink("organization", output_path)], services)
 
         return report_path
 
@@ -64,9 +382,31 @@ class AwsCostManager:
 if __name__ == "__main__":
 
     async def main():
-        cost_manager = AwsCostManager(os.getenv("AWS_REGION"))
+        config = Config()
+        scan_regions = config.get_scan_regions
+        if config.get_organization_role_name:
+            accounts = config.get_organization_accounts or load_accounts(config.get_organization_accounts_file)
+            cost_manager = OrganizationCostManager(
+                accounts,
+                config.get_organization_role_name,
+                regions=scan_regions if scan_regions is not None else [os.getenv("AWS_REGION")],
+                external_id=config.get_organization_external_id,
+            )
+            report_region = "organization"
+        elif scan_regions is None:
+            report_region = os.getenv("AWS_REGION")
+            cost_manager = AwsCostManager(report_region)
+        else:
+            cost_manager = MultiRegionCostManager(scan_regions)
+            report_region = "multi-region"
 
-        report_path = await cost_manager.get_unused_resources_report()
-        logger.info(f"Report generated successfully: {report_path}")
+        try:
+            sinks = create_report_sinks(config.get_report_formats, report_region)
+            for report_path in await cost_manager.write_unused_resources(sinks):
+                logger.info(f"Report generated successfully: {report_path}")
+        finally:
+            await close_client_pool()
+            close_metric_cache()
+            shutdown_report_executor()
 
     asyncio.run(main())
@@ -0,0 +1,152 @@
+import calendar
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from src.core.aws.config import Config
+from src.core.aws.constants import CLOUDWATCH_CACHE_COMMIT_INTERVAL
+from src.models.cloudwatch import CloudWatchMetric
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    key TEXT PRIMARY KEY,
+    fetched_from INTEGER NOT NULL,
+    fetched_until INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS datapoints (
+    key TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (key, ts)
+) WITHOUT ROWID;
+"""
+
+
+def to_epoch(timestamp: datetime) -> int:
+    """Convert a datetime to epoch seconds, treating naive datetimes as UTC like utcnow() does."""
+    return calendar.timegm(timestamp.utctimetuple())
+
+
+def from_epoch(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+class MetricCache:
+    """
+    On-disk cache of CloudWatch datapoints backed by SQLite.
+
+    Series are keyed by namespace, metric name, dimensions, period, statistic and unit.
+    Next to the datapoints the cache records the time range that has been completely
+    fetched for every series, so a later run only asks CloudWatch for the gap since then.
+    Datapoints are only reused on the period grid they were fetched on. Writes are committed
+    every CLOUDWATCH_CACHE_COMMIT_INTERVAL series and when the cache is closed.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+        self._updated_series = 0
+
+    @staticmethod
+    def key(cloud_watch_metric: CloudWatchMetric, scope: str = "") -> str:
+        # The scope names the account and region of the metric, since resource ids and bucket names
+        # repeat across them and one cache file may serve scans of several accounts
+        dimensions = sorted((dim["Name"], dim["Value"]) for dim in cloud_watch_metric.dimensions)
+        stat = cloud_watch_metric.statistics[0] if cloud_watch_metric.statistics else "Maximum"
+        return json.dumps(
+            [
+                scope,
+                cloud_watch_metric.namespace,
+                cloud_watch_metric.metric_name,
+                dimensions,
+                cloud_watch_metric.period,
+                stat,
+                cloud_watch_metric.unit,
+            ]
+        )
+
+    def get_coverage(self, key: str) -> Optional[Tuple[int, int]]:
+        """Return the (from, until) epoch range that has been completely fetched for a series."""
+        row = self._connection.execute(
+            "SELECT fetched_from, fetched_until FROM series WHERE key = ?", (key,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def set_coverage(self, key: str, fetched_from: int, fetched_until: int):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO series (key, fetched_from, fetched_until) VALUES (?, ?, ?)",
+            (key, fetched_from, fetched_until),
+        )
+
+    def get_datapoints(self, key: str, start: int, end: int, period: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Return the cached (timestamp, value) pairs in [start, end), newest first like GetMetricData.
+
+        With a period, only datapoints on the grid start + k * period are returned.
+        """
+        if period is None:
+            return self._connection.execute(
+                "SELECT ts, value FROM datapoints WHERE key = ? AND ts >= ? AND ts < ? ORDER BY ts DESC",
+                (key, start, end),
+            ).fetchall()
+
+        return self._connection.execute(
+            "SELECT ts, value FROM datapoints WHERE key = ? AND ts >= ? AND ts < ? AND (ts - ?) % ? = 0 "
+            "ORDER BY ts DESC",
+            (key, start, end, start, period),
+        ).fetchall()
+
+    def put_datapoints(self, key: str, datapoints: List[Tuple[int, float]]):
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO datapoints (key, ts, value) VALUES (?, ?, ?)",
+            [(key, ts, value) for ts, value in datapoints],
+        )
+
+    def discard(self, key: str):
+        """Forget the datapoints and coverage of a series, e.g. when a new window no longer lines up with them."""
+        self._connection.execute("DELETE FROM datapoints WHERE key = ?", (key,))
+        self._connection.execute("DELETE FROM series WHERE key = ?", (key,))
+
+    def series_updated(self):
+        """Count a series as written, committing once CLOUDWATCH_CACHE_COMMIT_INTERVAL of them are pending."""
+        self._updated_series += 1
+        if self._updated_series >= CLOUDWATCH_CACHE_COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        self._connection.commit()
+        self._updated_series = 0
+
+    def close(self):
+        self.commit()
+        self._connection.close()
+
+
+_shared_cache: Optional[MetricCache] = None
+
+
+def get_metric_cache() -> Optional[MetricCache]:
+    """Return the process-wide metric cache, or None when no cache path is configured."""
+    global _shared_cache
+
+    if _shared_cache is None:
+        path = Config().get_metrics_cache_path
+        if path:
+            _shared_cache = MetricCache(path)
+
+    return _shared_cache
+
+
+def close_metric_cache():
+    """Commit and close the process-wide metric cache, if one was opened."""
+    global _shared_cache
+
+    if _shared_cache is not None:
+        _shared_cache.close()
+        _shared_cache = None
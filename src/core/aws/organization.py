@@ -0,0 +1,104 @@
+import asyncio
+from collections import defaultdict
+from functools import partial
+from typing import Dict, List, Optional
+
+import aioboto3
+from aiobotocore.credentials import AioRefreshableCredentials
+from aiobotocore.session import get_session
+from botocore.credentials import CredentialProvider
+
+from src.core.aws.constants import ASSUME_ROLE_DURATION_SECONDS, ORGANIZATION_ROLE_SESSION_NAME, REGION_DISCOVERY_REGION
+from src.core.utils import AsyncClientManager, get_logger
+
+logger = get_logger()
+
+
+def load_accounts(path: str) -> List[str]:
+    """Read account ids from a file, one per line. Blank lines and lines starting with # are ignored."""
+    with open(path) as accounts_file:
+        lines = (line.split("#", 1)[0].strip() for line in accounts_file)
+        return [line for line in lines if line]
+
+
+class AssumedRoleCredentialProvider(CredentialProvider):
+    """Hands a session the refreshable credentials of an assumed role, ahead of the default credential chain."""
+
+    METHOD = "sts-assume-role"
+    CANONICAL_NAME = "custom-sts-assume-role"
+
+    def __init__(self, credentials: AioRefreshableCredentials):
+        super().__init__()
+        self._credentials = credentials
+
+    async def load(self) -> AioRefreshableCredentials:
+        return self._credentials
+
+
+class AssumedRoleSessions:
+    """
+    Sessions for member accounts, backed by credentials from sts:AssumeRole.
+
+    Each account's role is assumed once and its session is cached. The credentials refresh
+    themselves by assuming the role again shortly before they expire, so long scans never
+    run into expired tokens and accounts are never re-resolved between scans.
+    """
+
+    def __init__(
+        self,
+        role_name: str,
+        external_id: Optional[str] = None,
+        session_name: str = ORGANIZATION_ROLE_SESSION_NAME,
+        duration_seconds: int = ASSUME_ROLE_DURATION_SECONDS,
+        partition: str = "aws",
+    ):
+        self._role_name = role_name
+        self._external_id = external_id
+        self._session_name = session_name
+        self._duration_seconds = duration_seconds
+        self._partition = partition
+        self._sessions: Dict[str, aioboto3.Session] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def get_role_arn(self, account_id: str) -> str:
+        return f"arn:{self._partition}:iam::{account_id}:role/{self._role_name}"
+
+    async def _assume_role(self, account_id: str) -> Dict[str, str]:
+        assume_role_args = {
+            "RoleArn": self.get_role_arn(account_id),
+            "RoleSessionName": self._session_name,
+            "DurationSeconds": self._duration_seconds,
+        }
+        if self._external_id:
+            assume_role_args["ExternalId"] = self._external_id
+
+        # STS calls use the caller's own credentials, through the shared pool and rate limiter
+        async with AsyncClientManager(REGION_DISCOVERY_REGION) as manager:
+            async with manager.get_client("sts") as sts:
+                response = await sts.assume_role(**assume_role_args)
+
+        credentials = response["Credentials"]
+        logger.info(f"Assumed {assume_role_args['RoleArn']} until {credentials['Expiration']}")
+        return {
+            "access_key": credentials["AccessKeyId"],
+            "secret_key": credentials["SecretAccessKey"],
+            "token": credentials["SessionToken"],
+            "expiry_time": credentials["Expiration"].isoformat(),
+        }
+
+    async def get_session(self, account_id: str) -> aioboto3.Session:
+        async with self._locks[account_id]:
+            session = self._sessions.get(account_id)
+            if session is None:
+                credentials = AioRefreshableCredentials.create_from_metadata(
+                    await self._assume_role(account_id),
+                    refresh_using=partial(self._assume_role, account_id),
+                    method="sts-assume-role",
+                )
+                botocore_session = get_session()
+                botocore_session.get_component("credential_provider").insert_before(
+                    "env", AssumedRoleCredentialProvider(credentials)
+                )
+                session = self._sessions[account_id] = aioboto3.Session(botocore_session=botocore_session)
+
+        return session
@@ -1,60 +1,412 @@
+import asyncio
+from dataclasses import replace
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.aws.constants import (
+    CLOUDWATCH_BATCH_WINDOW_SECONDS,
+    CLOUDWATCH_CACHE_SETTLE_SECONDS,
+    CLOUDWATCH_MAX_DATAPOINTS_PER_PAGE,
+    CLOUDWATCH_MAX_QUERIES_PER_REQUEST,
+    CLOUDWATCH_MAX_SEARCH_RESULTS,
+    CLOUDWATCH_SUBSCRIPTION_QUEUE_SIZE,
+)
+from src.core.aws.metric_cache import MetricCache, from_epoch, get_metric_cache, to_epoch
 from src.core.utils import AsyncClientManager
-from src.models.cloudwatch import CloudWatchMetric
+from src.models.cloudwatch import CloudWatchMetric, FleetMetricQuery, MetricSeries
+
+_END_OF_STREAM = object()
+
+
+class _Subscription:
+    """The queue one caller receives the datapoint chunks of a metric request on."""
+
+    __slots__ = ("chunks", "closed")
+
+    def __init__(self):
+        self.chunks = asyncio.Queue(maxsize=CLOUDWATCH_SUBSCRIPTION_QUEUE_SIZE)
+        self.closed = False
+
+    def close(self):
+        """Stop receiving chunks, releasing a producer blocked on the full queue."""
+        self.closed = True
+        while not self.chunks.empty():
+            self.chunks.get_nowait()
+
+
+class _PendingMetric:
+    """A queued metric request and the subscriptions its datapoint chunks are fanned out to."""
+
+    __slots__ = ("key", "metric", "subscriptions", "started")
+
+    def __init__(self, key: Tuple, metric: CloudWatchMetric):
+        self.key = key
+        self.metric = metric
+        self.subscriptions: List[_Subscription] = []
+        self.started = False
+
+    def subscribe(self) -> _Subscription:
+        subscription = _Subscription()
+        self.subscriptions.append(subscription)
+        return subscription
+
+    async def put(self, item):
+        if isinstance(item, tuple):
+            self.started = True
+
+        # Waiting on a full queue holds the next page back until a slow consumer catches up;
+        # consumers that stopped iterating early no longer drain their queue
+        for subscription in self.subscriptions:
+            if not subscription.closed:
+                await subscription.chunks.put(item)
 
 
 class CloudWatch:
-    def __init__(self, region_name: str):
+    """
+    Batching wrapper around the GetMetricData API.
+
+    Metric requests are not sent one by one. Each request is queued, and once the
+    batching window elapses every queued metric sharing the same time window is
+    packed into GetMetricData requests of up to 500 queries. Every request follows
+    NextToken to the last page, and each page is fanned back out to the waiting
+    callers as a chunk of datapoints, so nothing is truncated and no response is
+    buffered whole. Chunks are available either as datapoint dicts (stream_metrics,
+    get_metrics) or as columnar MetricSeries (stream_metric_series, get_metric_series).
+
+    Identical requests made while one is already queued or in flight share that
+    request and its result instead of adding another query. Requests with a missing
+    dimension value are answered with no datapoints without calling the API.
+
+    When a MetricCache is configured, only the part of the window that is not yet
+    cached is requested, and the rest is served from disk.
+
+    get_fleet_metrics is an alternative to per-resource queries: a single SEARCH
+    expression fetches a metric for every resource of a namespace, and the returned
+    series are split back into a per-resource map.
+    """
+
+    def __init__(
+        self,
+        region_name: str,
+        batch_window: float = CLOUDWATCH_BATCH_WINDOW_SECONDS,
+        cache: Optional[MetricCache] = None,
+        client_manager: Optional[AsyncClientManager] = None,
+    ):
         self.region_name = region_name
-        self._client_manager = AsyncClientManager(region_name)
+        self._client_manager = client_manager or AsyncClientManager(region_name)
+        self._batch_window = batch_window
+        self._cache = cache if cache is not None else get_metric_cache()
+        self._pending: List[_PendingMetric] = []
+        self._in_flight: Dict[Tuple, _PendingMetric] = {}
+        self._flush_task = None
+
+    async def stream_metrics(self, cloud_watch_metric: CloudWatchMetric) -> AsyncIterator[List[Dict]]:
+        """Yield the datapoints of a metric one page at a time, newest first, across all pages."""
+        stat = self._stat(cloud_watch_metric)
+        async for timestamps, values in self._stream_raw(cloud_watch_metric):
+            yield self._to_datapoints(stat, cloud_watch_metric.unit, timestamps, values)
+
+    async def stream_metric_series(self, cloud_watch_metric: CloudWatchMetric) -> AsyncIterator[MetricSeries]:
+        """Yield the datapoints of a metric one page at a time as columnar MetricSeries chunks."""
+        async for timestamps, values in self._stream_raw(cloud_watch_metric):
+            yield self._to_series(cloud_watch_metric.unit, timestamps, values)
+
+    async def get_metric_series(self, cloud_watch_metric: CloudWatchMetric) -> MetricSeries:
+        chunks = [chunk async for chunk in self.stream_metric_series(cloud_watch_metric)]
+        return MetricSeries.concat(chunks, cloud_watch_metric.unit)
+
+    async def get_metric_series_batch(self, cloud_watch_metrics: List[CloudWatchMetric]) -> List[MetricSeries]:
+        """Fetch several metrics at once, returning their series in the same order."""
+        return list(await asyncio.gather(*[self.get_metric_series(metric) for metric in cloud_watch_metrics]))
+
+    async def _stream_raw(self, cloud_watch_metric: CloudWatchMetric) -> AsyncIterator[Tuple[List, List]]:
+        if not self._has_valid_dimensions(cloud_watch_metric):
+            return
+
+        stream = self._stream_from_api if self._cache is None else self._stream_with_cache
+        async for chunk in stream(cloud_watch_metric):
+            yield chunk
+
+    async def _stream_with_cache(self, cloud_watch_metric: CloudWatchMetric) -> AsyncIterator[Tuple[List, List]]:
+        key = MetricCache.key(cloud_watch_metric, await self._client_manager.get_cache_scope())
+        period = cloud_watch_metric.period
+
+        # CloudWatch buckets start at StartTime, so the window is floored to the period grid; runs at
+        # different times of day then share their buckets and only the periods completed since are fetched
+        start = to_epoch(cloud_watch_metric.start_time) // period * period
+        end = max(to_epoch(cloud_watch_metric.end_time) // period * period, start + period)
+
+        # A cached range is only reusable if it reaches back to the start of the requested window
+        # and its datapoints lie on the same period grid
+        coverage = self._cache.get_coverage(key)
+        covered_from, covered_until = start, start
+        if coverage and coverage[0] <= start <= coverage[1] and (start - coverage[0]) % period == 0:
+            covered_from, covered_until = coverage
+        elif coverage:
+            self._cache.discard(key)
+
+        # The period the cached range ends in may have been partial, so it is fetched again and overwritten
+        fetch_from = start + (min(covered_until, end) - start) // period * period
+
+        # The gap is newer than anything cached, so it is yielded first to keep the newest-first order
+        if fetch_from < end:
+            gap_metric = replace(
+                cloud_watch_metric,
+                start_time=from_epoch(fetch_from).replace(tzinfo=None),
+                end_time=from_epoch(end).replace(tzinfo=None),
+            )
+            async for timestamps, values in self._stream_from_api(gap_metric):
+                self._cache.put_datapoints(key, list(zip(map(to_epoch, timestamps), values)))
+                yield timestamps, values
+
+        if fetch_from > start:
+            cached = self._cache.get_datapoints(key, start, fetch_from, period)
+            if cached:
+                yield [from_epoch(ts) for ts, _ in cached], [value for _, value in cached]
+
+        settled = to_epoch(datetime.utcnow()) - CLOUDWATCH_CACHE_SETTLE_SECONDS
+        self._cache.set_coverage(key, covered_from, max(min(end, settled), covered_until))
+        self._cache.series_updated()
+
+    async def _stream_from_api(self, cloud_watch_metric: CloudWatchMetric) -> AsyncIterator[Tuple[List, List]]:
+        key = (
+            MetricCache.key(cloud_watch_metric),
+            self._align(cloud_watch_metric.start_time),
+            self._align(cloud_watch_metric.end_time),
+        )
 
-    async def get_metrics(self, cloud_watch_metric: CloudWatchMetric):
+        # Join an identical request unless it has already started delivering chunks
+        pending = self._in_flight.get(key)
+        if pending is None or pending.started:
+            pending = _PendingMetric(key, cloud_watch_metric)
+            self._in_flight[key] = pending
+            self._pending.append(pending)
+
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_after_window())
+
+        subscription = pending.subscribe()
+        try:
+            while True:
+                chunk = await subscription.chunks.get()
+                if chunk is _END_OF_STREAM:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            subscription.close()
+
+    async def get_metrics(self, cloud_watch_metric: CloudWatchMetric) -> List[Dict]:
+        datapoints = []
+        async for chunk in self.stream_metrics(cloud_watch_metric):
+            datapoints.extend(chunk)
+
+        return datapoints
+
+    async def get_metrics_batch(self, cloud_watch_metrics: List[CloudWatchMetric]) -> List[List[Dict]]:
+        """Fetch several metrics at once, returning their datapoints in the same order."""
+        return list(await asyncio.gather(*[self.get_metrics(metric) for metric in cloud_watch_metrics]))
+
+    async def get_fleet_metrics(
+        self, fleet_query: FleetMetricQuery, resource_ids: Optional[List[str]] = None
+    ) -> Dict[str, MetricSeries]:
+        """
+        Fetch a metric for every resource of a namespace with one SEARCH expression.
+
+        Returns the series of each resource keyed by the value of its resource dimension;
+        series sharing a resource are merged. SEARCH stops at 500 series, so when resource_ids
+        are given and the search came back full, the resources it missed are fetched through
+        the regular batched queries instead. With resource_ids, every id is present in the result.
+        """
+        query = {
+            "Id": "fleet",
+            "Expression": self._build_search_expression(fleet_query),
+            "Label": f"${{PROP('Dim.{fleet_query.dimension_name}')}}",
+            "ReturnData": True,
+        }
+
+        chunks: Dict[str, List[MetricSeries]] = {}
+        async with self._client_manager as manager:
+            async with manager.get_client("cloudwatch") as cw:
+                async for metric_results in self._paginate(
+                    cw, [query], self._align(fleet_query.start_time), self._align(fleet_query.end_time)
+                ):
+                    for metric_result in metric_results:
+                        label = metric_result.get("Label")
+                        if label:
+                            chunks.setdefault(label, []).append(
+                                self._to_series(
+                                    fleet_query.unit,
+                                    metric_result.get("Timestamps", []),
+                                    metric_result.get("Values", []),
+                                )
+                            )
+
+        series = {label: MetricSeries.concat(parts, fleet_query.unit) for label, parts in chunks.items()}
+        if resource_ids is None:
+            return series
+
+        fleet_metrics = {
+            resource_id: series.get(resource_id) or MetricSeries.empty(fleet_query.unit) for resource_id in resource_ids
+        }
+        if len(series) >= CLOUDWATCH_MAX_SEARCH_RESULTS:
+            missing = [resource_id for resource_id in resource_ids if resource_id not in series]
+            fallback = await self.get_metric_series_batch(
+                [self._to_resource_metric(fleet_query, resource_id) for resource_id in missing]
+            )
+            fleet_metrics.update(zip(missing, fallback))
+
+        return fleet_metrics
+
+    @staticmethod
+    def _build_search_expression(fleet_query: FleetMetricQuery) -> str:
+        schema = ",".join([fleet_query.namespace, fleet_query.dimension_name, *fleet_query.schema_dimensions])
+        terms = [f'MetricName="{fleet_query.metric_name}"']
+        terms.extend(f'{name}="{value}"' for name, value in fleet_query.filters.items())
+        return f"SEARCH('{{{schema}}} {' '.join(terms)}', '{fleet_query.statistic}', {fleet_query.period})"
+
+    @staticmethod
+    def _to_resource_metric(fleet_query: FleetMetricQuery, resource_id: str) -> CloudWatchMetric:
+        dimensions = [{"Name": fleet_query.dimension_name, "Value": resource_id}]
+        dimensions.extend({"Name": name, "Value": value} for name, value in fleet_query.filters.items())
+        return CloudWatchMetric(
+            namespace=fleet_query.namespace,
+            metric_name=fleet_query.metric_name,
+            dimensions=dimensions,
+            start_time=fleet_query.start_time,
+            end_time=fleet_query.end_time,
+            period=fleet_query.period,
+            statistics=[fleet_query.statistic],
+            unit=fleet_query.unit,
+        )
+
+    @staticmethod
+    def _has_valid_dimensions(cloud_watch_metric: CloudWatchMetric) -> bool:
+        return all(dim.get("Name") and dim.get("Value") for dim in cloud_watch_metric.dimensions)
+
+    @staticmethod
+    def _align(timestamp: datetime) -> datetime:
+        # Callers compute their window from utcnow(), so two otherwise identical
+        # windows differ by microseconds. Aligning to the minute lets them share a batch.
+        return timestamp.replace(second=0, microsecond=0)
+
+    @staticmethod
+    def _stat(cloud_watch_metric: CloudWatchMetric) -> str:
+        return cloud_watch_metric.statistics[0] if cloud_watch_metric.statistics else "Maximum"
+
+    @staticmethod
+    def _build_query(query_id: str, cloud_watch_metric: CloudWatchMetric) -> Dict:
         # Convert dimensions to the format expected by get_metric_data
         dimensions_dict = {}
         for dim in cloud_watch_metric.dimensions:
             dimensions_dict[dim["Name"]] = dim["Value"]
 
-        # Create MetricDataQueries structure for get_metric_data API
-        metric_data_queries = [
-            {
-                "Id": "m1",
-                "MetricStat": {
-                    "Metric": {
-                        "Namespace": cloud_watch_metric.namespace,
-                        "MetricName": cloud_watch_metric.metric_name,
-                        "Dimensions": [{"Name": name, "Value": value} for name, value in dimensions_dict.items()],
-                    },
-                    "Period": cloud_watch_metric.period,
-                    "Stat": cloud_watch_metric.statistics[0] if cloud_watch_metric.statistics else "Maximum",
-                    "Unit": cloud_watch_metric.unit,
+        return {
+            "Id": query_id,
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": cloud_watch_metric.namespace,
+                    "MetricName": cloud_watch_metric.metric_name,
+                    "Dimensions": [{"Name": name, "Value": value} for name, value in dimensions_dict.items()],
                 },
-                "ReturnData": True,
-            }
-        ]
+                "Period": cloud_watch_metric.period,
+                "Stat": CloudWatch._stat(cloud_watch_metric),
+                "Unit": cloud_watch_metric.unit,
+            },
+            "ReturnData": True,
+        }
 
-        async with self._client_manager as manager:
-            async with manager.get_client("cloudwatch") as cw:
-                cw_metric = await cw.get_metric_data(
-                    MetricDataQueries=metric_data_queries,
-                    StartTime=cloud_watch_metric.start_time,
-                    EndTime=cloud_watch_metric.end_time,
-                )
-
-        # Extract datapoints from the response
-        metric_results = cw_metric.get("MetricDataResults", [])
-        if metric_results:
-            data_points = metric_results[0].get("Values", [])
-            timestamps = metric_results[0].get("Timestamps", [])
-
-            # Combine values and timestamps into the expected format
-            combined_datapoints = []
-            for i, (value, timestamp) in enumerate(zip(data_points, timestamps)):
-                datapoint = {
-                    "Timestamp": timestamp,
-                    cloud_watch_metric.statistics[0] if cloud_watch_metric.statistics else "Maximum": value,
-                    "Unit": cloud_watch_metric.unit,
-                }
-                combined_datapoints.append(datapoint)
-
-            return combined_datapoints
-
-        return []
+    @staticmethod
+    def _to_datapoints(stat: str, unit: str, timestamps: List, values: List) -> List[Dict]:
+        # Combine values and timestamps into the expected format
+        return [{"Timestamp": timestamp, stat: value, "Unit": unit} for value, timestamp in zip(values, timestamps)]
+
+    @staticmethod
+    def _to_series(unit: str, timestamps: List, values: List) -> MetricSeries:
+        return MetricSeries(
+            np.fromiter(map(to_epoch, timestamps), dtype=np.int64, count=len(timestamps)),
+            np.asarray(values, dtype=np.float64),
+            unit,
+        )
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self._batch_window)
+
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+
+        # StartTime/EndTime are per request, so only metrics sharing a window can share a batch
+        windows: Dict[Tuple[datetime, datetime], List[_PendingMetric]] = {}
+        for pending_metric in pending:
+            metric = pending_metric.metric
+            windows.setdefault((self._align(metric.start_time), self._align(metric.end_time)), []).append(
+                pending_metric
+            )
+
+        try:
+            async with self._client_manager as manager:
+                async with manager.get_client("cloudwatch") as cw:
+                    await asyncio.gather(
+                        *[
+                            self._send_batch(
+                                cw, items[offset : offset + CLOUDWATCH_MAX_QUERIES_PER_REQUEST], start, end
+                            )
+                            for (start, end), items in windows.items()
+                            for offset in range(0, len(items), CLOUDWATCH_MAX_QUERIES_PER_REQUEST)
+                        ]
+                    )
+        except Exception as e:
+            for pending_metric in pending:
+                await self._finish(pending_metric, e)
+
+    @staticmethod
+    async def _paginate(cw, queries: List[Dict], start_time: datetime, end_time: datetime) -> AsyncIterator[List[Dict]]:
+        """Yield the MetricDataResults of every page of a GetMetricData request."""
+        kwargs = {
+            "MetricDataQueries": queries,
+            "StartTime": start_time,
+            "EndTime": end_time,
+            "MaxDatapoints": CLOUDWATCH_MAX_DATAPOINTS_PER_PAGE,
+        }
+
+        while True:
+            page = await cw.get_metric_data(**kwargs)
+            yield page.get("MetricDataResults", [])
+
+            next_token = page.get("NextToken")
+            if not next_token:
+                return
+            kwargs["NextToken"] = next_token
+
+    async def _send_batch(self, cw, batch: List[_PendingMetric], start_time: datetime, end_time: datetime):
+        queries = {f"m{idx}": pending_metric for idx, pending_metric in enumerate(batch, 1)}
+
+        try:
+            async for metric_results in self._paginate(
+                cw,
+                [self._build_query(query_id, pending_metric.metric) for query_id, pending_metric in queries.items()],
+                start_time,
+                end_time,
+            ):
+                for metric_result in metric_results:
+                    pending_metric = queries.get(metric_result.get("Id"))
+                    if pending_metric is None:
+                        continue
+                    values = metric_result.get("Values", [])
+                    if values:
+                        await pending_metric.put((metric_result.get("Timestamps", []), values))
+        except Exception as e:
+            for pending_metric in batch:
+                await self._finish(pending_metric, e)
+            return
+
+        for pending_metric in batch:
+            await self._finish(pending_metric, _END_OF_STREAM)
+
+    async def _finish(self, pending_metric: _PendingMetric, item):
+        await pending_metric.put(item)
+        if self._in_flight.get(pending_metric.key) is pending_metric:
+            del self._in_flight[pending_metric.key]
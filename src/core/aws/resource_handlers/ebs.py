@@ -1,32 +1,198 @@
+import asyncio
 from dataclasses import dataclass
-from typing import Dict
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
+import numpy as np
+
+from src.core.aws.config import Config
+from src.core.aws.constants import EBS_IDLE_LOOKBACK_DAYS
+from src.core.aws.resource_handlers.cloudwatch import CloudWatch
 from src.core.aws.resource_handlers.resource_handler import ResourceHandler
-from src.core.utils import AsyncClientManager
+from src.core.utils import AsyncClientManager, get_logger, paginate
+from src.models.cloudwatch import CloudWatchMetric, FleetMetricQuery, MetricSeries
+from src.models.finding import Finding
+
+logger = get_logger()
+
+# I/O metrics an attached volume must be quiet on to count as idle
+EBS_IO_METRICS = ("VolumeReadOps", "VolumeWriteOps")
 
 
 @dataclass
 class EbsResourceHandlers(ResourceHandler):
-    def __init__(self, region_name: str):
+    resource_types = ("unused_ebs_volumes", "idle_ebs_volumes", "errors")
+
+    def __init__(
+        self,
+        region_name: str,
+        use_fleet_metrics: bool = False,
+        client_manager: Optional[AsyncClientManager] = None,
+        idle_iops_threshold: Optional[float] = None,
+    ):
         self.region_name = region_name
-        self._client_manager = AsyncClientManager(region_name)
+        self._use_fleet_metrics = use_fleet_metrics
+        self._client_manager = client_manager or AsyncClientManager(region_name)
+        self._cw = CloudWatch(region_name=region_name, client_manager=self._client_manager)
+        self._idle_iops_threshold = (
+            Config().get_ebs_idle_iops_threshold if idle_iops_threshold is None else idle_iops_threshold
+        )
 
-    async def find_under_utilized_resource(self) -> Dict:
+    async def _stream_volumes(self, status: str) -> AsyncIterator[List[Dict]]:
         async with self._client_manager as manager:
             async with manager.get_client("ec2") as ec2:
-                volumes = await ec2.describe_volumes(Filters=[{"Name": "status", "Values": ["available"]}])
-                volumes = volumes.get("Volumes", [])
-
-        unused_vols = []
-        for vol in volumes:
-            unused_vols.append(
-                {
-                    "VolumeId": vol["VolumeId"],
-                    "Size": vol["Size"],
-                    "State": vol["State"],
-                    "AvailabilityZone": vol["AvailabilityZone"],
-                    "CreateTime": str(vol["CreateTime"]),
-                }
+                async for volumes in paginate(
+                    ec2, "ec2", "describe_volumes", Filters=[{"Name": "status", "Values": [status]}]
+                ):
+                    yield volumes
+
+    async def _stream_available_volumes(self) -> AsyncIterator[List[Dict]]:
+        async for volumes in self._stream_volumes("available"):
+            yield volumes
+
+    async def _stream_in_use_volumes(self) -> AsyncIterator[List[Dict]]:
+        async for volumes in self._stream_volumes("in-use"):
+            yield volumes
+
+    async def _get_io_series(self, volume_ids: List[str], start_time: datetime, end_time: datetime) -> List[List]:
+        """Daily sums of every I/O metric, one list of series per metric in the order of volume_ids."""
+        if self._use_fleet_metrics:
+            fleet_metrics = await asyncio.gather(
+                *(
+                    self._cw.get_fleet_metrics(
+                        FleetMetricQuery(
+                            namespace="AWS/EBS",
+                            metric_name=metric_name,
+                            dimension_name="VolumeId",
+                            start_time=start_time,
+                            end_time=end_time,
+                            period=86400,
+                            statistic="Sum",
+                        ),
+                        volume_ids,
+                    )
+                    for metric_name in EBS_IO_METRICS
+                )
+            )
+            return [[series[volume_id] for volume_id in volume_ids] for series in fleet_metrics]
+
+        # Queued together, the queries of a page fill GetMetricData requests of 500
+        return await asyncio.gather(
+            *(
+                self._cw.get_metric_series_batch(
+                    [
+                        CloudWatchMetric(
+                            namespace="AWS/EBS",
+                            metric_name=metric_name,
+                            dimensions=[{"Name": "VolumeId", "Value": volume_id}],
+                            start_time=start_time,
+                            end_time=end_time,
+                            period=86400,
+                            statistics=["Sum"],
+                        )
+                        for volume_id in volume_ids
+                    ]
+                )
+                for metric_name in EBS_IO_METRICS
             )
+        )
+
+    @staticmethod
+    def _peak_daily_iops(io_series: List[MetricSeries]) -> Optional[float]:
+        """Average IOPS of the busiest day, with reads and writes of the same day added up, or None without data."""
+        timestamps = np.concatenate([series.timestamps for series in io_series])
+        if not len(timestamps):
+            return None
+        values = np.concatenate([series.values for series in io_series])
+        _, day = np.unique(timestamps, return_inverse=True)
+        return float(np.bincount(day, weights=values).max() / 86400)
+
+    async def _get_idle_volumes(self, volumes: List[Dict]) -> List[Tuple[Dict, Dict[str, float]]]:
+        """Return the volumes below the IOPS threshold on every day of the lookback window, with their I/O."""
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=EBS_IDLE_LOOKBACK_DAYS)
+        # Volumes younger than the window have not had the chance to prove idle
+        window_start = start_time.replace(tzinfo=timezone.utc)
+        volumes = [
+            volume
+            for volume in volumes
+            if not isinstance(volume.get("CreateTime"), datetime) or volume["CreateTime"] <= window_start
+        ]
+        if not volumes:
+            return []
+
+        io_series = await self._get_io_series([volume["VolumeId"] for volume in volumes], start_time, end_time)
+
+        idle_volumes = []
+        for volume, volume_series in zip(volumes, zip(*io_series)):
+            peak_iops = self._peak_daily_iops(volume_series)
+            if peak_iops is None:
+                # Missing I/O metrics leave the volume's activity unknown, not idle
+                logger.debug(f"No I/O metrics for volume {volume['VolumeId']}, skipping")
+            elif peak_iops < self._idle_iops_threshold:
+                io = {metric_name: series.sum() for metric_name, series in zip(EBS_IO_METRICS, volume_series)}
+                idle_volumes.append((volume, {**io, "PeakDailyIOPS": peak_iops}))
+        return idle_volumes
+
+    async def _stream_idle_checks(
+        self,
+    ) -> AsyncIterator[Tuple[List[Dict], Union[List[Tuple[Dict, Dict[str, float]]], Exception]]]:
+        """Yield each checked page of in-use volumes with its idle volumes, or with the error that failed it."""
+
+        async def check(volumes: List[Dict]):
+            try:
+                return volumes, await self._get_idle_volumes(volumes)
+            except Exception as e:
+                return volumes, e
+
+        if self._use_fleet_metrics:
+            # One SEARCH per metric covers every volume, so the inventory is collected first
+            volumes = [volume async for page in self._stream_in_use_volumes() for volume in page]
+            yield await check(volumes)
+            return
+
+        tasks = []
+        try:
+            async for volumes in self._stream_in_use_volumes():
+                tasks.append(asyncio.create_task(check(volumes)))
+
+            for next_check in asyncio.as_completed(tasks):
+                yield await next_check
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _to_finding(self, vol: Dict, reason: str, metrics: Optional[Dict[str, float]] = None) -> Finding:
+        attributes = {
+            "VolumeType": vol.get("VolumeType"),
+            "Size": vol["Size"],
+            "State": vol["State"],
+            "AvailabilityZone": vol["AvailabilityZone"],
+            "CreateTime": str(vol["CreateTime"]),
+        }
+        if vol.get("Attachments"):
+            attributes["InstanceId"] = ", ".join(attachment["InstanceId"] for attachment in vol["Attachments"])
+        return Finding(
+            resource_id=vol["VolumeId"],
+            resource_type="AWS::EC2::Volume",
+            region=self.region_name,
+            reason=reason,
+            metrics=metrics or {},
+            attributes=attributes,
+        )
+
+    async def stream_under_utilized_resources(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        async for volumes in self._stream_available_volumes():
+            for vol in volumes:
+                yield "unused_ebs_volumes", self._to_finding(vol, "Volume is not attached to any instance")
+
+        reason = f"Attached volume stayed below {self._idle_iops_threshold:g} IOPS every day for {EBS_IDLE_LOOKBACK_DAYS} days"
+        async for volumes, idle_volumes in self._stream_idle_checks():
+            if isinstance(idle_volumes, Exception):
+                logger.error(f"Failed to fetch I/O metrics for {len(volumes)} volumes: {idle_volumes}")
+                for vol in volumes:
+                    yield "errors", {"VolumeId": vol["VolumeId"], "Error": str(idle_volumes)}
+                continue
 
-        return {"unused_ebs_volumes": unused_vols}
+            for vol, io in idle_volumes:
+                yield "idle_ebs_volumes", self._to_finding(vol, reason, io)
@@ -1,23 +1,60 @@
+import asyncio
 from dataclasses import dataclass
-from typing import Dict, List
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
+from src.core.aws.constants import MAX_CONCURRENT_HEALTH_CHECKS
+from src.core.aws.resource_handlers.cloudwatch import CloudWatch
 from src.core.aws.resource_handlers.resource_handler import ResourceHandler
-from src.core.utils import get_logger, AsyncClientManager
+from src.core.utils import get_logger, paginate, AsyncClientManager
+from src.models.cloudwatch import CloudWatchMetric, FleetMetricQuery, MetricSeries
+from src.models.finding import Finding
 
 logger = get_logger()
 
+# Traffic metrics per ELBv2 load balancer type, as (namespace, [(metric name, unit)]). A load balancer
+# is idle when every one of them sums to zero; gateway load balancers report no comparable traffic.
+ELBV2_TRAFFIC_METRICS = {
+    "application": ("AWS/ApplicationELB", [("RequestCount", "Count"), ("ProcessedBytes", "Bytes")]),
+    "network": ("AWS/NetworkELB", [("ActiveFlowCount", "Count"), ("ProcessedBytes", "Bytes")]),
+}
+
+# Target states that do not count against a target group. Lambda targets and groups with health
+# checks disabled report "unavailable", which says nothing about whether the target can serve.
+AVAILABLE_TARGET_STATES = ("healthy", "unavailable")
+
 
 @dataclass
 class LoadBalancerResourceHandlers(ResourceHandler):
-    def __init__(self, region_name: str):
+    resource_types = (
+        "no_targets_lb",
+        "all_unhealthy",
+        "idle_lb",
+        "elbv2_no_healthy_targets",
+        "idle_elbv2",
+        "errors",
+    )
+
+    def __init__(
+        self,
+        region_name: str,
+        use_fleet_metrics: bool = False,
+        client_manager: Optional[AsyncClientManager] = None,
+    ):
         self.region_name = region_name
-        self._client_manager = AsyncClientManager(region_name)
+        self._use_fleet_metrics = use_fleet_metrics
+        self._client_manager = client_manager or AsyncClientManager(region_name)
+        self._cw = CloudWatch(region_name=region_name, client_manager=self._client_manager)
+        self._health_check_semaphore = asyncio.Semaphore(MAX_CONCURRENT_HEALTH_CHECKS)
 
-    async def _get_list(self):
+    async def _stream_pages(self) -> AsyncIterator[List[Dict]]:
         async with self._client_manager as manager:
             async with manager.get_client("elb") as elb:
-                response = await elb.describe_load_balancers()
-                return response.get("LoadBalancerDescriptions", [])
+                async for lb_list in paginate(elb, "elb", "describe_load_balancers"):
+                    yield lb_list
+
+    async def _get_list(self):
+        return [lb async for lb_list in self._stream_pages() for lb in lb_list]
 
     @staticmethod
     def _get_lb_with_no_targets(lb_list: List[Dict]):
@@ -29,43 +66,327 @@ class LoadBalancerResourceHandlers(ResourceHandler):
 
         return lb_with_no_targets
 
-    async def _get_lb_with_all_unhealthy_targets(self, lb_list: List[Dict]):
-        lb_with_all_unhealthy_targets = []
+    async def _get_lb_with_all_unhealthy_targets(self, lb_list: List[Dict], errors: Optional[List[Dict]] = None):
+        unhealthy_lb = []
+        async for resource_type, lb in self._stream_lb_with_all_unhealthy_targets(lb_list):
+            if resource_type != "errors":
+                unhealthy_lb.append(lb)
+            elif errors is not None:
+                errors.append(lb)
+        return unhealthy_lb
+
+    async def _is_all_unhealthy(self, elb, lb: Dict) -> bool:
+        async with self._health_check_semaphore:
+            health_response = await elb.describe_instance_health(LoadBalancerName=lb["LoadBalancerName"])
+
+        instances = health_response.get("InstanceStates", [])
+        return bool(instances) and all(instance.get("State") == "OutOfService" for instance in instances)
+
+    async def _stream_lb_with_all_unhealthy_targets(self, lb_list: List[Dict]) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield load balancers whose instances are all OutOfService, and failed checks, as each check finishes."""
+        # Load balancers without instances have no health to check
+        lb_list = [lb for lb in lb_list if lb.get("LoadBalancerName") and lb.get("Instances")]
 
         async with self._client_manager as manager:
             async with manager.get_client("elb") as elb:
-                for lb in lb_list:
-                    lb_name = lb.get("LoadBalancerName")
-                    if not lb_name:
-                        continue
-
-                    # Skip load balancers with no instances
-                    if not lb.get("Instances"):
-                        continue
 
+                async def check(lb: Dict):
                     try:
-                        health_response = await elb.describe_instance_health(LoadBalancerName=lb_name)
-                        instances = health_response.get("InstanceStates", [])
+                        return lb, await self._is_all_unhealthy(elb, lb)
+                    except Exception as e:
+                        return lb, e
 
-                        if not instances:
-                            continue
+                tasks = [asyncio.create_task(check(lb)) for lb in lb_list]
+                try:
+                    for next_check in asyncio.as_completed(tasks):
+                        lb, all_unhealthy = await next_check
+                        if isinstance(all_unhealthy, Exception):
+                            # A failed check means "unknown", not "healthy": report it instead of dropping the LB
+                            logger.error(
+                                f"Error checking health for load balancer {lb['LoadBalancerName']}: {all_unhealthy}"
+                            )
+                            yield "errors", {"LoadBalancerName": lb["LoadBalancerName"], "Error": str(all_unhealthy)}
+                        elif all_unhealthy:
+                            yield "all_unhealthy", lb
+                finally:
+                    for task in tasks:
+                        task.cancel()
 
-                        all_unhealthy = all(instance.get("State") == "OutOfService" for instance in instances)
+    async def _get_idle_lb(self, lb_list: List[Dict]):
+        # RequestCount is only reported for HTTP/HTTPS listeners, so TCP-only load balancers are skipped
+        http_lb_list = [
+            lb
+            for lb in lb_list
+            if lb.get("LoadBalancerName")
+            and any(
+                listener.get("Listener", {}).get("Protocol") in ("HTTP", "HTTPS")
+                for listener in lb.get("ListenerDescriptions", [])
+            )
+        ]
+        lb_names = [lb["LoadBalancerName"] for lb in http_lb_list]
 
-                        if all_unhealthy:
-                            lb_with_all_unhealthy_targets.append(lb)
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=7)
 
-                    except Exception as e:
-                        logger.info(f"Error checking health for load balancer {lb_name}: {e}")
-                        continue
+        if self._use_fleet_metrics:
+            fleet_query = FleetMetricQuery(
+                namespace="AWS/ELB",
+                metric_name="RequestCount",
+                dimension_name="LoadBalancerName",
+                start_time=start_time,
+                end_time=end_time,
+                period=86400,
+                statistic="Sum",
+            )
+            request_metrics = await self._cw.get_fleet_metrics(fleet_query, lb_names)
+            request_counts = [request_metrics[lb_name] for lb_name in lb_names]
+        else:
+            request_counts = await self._cw.get_metric_series_batch(
+                [
+                    CloudWatchMetric(
+                        namespace="AWS/ELB",
+                        metric_name="RequestCount",
+                        dimensions=[{"Name": "LoadBalancerName", "Value": lb_name}],
+                        start_time=start_time,
+                        end_time=end_time,
+                        period=86400,
+                        statistics=["Sum"],
+                    )
+                    for lb_name in lb_names
+                ]
+            )
+
+        return [lb for lb, request_count in zip(http_lb_list, request_counts) if request_count.sum() == 0]
+
+    def _to_finding(self, lb: Dict, reason: str, metrics: Optional[Dict[str, float]] = None) -> Finding:
+        return Finding(
+            resource_id=lb["LoadBalancerName"],
+            resource_type="AWS::ElasticLoadBalancing::LoadBalancer",
+            region=self.region_name,
+            reason=reason,
+            metrics=metrics or {},
+            attributes={
+                "DNSName": lb.get("DNSName"),
+                "Scheme": lb.get("Scheme"),
+                "VPCId": lb.get("VPCId"),
+                "Instances": len(lb.get("Instances", [])),
+                "CreatedTime": lb.get("CreatedTime"),
+            },
+        )
+
+    async def _get_elbv2_list(self) -> List[Dict]:
+        async with self._client_manager as manager:
+            async with manager.get_client("elbv2") as elbv2:
+                return [lb async for lb_list in paginate(elbv2, "elbv2", "describe_load_balancers") for lb in lb_list]
+
+    async def _get_target_groups(self) -> List[Dict]:
+        async with self._client_manager as manager:
+            async with manager.get_client("elbv2") as elbv2:
+                return [tg async for tg_list in paginate(elbv2, "elbv2", "describe_target_groups") for tg in tg_list]
+
+    async def _count_healthy_targets(self, elbv2, target_group: Dict) -> int:
+        async with self._health_check_semaphore:
+            health_response = await elbv2.describe_target_health(TargetGroupArn=target_group["TargetGroupArn"])
+
+        return sum(
+            1
+            for description in health_response.get("TargetHealthDescriptions", [])
+            if description.get("TargetHealth", {}).get("State") in AVAILABLE_TARGET_STATES
+        )
+
+    async def _stream_elbv2_with_no_healthy_targets(
+        self, lb_list: List[Dict], target_groups: List[Dict]
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield load balancers none of whose target groups has a healthy target, and failed lookups."""
+        async with self._client_manager as manager:
+            async with manager.get_client("elbv2") as elbv2:
+                healthy_counts = await asyncio.gather(
+                    *(self._count_healthy_targets(elbv2, target_group) for target_group in target_groups),
+                    return_exceptions=True,
+                )
+
+        healthy_targets: Dict[str, int] = {}
+        # Load balancers behind a failed lookup are unknown, not unhealthy, so they are not flagged
+        unknown = set()
+        for target_group, healthy_count in zip(target_groups, healthy_counts):
+            if isinstance(healthy_count, Exception):
+                logger.error(f"Error checking target health for {target_group['TargetGroupArn']}: {healthy_count}")
+                yield "errors", {"TargetGroupArn": target_group["TargetGroupArn"], "Error": str(healthy_count)}
+                unknown.update(target_group.get("LoadBalancerArns", []))
+                continue
+
+            for lb_arn in target_group.get("LoadBalancerArns", []):
+                healthy_targets[lb_arn] = healthy_targets.get(lb_arn, 0) + healthy_count
+
+        for lb in lb_list:
+            if lb["LoadBalancerArn"] not in unknown and healthy_targets.get(lb["LoadBalancerArn"], 0) == 0:
+                yield "elbv2_no_healthy_targets", lb
+
+    @staticmethod
+    def _get_metric_dimension(lb: Dict) -> str:
+        # CloudWatch identifies ELBv2 load balancers by the ARN suffix, e.g. "app/my-lb/50dc6c495c0c9188"
+        return lb["LoadBalancerArn"].split(":loadbalancer/", 1)[-1]
+
+    async def _get_elbv2_traffic(
+        self,
+        namespace: str,
+        metric_name: str,
+        unit: str,
+        dimensions: List[str],
+        start_time: datetime,
+        end_time: datetime,
+    ) -> List[MetricSeries]:
+        """Daily sums of one traffic metric for each load balancer, keyed by its metric dimension."""
+        if self._use_fleet_metrics:
+            fleet_query = FleetMetricQuery(
+                namespace=namespace,
+                metric_name=metric_name,
+                dimension_name="LoadBalancer",
+                start_time=start_time,
+                end_time=end_time,
+                period=86400,
+                statistic="Sum",
+                unit=unit,
+            )
+            fleet_metrics = await self._cw.get_fleet_metrics(fleet_query, dimensions)
+            return [fleet_metrics[dimension] for dimension in dimensions]
+
+        return await self._cw.get_metric_series_batch(
+            [
+                CloudWatchMetric(
+                    namespace=namespace,
+                    metric_name=metric_name,
+                    dimensions=[{"Name": "LoadBalancer", "Value": dimension}],
+                    start_time=start_time,
+                    end_time=end_time,
+                    period=86400,
+                    statistics=["Sum"],
+                    unit=unit,
+                )
+                for dimension in dimensions
+            ]
+        )
+
+    async def _get_idle_elbv2(self, lb_list: List[Dict]) -> List[Tuple[Dict, Dict[str, float]]]:
+        """Return the load balancers with no traffic in the last 7 days, with their traffic totals."""
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=7)
+
+        lb_by_type = {lb_type: [lb for lb in lb_list if lb.get("Type") == lb_type] for lb_type in ELBV2_TRAFFIC_METRICS}
+        checks = [
+            (lb_type, metric_name, unit)
+            for lb_type, (_, metrics) in ELBV2_TRAFFIC_METRICS.items()
+            if lb_by_type[lb_type]
+            for metric_name, unit in metrics
+        ]
+
+        # Every metric of every load balancer type is requested at once
+        traffic = await asyncio.gather(
+            *(
+                self._get_elbv2_traffic(
+                    ELBV2_TRAFFIC_METRICS[lb_type][0],
+                    metric_name,
+                    unit,
+                    [self._get_metric_dimension(lb) for lb in lb_by_type[lb_type]],
+                    start_time,
+                    end_time,
+                )
+                for lb_type, metric_name, unit in checks
+            )
+        )
+
+        totals: Dict[str, Dict[str, float]] = {}
+        for (lb_type, metric_name, _), metric_series in zip(checks, traffic):
+            for lb, series in zip(lb_by_type[lb_type], metric_series):
+                totals.setdefault(lb["LoadBalancerArn"], {})[metric_name] = series.sum()
+
+        return [
+            (lb, totals[lb["LoadBalancerArn"]])
+            for lb in lb_list
+            if lb["LoadBalancerArn"] in totals and not any(totals[lb["LoadBalancerArn"]].values())
+        ]
+
+    def _to_elbv2_finding(self, lb: Dict, reason: str, metrics: Optional[Dict[str, float]] = None) -> Finding:
+        return Finding(
+            resource_id=lb["LoadBalancerName"],
+            resource_type="AWS::ElasticLoadBalancingV2::LoadBalancer",
+            region=self.region_name,
+            reason=reason,
+            metrics=metrics or {},
+            attributes={
+                "Type": lb.get("Type"),
+                "LoadBalancerArn": lb["LoadBalancerArn"],
+                "DNSName": lb.get("DNSName"),
+                "Scheme": lb.get("Scheme"),
+                "VPCId": lb.get("VpcId"),
+                "CreatedTime": lb.get("CreatedTime"),
+            },
+        )
+
+    @staticmethod
+    async def _stream_idle_results(lb_list: List[Dict], idle_task: asyncio.Task) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield the idle load balancers found by an idle check, or an error for each one it covered."""
+        try:
+            idle = await idle_task
+        except Exception as e:
+            # A failed traffic check means "unknown", not "busy": report it and let the other passes run
+            logger.error(f"Error checking traffic for {len(lb_list)} load balancers: {e}")
+            for lb in lb_list:
+                yield "errors", {"LoadBalancerName": lb.get("LoadBalancerName"), "Error": str(e)}
+            return
+
+        for lb in idle:
+            yield "idle", lb
+
+    async def _stream_elbv2(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        lb_list, target_groups = await asyncio.gather(self._get_elbv2_list(), self._get_target_groups())
+
+        # The traffic check is one batched CloudWatch query, so it runs while target health is fetched
+        idle_task = asyncio.create_task(self._get_idle_elbv2(lb_list))
+        try:
+            async for resource_type, lb in self._stream_elbv2_with_no_healthy_targets(lb_list, target_groups):
+                if resource_type != "errors":
+                    lb = self._to_elbv2_finding(lb, "No target group has a healthy target")
+                yield resource_type, lb
+
+            async for resource_type, lb in self._stream_idle_results(lb_list, idle_task):
+                if resource_type != "errors":
+                    lb, metrics = lb
+                    lb = self._to_elbv2_finding(lb, "No traffic in the last 7 days", metrics)
+                yield resource_type, lb
+        finally:
+            idle_task.cancel()
+
+    async def _stream_classic(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        idle_tasks = []
+        try:
+            async for lb_list in self._stream_pages():
+                # The idle check is one batched CloudWatch query per page, so it runs while health checks stream in
+                idle_tasks.append((lb_list, asyncio.create_task(self._get_idle_lb(lb_list))))
 
-        return lb_with_all_unhealthy_targets
+                for lb in self._get_lb_with_no_targets(lb_list):
+                    yield "no_targets_lb", self._to_finding(lb, "No instances are registered")
 
-    async def find_under_utilized_resource(self) -> Dict:
-        lb_list = await self._get_list()
-        no_targets = self._get_lb_with_no_targets(lb_list)
-        all_unhealthy = await self._get_lb_with_all_unhealthy_targets(lb_list)
+                async for resource_type, lb in self._stream_lb_with_all_unhealthy_targets(lb_list):
+                    if resource_type != "errors":
+                        lb = self._to_finding(lb, "All registered instances are OutOfService")
+                    yield resource_type, lb
 
-        underutilized_resource = {"no_targets_lb": no_targets, "all_unhealthy": all_unhealthy}
+            for lb_list, idle_task in idle_tasks:
+                async for resource_type, lb in self._stream_idle_results(lb_list, idle_task):
+                    if resource_type != "errors":
+                        lb = self._to_finding(lb, "No requests in the last 7 days", {"RequestCount": 0.0})
+                    yield resource_type, lb
+        finally:
+            for _, idle_task in idle_tasks:
+                idle_task.cancel()
 
-        return underutilized_resource
+    async def stream_under_utilized_resources(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        # A pass that fails, e.g. on a denied listing, is reported without stopping the other one
+        for kind, stream_pass in (("classic", self._stream_classic), ("ELBv2", self._stream_elbv2)):
+            try:
+                async for finding in stream_pass():
+                    yield finding
+            except Exception as e:
+                logger.error(f"Failed to scan {kind} load balancers: {e}")
+                yield "errors", {"LoadBalancerName": None, "Error": str(e)}
@@ -1,109 +1,220 @@
 import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
 from src.core.aws.resource_handlers.cloudwatch import CloudWatch
 from src.core.aws.resource_handlers.resource_handler import ResourceHandler
-from src.core.utils import get_logger, AsyncClientManager
-from src.models.cloudwatch import CloudWatchMetric
+from src.core.utils import get_logger, paginate, AsyncClientManager
+from src.models.cloudwatch import CloudWatchMetric, FleetMetricQuery
+from src.models.finding import Finding
 
 logger = get_logger()
 
+# Resource type reported for an idle cluster or instance, keyed by the dimension it is checked by.
+RESOURCE_TYPES_BY_DIMENSION = {
+    "DBClusterIdentifier": "rds_with_no_connections",
+    "DBInstanceIdentifier": "rds_instances_with_no_connections",
+}
+
+# DocumentDB and Neptune are listed by the RDS API too, but publish their metrics outside AWS/RDS
+NON_RDS_ENGINES = ("docdb", "neptune")
+
 
 @dataclass
 class RdsHandler(ResourceHandler):
-    def __init__(self, region_name: str):
+    resource_types = ("rds_with_no_connections", "rds_instances_with_no_connections", "errors")
+
+    def __init__(
+        self,
+        region_name: str,
+        use_fleet_metrics: bool = False,
+        client_manager: Optional[AsyncClientManager] = None,
+    ):
         self.region_name = region_name
-        self._cw = CloudWatch(region_name=region_name)
-        self._client_manager = AsyncClientManager(region_name)
+        self._use_fleet_metrics = use_fleet_metrics
+        self._client_manager = client_manager or AsyncClientManager(region_name)
+        self._cw = CloudWatch(region_name=region_name, client_manager=self._client_manager)
 
-    async def _list_get(self):
+    async def _stream_pages(self) -> AsyncIterator[List[Dict]]:
         async with self._client_manager as manager:
             async with manager.get_client("rds") as rds:
-                rds_list = await rds.describe_db_instances()
-                return rds_list.get("DBInstances", [])
+                async for rds_list in paginate(rds, "rds", "describe_db_instances"):
+                    yield [instance for instance in rds_list if instance.get("Engine") not in NON_RDS_ENGINES]
 
-    async def _get_max_connection_for_instance(self, instance_id: str):
+    async def _list_get(self):
+        return [rds async for rds_list in self._stream_pages() for rds in rds_list]
+
+    async def _get_clusters(self) -> List[Dict]:
+        async with self._client_manager as manager:
+            async with manager.get_client("rds") as rds:
+                return [
+                    cluster
+                    async for clusters in paginate(rds, "rds", "describe_db_clusters")
+                    for cluster in clusters
+                    if cluster.get("Engine") not in NON_RDS_ENGINES
+                ]
+
+    async def _get_max_datapoint(self, cloudwatch_metric: CloudWatchMetric) -> Optional[float]:
+        # Keep a running maximum over the streamed pages instead of buffering the whole series.
+        # A resource without datapoints (e.g. a stopped instance) has no known maximum.
+        max_value = None
+        async for series in self._cw.stream_metric_series(cloudwatch_metric):
+            if len(series):
+                max_value = max(max_value or 0.0, series.max())
+
+        return max_value
+
+    async def _get_max_connections(self, dimension_name: str, resource_id: str):
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(minutes=120)
 
         cloudwatch_metric = CloudWatchMetric(
             namespace="AWS/RDS",
             metric_name="DatabaseConnections",
-            dimensions=[{"Name": "DBInstanceIdentifier", "Value": instance_id}],
+            dimensions=[{"Name": dimension_name, "Value": resource_id}],
             start_time=start_time,
             end_time=end_time,
         )
 
-        rds_instance_connection_metrics = await self._cw.get_metrics(cloudwatch_metric)
-
-        if not rds_instance_connection_metrics:
-            return 0
+        return await self._get_max_datapoint(cloudwatch_metric)
 
-        return max(metric.get("Maximum", 0) for metric in rds_instance_connection_metrics)
+    async def _get_max_connection_for_instance(self, instance_id: str):
+        return await self._get_max_connections("DBInstanceIdentifier", instance_id)
 
     async def _get_max_connections_for_cluster(self, cluster_id: str):
+        return await self._get_max_connections("DBClusterIdentifier", cluster_id)
+
+    async def _get_fleet_max_connections(self, dimension_name: str, resource_ids: List[str]) -> List[Optional[float]]:
+        """Fetch DatabaseConnections for every instance or cluster with one SEARCH query."""
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(minutes=120)
 
-        cloudwatch_metric = CloudWatchMetric(
+        fleet_query = FleetMetricQuery(
             namespace="AWS/RDS",
             metric_name="DatabaseConnections",
-            dimensions=[{"Name": "DBClusterIdentifier", "Value": cluster_id}],
+            dimension_name=dimension_name,
             start_time=start_time,
             end_time=end_time,
         )
 
-        rds_connection_metrics = await self._cw.get_metrics(cloudwatch_metric)
-
-        if not rds_connection_metrics:
-            return 0
-
-        return max(metric.get("Maximum", 0) for metric in rds_connection_metrics)
-
-    async def _get_rds_with_no_connections(self, rds_list: List[Dict]) -> List[Any]:
-        rds_with_no_connections = []
-
-        max_connection_tasks = []
-        for rds in rds_list:
-            max_connection_tasks.append(
-                asyncio.create_task(self._get_max_connections_for_cluster(rds.get("DBClusterIdentifier"))))
-
-        max_connections = await asyncio.gather(*max_connection_tasks, return_exceptions=True)
-
-        for idx in range(len(rds_list)):
-            max_connection = max_connections[idx]
-            rds = rds_list[idx]
-            if max_connection == 0:
-                rds_with_no_connections.append(rds)
-
-        return rds_with_no_connections
-
-    async def _get_rds_instances_with_no_connections(self, rds_list: List[Dict]):
-        rds_instances_with_no_connections = []
-
-        max_connection_tasks = []
-        for rds in rds_list:
-            max_connection_tasks.append(asyncio.create_task(self._get_max_connection_for_instance(rds.get("DBInstanceIdentifier"))))
-
-        max_connections = await asyncio.gather(*max_connection_tasks, return_exceptions=True)
-
-        for idx in range(len(rds_list)):
-            max_connection = max_connections[idx]
-            rds = rds_list[idx]
-            if max_connection == 0:
-                rds_instances_with_no_connections.append(rds)
-
-        return rds_instances_with_no_connections
-
-    async def find_under_utilized_resource(self) -> Dict:
-        rds_list = await self._list_get()
+        fleet_metrics = await self._cw.get_fleet_metrics(fleet_query, resource_ids)
+
+        return [fleet_metrics[resource_id].max(default=None) for resource_id in resource_ids]
+
+    async def _stream_fleet_checks(self) -> AsyncIterator[Tuple[Dict, str, Any]]:
+        clusters, instances = await asyncio.gather(self._get_clusters(), self._list_get(), return_exceptions=True)
+        if isinstance(instances, Exception):
+            raise instances
+        if isinstance(clusters, Exception):
+            # Instances are still checked when only the cluster listing fails
+            yield {}, "DBClusterIdentifier", clusters
+            clusters = []
+        passes = [("DBClusterIdentifier", clusters), ("DBInstanceIdentifier", instances)]
+
+        # One SEARCH query per pass, both in flight at once
+        results = await asyncio.gather(
+            *(
+                self._get_fleet_max_connections(dimension_name, [rds[dimension_name] for rds in rds_list])
+                for dimension_name, rds_list in passes
+            ),
+            return_exceptions=True,
+        )
 
-        rds_with_no_connections = await self._get_rds_with_no_connections(rds_list)
-        rds_instances_with_no_connections = await self._get_rds_instances_with_no_connections(rds_list)
+        for (dimension_name, rds_list), max_connections in zip(passes, results):
+            if isinstance(max_connections, Exception):
+                max_connections = [max_connections] * len(rds_list)
+            for rds, max_connection in zip(rds_list, max_connections):
+                yield rds, dimension_name, max_connection
+
+    async def _stream_checks(self) -> AsyncIterator[Tuple[Dict, str, Any]]:
+        async def check(rds: Dict, dimension_name: str):
+            try:
+                return rds, dimension_name, await self._get_max_connections(dimension_name, rds[dimension_name])
+            except Exception as e:
+                return rds, dimension_name, e
+
+        clusters_task = asyncio.create_task(self._get_clusters())
+        tasks = []
+        try:
+            # Instance checks start page by page while the clusters are still being listed
+            async for rds_list in self._stream_pages():
+                tasks.extend(asyncio.create_task(check(rds, "DBInstanceIdentifier")) for rds in rds_list)
+            try:
+                clusters = await clusters_task
+            except Exception as e:
+                # Instances are still checked when only the cluster listing fails
+                clusters = []
+                yield {}, "DBClusterIdentifier", e
+            tasks.extend(asyncio.create_task(check(cluster, "DBClusterIdentifier")) for cluster in clusters)
+
+            for next_check in asyncio.as_completed(tasks):
+                yield await next_check
+        finally:
+            clusters_task.cancel()
+            for task in tasks:
+                task.cancel()
+
+    async def _stream_connection_checks(self) -> AsyncIterator[Tuple[Dict, str, Any]]:
+        """
+        Yield every cluster and instance with the dimension it was checked by and its maximum
+        connections, or the lookup's exception, as each lookup finishes.
+
+        Clusters and instances are checked together, each with a single query, and every
+        per-resource query goes through the batched GetMetricData path.
+        """
+        checks = self._stream_fleet_checks() if self._use_fleet_metrics else self._stream_checks()
+        async for check in checks:
+            yield check
+
+    @staticmethod
+    def _to_error(rds: Dict, dimension_name: str, error: Exception) -> Dict:
+        if not rds:
+            # The listing itself failed, so no single resource can be named
+            logger.error(f"Failed to list resources by {dimension_name}: {error}")
+            return {dimension_name: None, "Error": str(error)}
+
+        # A failed lookup means "unknown", not "idle": report it instead of dropping the resource
+        logger.error(f"Failed to fetch DatabaseConnections for {rds.get(dimension_name)}: {error}")
+        return {dimension_name: rds.get(dimension_name), "Error": str(error)}
+
+    def _to_finding(self, rds: Dict, dimension_name: str) -> Finding:
+        if dimension_name == "DBClusterIdentifier":
+            return Finding(
+                resource_id=rds["DBClusterIdentifier"],
+                resource_type="AWS::RDS::DBCluster",
+                region=self.region_name,
+                reason="No connections in the last 2 hours",
+                metrics={"DatabaseConnections": 0.0},
+                attributes={
+                    "DBClusterMembers": ", ".join(
+                        member["DBInstanceIdentifier"] for member in rds.get("DBClusterMembers", [])
+                    ),
+                    "Engine": rds.get("Engine"),
+                    "EngineMode": rds.get("EngineMode"),
+                    "AllocatedStorage": rds.get("AllocatedStorage"),
+                    "MultiAZ": rds.get("MultiAZ"),
+                },
+            )
+
+        return Finding(
+            resource_id=rds["DBInstanceIdentifier"],
+            resource_type="AWS::RDS::DBInstance",
+            region=self.region_name,
+            reason="No connections in the last 2 hours",
+            metrics={"DatabaseConnections": 0.0},
+            attributes={
+                "DBClusterIdentifier": rds.get("DBClusterIdentifier"),
+                "DBInstanceClass": rds.get("DBInstanceClass"),
+                "Engine": rds.get("Engine"),
+                "AllocatedStorage": rds.get("AllocatedStorage"),
+                "MultiAZ": rds.get("MultiAZ"),
+            },
+        )
 
-        return {
-            "rds_with_no_connections": rds_with_no_connections,
-            "rds_instances_with_no_connections": rds_instances_with_no_connections,
-        }
+    async def stream_under_utilized_resources(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        async for rds, dimension_name, max_connection in self._stream_connection_checks():
+            if isinstance(max_connection, Exception):
+                yield "errors", self._to_error(rds, dimension_name, max_connection)
+            elif max_connection == 0:
+                yield RESOURCE_TYPES_BY_DIMENSION[dimension_name], self._to_finding(rds, dimension_name)
@@ -1,8 +1,26 @@
 from abc import ABC
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Tuple, Union
+
+from src.models.finding import Finding
 
 
 class ResourceHandler(ABC):
+    # Resource types the handler reports, so collected results list them even when empty
+    resource_types: Tuple[str, ...] = ()
+
+    async def stream_under_utilized_resources(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        """
+        Yield (resource_type, resource) pairs as soon as each finding is confirmed.
+
+        Resources are Finding objects; failed lookups are reported as plain "errors" dicts.
+        """
+        return
+        yield
+
+    async def find_under_utilized_resource(self) -> Dict[str, List[Union[Finding, Dict]]]:
+        underutilized_resource = {resource_type: [] for resource_type in self.resource_types}
+
+        async for resource_type, resource in self.stream_under_utilized_resources():
+            underutilized_resource.setdefault(resource_type, []).append(resource)
 
-    async def find_under_utilized_resource(self) -> List[Dict]:
-        pass
+        return underutilized_resource
@@ -1,44 +1,186 @@
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
+from src.core.aws.bucket_region_cache import BucketRegionCache, get_bucket_region_cache
+from src.core.aws.constants import (
+    MAX_CONCURRENT_BUCKET_CHECKS,
+    MAX_CONCURRENT_BUCKET_LISTINGS_PER_HANDLER,
+    MAX_CONCURRENT_PART_LISTINGS,
+    MAX_CONCURRENT_BUCKET_LOCATION_LOOKUPS,
+    S3_INCOMPLETE_UPLOAD_MIN_AGE_DAYS,
+    S3_MAX_RECLAIMABLE_SCAN_BYTES,
+    S3_MAX_VERSIONS_LISTED_PER_BUCKET,
+    S3_MIN_RECLAIMABLE_BYTES,
+    S3_STORAGE_PRICES_PER_GB_MONTH,
+)
 from src.core.aws.resource_handlers.cloudwatch import CloudWatch
 from src.core.aws.resource_handlers.resource_handler import ResourceHandler
-from src.core.utils import AsyncClientManager
-from src.models.cloudwatch import CloudWatchMetric
+from src.core.utils import get_logger, paginate, AsyncClientManager
+from src.models.cloudwatch import CloudWatchMetric, FleetMetricQuery
+from src.models.finding import Finding
 
+logger = get_logger()
 
+# GetBucketLocation reports legacy names for some regions
+LEGACY_LOCATION_CONSTRAINTS = {None: "us-east-1", "": "us-east-1", "EU": "eu-west-1"}
+
+
+async def get_bucket_location(s3, bucket_name: str) -> str:
+    """Look up a bucket's home region with GetBucketLocation."""
+    response = await s3.get_bucket_location(Bucket=bucket_name)
+    location = response.get("LocationConstraint")
+    return LEGACY_LOCATION_CONSTRAINTS.get(location, location)
+
+
+@dataclass(slots=True)
+class StorageWaste:
+    """Reclaimable objects found in one bucket: abandoned upload parts or non-current versions."""
+
+    objects: int = 0
+    size_bytes: int = 0
+    monthly_cost: float = 0.0
+    oldest: Optional[datetime] = None
+    # Entries listed so far, including the ones that are not reclaimable
+    listed: int = 0
+
+    def add(self, size_bytes: int, storage_class: Optional[str], created: Optional[datetime]):
+        self.objects += 1
+        self.size_bytes += size_bytes
+        price = S3_STORAGE_PRICES_PER_GB_MONTH.get(storage_class, S3_STORAGE_PRICES_PER_GB_MONTH["STANDARD"])
+        self.monthly_cost += size_bytes / (1024**3) * price
+        if created is not None and (self.oldest is None or created < self.oldest):
+            self.oldest = created
+
+    def exceeds_scan_limit(self) -> bool:
+        """Whether enough was found, or listed, to stop listing the bucket early."""
+        return self.size_bytes >= S3_MAX_RECLAIMABLE_SCAN_BYTES or self.listed >= S3_MAX_VERSIONS_LISTED_PER_BUCKET
+
+
+@dataclass
 class S3ResourceHandlers(ResourceHandler):
-    def __init__(self, region_name: str):
+    resource_types = ("s3_with_no_requests", "errors")
+
+    def __init__(
+        self,
+        region_name: str,
+        use_fleet_metrics: bool = False,
+        client_manager: Optional[AsyncClientManager] = None,
+        all_regions: bool = False,
+        region_cache: Optional[BucketRegionCache] = None,
+    ):
         self.region_name = region_name
-        self._client_manager = AsyncClientManager(region_name)
-        self._cw = CloudWatch(region_name=region_name)
+        self._use_fleet_metrics = use_fleet_metrics
+        # Without all_regions only the buckets homed in region_name are checked
+        self._all_regions = all_regions
+        self._client_manager = client_manager or AsyncClientManager(region_name)
+        self._cw = CloudWatch(region_name=region_name, client_manager=self._client_manager)
+        self._regional_cw: Dict[str, CloudWatch] = {region_name: self._cw}
+        self._region_cache = region_cache if region_cache is not None else get_bucket_region_cache()
+        self._bucket_check_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BUCKET_CHECKS)
+        self._location_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BUCKET_LOCATION_LOOKUPS)
 
-    async def _get_list(self):
+    def _cloudwatch_for(self, region_name: Optional[str]) -> CloudWatch:
+        """The CloudWatch of a bucket's home region, which is the only region its metrics are published in."""
+        region_name = region_name or self.region_name
+        cw = self._regional_cw.get(region_name)
+        if cw is None:
+            # One CloudWatch per region, so each region's queries are batched through its own pooled client
+            cw = self._regional_cw[region_name] = CloudWatch(
+                region_name=region_name, client_manager=self._client_manager.for_region(region_name)
+            )
+        return cw
+
+    async def _stream_pages(self) -> AsyncIterator[List[Dict]]:
+        list_kwargs = {} if self._all_regions else {"BucketRegion": self.region_name}
         async with self._client_manager as manager:
             async with manager.get_client("s3") as s3:
-                s3_list = await s3.list_buckets()
-                return s3_list.get("Buckets", [])
+                async for buckets in paginate(s3, "s3", "list_buckets", **list_kwargs):
+                    yield await self._resolve_regions(s3, buckets) if self._all_regions else buckets
+
+    async def _get_list(self):
+        return [bucket async for buckets in self._stream_pages() for bucket in buckets]
+
+    def _region_of(self, bucket: Dict) -> str:
+        return bucket.get("BucketRegion") or self.region_name
+
+    async def _get_bucket_location(self, s3, bucket_name: str) -> str:
+        async with self._location_semaphore:
+            return await get_bucket_location(s3, bucket_name)
+
+    async def _resolve_regions(self, s3, buckets: List[Dict]) -> List[Dict]:
+        """
+        Fill in BucketRegion for every bucket of a page.
 
-    async def get_number_of_requests(self, bucket_name: str):
+        list_buckets usually reports the region itself, and corrects the cache where it
+        disagrees. Missing ones are taken from the cache, and only the rest are looked up,
+        concurrently, with GetBucketLocation.
+        Buckets whose lookup fails get a BucketRegionError instead.
+        """
+        cached = self._region_cache.get_regions([bucket["Name"] for bucket in buckets]) if self._region_cache else {}
+        # Regions reported by list_buckets are authoritative, so cached entries that disagree are replaced
+        moved = {
+            bucket["Name"]: bucket["BucketRegion"]
+            for bucket in buckets
+            if bucket.get("BucketRegion")
+            and cached.get(bucket["Name"], bucket["BucketRegion"]) != bucket["BucketRegion"]
+        }
+        if moved:
+            self._region_cache.put_regions(moved)
+
+        unresolved = [bucket["Name"] for bucket in buckets if not bucket.get("BucketRegion")]
+        regions = {name: cached[name] for name in unresolved if name in cached}
+        missing = [name for name in unresolved if name not in regions]
+
+        locations = await asyncio.gather(
+            *(self._get_bucket_location(s3, name) for name in missing), return_exceptions=True
+        )
+        resolved = {name: location for name, location in zip(missing, locations) if isinstance(location, str)}
+        if resolved and self._region_cache:
+            self._region_cache.put_regions(resolved)
+        regions.update(resolved)
+        errors = {name: location for name, location in zip(missing, locations) if isinstance(location, Exception)}
+
+        resolved_buckets = []
+        for bucket in buckets:
+            name = bucket["Name"]
+            if bucket.get("BucketRegion"):
+                resolved_buckets.append(bucket)
+            elif name in regions:
+                resolved_buckets.append({**bucket, "BucketRegion": regions[name]})
+            else:
+                resolved_buckets.append({**bucket, "BucketRegionError": errors[name]})
+        return resolved_buckets
+
+    async def get_number_of_requests(self, bucket_name: str, region_name: Optional[str] = None):
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=7)
 
         cloudwatch_metric = CloudWatchMetric(
             namespace="AWS/S3",
             metric_name="NumberOfRequests",
-            dimensions=[{"Name": "BucketName", "Value": bucket_name}],
+            # Request metrics are only published per metrics filter; EntireBucket covers every object
+            dimensions=[
+                {"Name": "BucketName", "Value": bucket_name},
+                {"Name": "FilterId", "Value": "EntireBucket"},
+            ],
             start_time=start_time,
             end_time=end_time,
             period=86400,
             statistics=["Sum"],
         )
 
-        s3_metrics = await self._cw.get_metrics(cloudwatch_metric)
+        # Request metrics are opt-in: without datapoints the request count is unknown, not zero
+        number_of_requests = None
+        async for series in self._cloudwatch_for(region_name).stream_metric_series(cloudwatch_metric):
+            if len(series):
+                number_of_requests = (number_of_requests or 0.0) + series.sum()
 
-        return sum(metrics["Sum"] for metrics in s3_metrics["Datapoints"])
+        return number_of_requests
 
-    async def get_bucket_size(self, bucket_name: str):
+    async def get_bucket_size(self, bucket_name: str, region_name: Optional[str] = None):
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=1)
         cloudwatch_metric = CloudWatchMetric(
@@ -52,31 +194,276 @@ class S3ResourceHandlers(ResourceHandler):
             end_time=end_time,
             period=86400,
             statistics=["Average"],
+            unit="Bytes",
         )
 
-        s3_metrics = await self._cw.get_metrics(cloudwatch_metric)
+        s3_metrics = await self._cloudwatch_for(region_name).get_metric_series(cloudwatch_metric)
 
-        if s3_metrics["Datapoints"]:
-            size_bytes = s3_metrics["Datapoints"][0]["Average"]
-            size_gb = size_bytes / (1024 ** 3)
-            return size_gb
-        else:
+        size_bytes = s3_metrics.latest()
+        if size_bytes is None:
             return None
 
-    async def _get_s3_with_no_requests(self, s3_bucket_list: List[Dict]):
-        buckets_with_no_requests = []
-        requests_data = await asyncio.gather(*[self.get_number_of_requests(s3["Name"]) for s3 in s3_bucket_list])
-        sizes = await asyncio.gather(*[self.get_bucket_size(s3["Name"]) for s3 in s3_bucket_list])
+        size_gb = size_bytes / (1024**3)
+        return size_gb
 
-        for idx in range(len(s3_bucket_list)):
-            if requests_data[idx] == 0:
-                s3_details = s3_bucket_list[idx]
-                s3_details["Size"] = sizes[idx]
-                buckets_with_no_requests.append(s3_details)
-        return buckets_with_no_requests
+    async def _get_fleet_requests_and_sizes(self, bucket_names: List[str], region_name: Optional[str] = None):
+        """Fetch NumberOfRequests and BucketSizeBytes for every bucket of one region with one SEARCH query each."""
+        cw = self._cloudwatch_for(region_name)
+        end_time = datetime.utcnow()
+
+        requests_query = FleetMetricQuery(
+            namespace="AWS/S3",
+            metric_name="NumberOfRequests",
+            dimension_name="BucketName",
+            start_time=end_time - timedelta(days=7),
+            end_time=end_time,
+            period=86400,
+            statistic="Sum",
+            schema_dimensions=["FilterId"],
+            filters={"FilterId": "EntireBucket"},
+        )
+        size_query = FleetMetricQuery(
+            namespace="AWS/S3",
+            metric_name="BucketSizeBytes",
+            dimension_name="BucketName",
+            start_time=end_time - timedelta(days=1),
+            end_time=end_time,
+            period=86400,
+            statistic="Average",
+            unit="Bytes",
+            schema_dimensions=["StorageType"],
+            filters={"StorageType": "StandardStorage"},
+        )
+
+        requests_metrics, size_metrics = await asyncio.gather(
+            cw.get_fleet_metrics(requests_query, bucket_names),
+            cw.get_fleet_metrics(size_query, bucket_names),
+        )
+
+        requests_data = [requests_metrics[name].sum() if len(requests_metrics[name]) else None for name in bucket_names]
+        sizes = [size_metrics[name].latest() / (1024**3) if len(size_metrics[name]) else None for name in bucket_names]
+        return requests_data, sizes
+
+    async def _stream_fleet_checks(
+        self, pages: AsyncIterator[List[Dict]]
+    ) -> AsyncIterator[Tuple[Dict, Any, Optional[float]]]:
+        buckets_by_region: Dict[str, List[Dict]] = {}
+        async for buckets in pages:
+            for bucket in buckets:
+                if "BucketRegionError" in bucket:
+                    yield bucket, bucket["BucketRegionError"], None
+                else:
+                    buckets_by_region.setdefault(self._region_of(bucket), []).append(bucket)
+
+        # Each region's SEARCH queries go to that region's CloudWatch, all regions at once
+        regions = list(buckets_by_region)
+        region_results = await asyncio.gather(
+            *(
+                self._get_fleet_requests_and_sizes([bucket["Name"] for bucket in buckets_by_region[region]], region)
+                for region in regions
+            ),
+            return_exceptions=True,
+        )
+        for region, result in zip(regions, region_results):
+            if isinstance(result, Exception):
+                for bucket in buckets_by_region[region]:
+                    yield bucket, result, None
+                continue
+
+            requests_data, sizes = result
+            for bucket, number_of_requests, size in zip(buckets_by_region[region], requests_data, sizes):
+                yield bucket, number_of_requests, size
+
+    async def _check_bucket(self, bucket: Dict) -> Tuple[Any, Optional[float]]:
+        if "BucketRegionError" in bucket:
+            return bucket["BucketRegionError"], None
+        try:
+            async with self._bucket_check_semaphore:
+                number_of_requests, size = await asyncio.gather(
+                    self.get_number_of_requests(bucket["Name"], self._region_of(bucket)),
+                    self.get_bucket_size(bucket["Name"], self._region_of(bucket)),
+                )
+        except Exception as e:
+            return e, None
+        return number_of_requests, size
+
+    async def _stream_checks(
+        self, pages: AsyncIterator[List[Dict]]
+    ) -> AsyncIterator[Tuple[Dict, Any, Optional[float]]]:
+        async def check(bucket: Dict):
+            return (bucket, *await self._check_bucket(bucket))
+
+        tasks = []
+        try:
+            # Checks start page by page; the semaphore keeps the queued CloudWatch queries bounded
+            async for buckets in pages:
+                tasks.extend(asyncio.create_task(check(bucket)) for bucket in buckets)
+
+            for next_check in asyncio.as_completed(tasks):
+                yield await next_check
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _to_finding(self, bucket: Dict, size: Optional[float]) -> Finding:
+        return Finding(
+            resource_id=bucket["Name"],
+            resource_type="AWS::S3::Bucket",
+            region=self._region_of(bucket),
+            reason="No requests in the last 7 days",
+            metrics={"NumberOfRequests": 0.0, "SizeGB": size},
+            attributes={"CreationDate": bucket.get("CreationDate")},
+        )
+
+    async def stream_under_utilized_resources(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        pages = self._stream_pages()
+        checks = self._stream_fleet_checks(pages) if self._use_fleet_metrics else self._stream_checks(pages)
+        async for bucket, number_of_requests, size in checks:
+            if isinstance(number_of_requests, Exception):
+                # A failed lookup means "unknown", not "unused": report it instead of dropping the bucket
+                logger.error(f"Failed to fetch request metrics for bucket {bucket['Name']}: {number_of_requests}")
+                yield "errors", {"BucketName": bucket["Name"], "Error": str(number_of_requests)}
+            elif number_of_requests is None:
+                # No request metrics configuration on the bucket: nothing to judge it by
+                logger.debug(f"No request metrics for bucket {bucket['Name']}, skipping")
+            elif number_of_requests == 0:
+                yield "s3_with_no_requests", self._to_finding(bucket, size)
+
+
+@dataclass
+class S3StorageWasteHandlers(S3ResourceHandlers):
+    """
+    Finds incomplete multipart uploads and non-current versions worth cleaning up.
+
+    Listing every upload and version of a bucket takes far longer than reading its request
+    metrics, so this runs as its own service with its own timeout and listing budget.
+    Buckets are listed and their regions resolved the same way as for the request checks.
+    """
+
+    resource_types = ("s3_incomplete_multipart_uploads", "s3_noncurrent_versions", "errors")
+
+    def __init__(
+        self,
+        region_name: str,
+        client_manager: Optional[AsyncClientManager] = None,
+        all_regions: bool = False,
+        region_cache: Optional[BucketRegionCache] = None,
+    ):
+        super().__init__(region_name, client_manager=client_manager, all_regions=all_regions, region_cache=region_cache)
+        self._listing_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BUCKET_LISTINGS_PER_HANDLER)
+
+    async def _get_incomplete_upload_size(self, s3, bucket_name: str, upload: Dict) -> int:
+        size = 0
+        async for parts in paginate(
+            s3, "s3", "list_parts", Bucket=bucket_name, Key=upload["Key"], UploadId=upload["UploadId"]
+        ):
+            size += sum(part.get("Size", 0) for part in parts)
+        return size
+
+    async def _get_incomplete_uploads(self, s3, bucket_name: str) -> StorageWaste:
+        """Sum the parts of multipart uploads started more than S3_INCOMPLETE_UPLOAD_MIN_AGE_DAYS ago."""
+        waste = StorageWaste()
+        started_before = datetime.now(timezone.utc) - timedelta(days=S3_INCOMPLETE_UPLOAD_MIN_AGE_DAYS)
+        async with aclosing(paginate(s3, "s3", "list_multipart_uploads", Bucket=bucket_name)) as pages:
+            async for uploads in pages:
+                abandoned = [upload for upload in uploads if upload["Initiated"] < started_before]
+                # A page holds up to 1000 uploads, so their parts are listed a few at a time and
+                # no more are started once the bucket reached its scan limit
+                for offset in range(0, len(abandoned), MAX_CONCURRENT_PART_LISTINGS):
+                    if waste.exceeds_scan_limit():
+                        break
+                    batch = abandoned[offset : offset + MAX_CONCURRENT_PART_LISTINGS]
+                    sizes = await asyncio.gather(
+                        *(self._get_incomplete_upload_size(s3, bucket_name, upload) for upload in batch)
+                    )
+                    for upload, size in zip(batch, sizes):
+                        waste.add(size, upload.get("StorageClass"), upload["Initiated"])
+                if waste.exceeds_scan_limit():
+                    break
+        return waste
+
+    async def _get_noncurrent_versions(self, s3, bucket_name: str) -> Optional[StorageWaste]:
+        """Sum the non-current object versions of a versioned bucket, or None if it was never versioned."""
+        versioning = await s3.get_bucket_versioning(Bucket=bucket_name)
+        if versioning.get("Status") not in ("Enabled", "Suspended"):
+            return None
+
+        waste = StorageWaste()
+        async with aclosing(paginate(s3, "s3", "list_object_versions", Bucket=bucket_name)) as pages:
+            async for versions in pages:
+                waste.listed += len(versions)
+                for version in versions:
+                    if not version.get("IsLatest", True):
+                        waste.add(version.get("Size", 0), version.get("StorageClass"), version.get("LastModified"))
+                if waste.exceeds_scan_limit():
+                    break
+        return waste
+
+    async def _check_bucket_waste(self, bucket: Dict) -> List[Tuple[str, Union[Finding, Dict]]]:
+        """Find incomplete multipart uploads and non-current versions worth cleaning up in one bucket."""
+        if "BucketRegionError" in bucket:
+            # Without its region the bucket cannot be listed: report it rather than let it look clean
+            logger.error(f"Failed to resolve the region of bucket {bucket['Name']}: {bucket['BucketRegionError']}")
+            return [("errors", {"BucketName": bucket["Name"], "Error": str(bucket["BucketRegionError"])})]
+        try:
+            async with self._listing_semaphore:
+                # Object listings must go to the bucket's own region
+                async with self._client_manager.for_region(self._region_of(bucket)).get_client("s3") as s3:
+                    uploads, versions = await asyncio.gather(
+                        self._get_incomplete_uploads(s3, bucket["Name"]),
+                        self._get_noncurrent_versions(s3, bucket["Name"]),
+                    )
+        except Exception as e:
+            logger.error(f"Failed to list uploads and versions of bucket {bucket['Name']}: {e}")
+            return [("errors", {"BucketName": bucket["Name"], "Error": str(e)})]
+
+        findings = []
+        if uploads.size_bytes >= S3_MIN_RECLAIMABLE_BYTES:
+            findings.append(
+                (
+                    "s3_incomplete_multipart_uploads",
+                    self._to_waste_finding(
+                        bucket,
+                        uploads,
+                        f"Multipart uploads started more than {S3_INCOMPLETE_UPLOAD_MIN_AGE_DAYS} days ago",
+                        "IncompleteUploads",
+                    ),
+                )
+            )
+        if versions is not None and versions.size_bytes >= S3_MIN_RECLAIMABLE_BYTES:
+            findings.append(
+                (
+                    "s3_noncurrent_versions",
+                    self._to_waste_finding(bucket, versions, "Non-current object versions", "NoncurrentVersions"),
+                )
+            )
+        return findings
+
+    def _to_waste_finding(self, bucket: Dict, waste: StorageWaste, reason: str, count_name: str) -> Finding:
+        return Finding(
+            resource_id=bucket["Name"],
+            resource_type="AWS::S3::Bucket",
+            region=self._region_of(bucket),
+            reason=reason,
+            metrics={count_name: waste.objects, "ReclaimableGB": waste.size_bytes / (1024**3)},
+            estimated_monthly_cost=round(waste.monthly_cost, 2),
+            attributes={
+                "Oldest": waste.oldest.isoformat() if waste.oldest else None,
+                # A cut short listing only gives a lower bound
+                "Complete": not waste.exceeds_scan_limit(),
+            },
+        )
 
-    async def find_under_utilized_resource(self):
-        s3_list = await self._get_list()
-        unused_s3 = await self._get_s3_with_no_requests(s3_list)
+    async def stream_under_utilized_resources(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        tasks = []
+        try:
+            # Listings start page by page; the semaphore bounds how many buckets are listed at once
+            async for buckets in self._stream_pages():
+                tasks.extend(asyncio.create_task(self._check_bucket_waste(bucket)) for bucket in buckets)
 
-        return unused_s3
+            for next_check in asyncio.as_completed(tasks):
+                for resource_type, resource in await next_check:
+                    yield resource_type, resource
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,416 @@
+import asyncio
+import glob
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import unquote_plus
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+import pyarrow.orc as porc
+import pyarrow.parquet as pq
+
+from src.core.aws.bucket_region_cache import BucketRegionCache, get_bucket_region_cache
+from src.core.aws.config import Config
+from src.core.aws.constants import (
+    S3_IA_MIN_OBJECT_BYTES,
+    S3_INTELLIGENT_TIERING_MONITORING_PER_1000_OBJECTS,
+    S3_INVENTORY_AGE_BUCKET_DAYS,
+    S3_INVENTORY_BATCH_ROWS,
+    S3_INVENTORY_CSV_BLOCK_BYTES,
+    S3_LIFECYCLE_TRANSITIONS,
+    S3_MIN_MONTHLY_SAVINGS,
+    S3_STORAGE_PRICES_PER_GB_MONTH,
+)
+from src.core.aws.resource_handlers.resource_handler import ResourceHandler
+from src.core.aws.resource_handlers.s3 import get_bucket_location
+from src.core.utils import AsyncClientManager, get_logger
+from src.models.finding import Finding
+
+logger = get_logger()
+
+# Columns the analysis reads. CSV inventories name them in the manifest's fileSchema,
+# Parquet and ORC inventories use snake_case names.
+INVENTORY_COLUMNS = {
+    "key": "Key",
+    "size": "Size",
+    "last_modified_date": "LastModifiedDate",
+    "storage_class": "StorageClass",
+    "is_delete_marker": "IsDeleteMarker",
+}
+
+MS_PER_DAY = 86_400_000
+BYTES_PER_GB = 1024**3
+
+
+def age_bucket_label(age_bucket: int) -> str:
+    """Label of an index into S3_INVENTORY_AGE_BUCKET_DAYS, e.g. 1 -> "30-90d"."""
+    bounds = [0, *S3_INVENTORY_AGE_BUCKET_DAYS]
+    if age_bucket + 1 < len(bounds):
+        return f"{bounds[age_bucket]}-{bounds[age_bucket + 1]}d"
+    return f"{bounds[age_bucket]}d+"
+
+
+@dataclass(frozen=True)
+class InventoryManifest:
+    """One delivered S3 Inventory: the manifest.json and the data files it lists, on local disk."""
+
+    path: str
+    source_bucket: str
+    file_format: str
+    # CSV column names from fileSchema; Parquet and ORC files carry their own schema
+    file_schema: Tuple[str, ...]
+    files: Tuple[str, ...]
+
+    @classmethod
+    def load(cls, path: str) -> "InventoryManifest":
+        with open(path) as manifest_file:
+            manifest = json.load(manifest_file)
+
+        file_format = manifest["fileFormat"].upper()
+        file_schema = ()
+        if file_format == "CSV":
+            file_schema = tuple(column.strip() for column in manifest["fileSchema"].split(","))
+
+        return cls(
+            path=path,
+            source_bucket=manifest["sourceBucket"],
+            file_format=file_format,
+            file_schema=file_schema,
+            files=tuple(cls._local_path(path, data_file["key"]) for data_file in manifest["files"]),
+        )
+
+    @staticmethod
+    def _local_path(manifest_path: str, key: str) -> str:
+        # Keys are relative to the destination bucket: <prefix>/<bucket>/<config>/data/<file>,
+        # while the manifest sits in <prefix>/<bucket>/<config>/<date>/manifest.json
+        manifest_directory = os.path.dirname(manifest_path)
+        candidates = [
+            os.path.join(os.path.dirname(manifest_directory), "data", os.path.basename(key)),
+            os.path.join(manifest_directory, os.path.basename(key)),
+        ]
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                return candidate
+        raise FileNotFoundError(f"Inventory data file {key} not found next to {manifest_path}")
+
+
+def find_manifests(path: str) -> List[str]:
+    """
+    The manifests to analyze under a path: the file itself, or the newest delivery of every
+    inventory configuration below a directory, since older deliveries list the same objects.
+    """
+    if not os.path.isdir(path):
+        return [path]
+
+    newest = {}
+    for manifest_path in sorted(glob.glob(os.path.join(path, "**", "manifest.json"), recursive=True)):
+        # Delivery folders are named by date, so the sorted order is chronological per configuration
+        configuration = os.path.dirname(os.path.dirname(manifest_path))
+        newest[configuration] = manifest_path
+    return sorted(newest.values())
+
+
+def iter_inventory_batches(manifest: InventoryManifest) -> Iterator[pa.RecordBatch]:
+    """
+    Yield the inventory rows in record batches, one data file chunk at a time.
+
+    Only the analyzed columns are decoded, so memory use depends on the batch size and not on
+    the number of objects. Parquet files are memory-mapped instead of read into buffers.
+    """
+    for path in manifest.files:
+        if manifest.file_format == "CSV":
+            yield from _iter_csv_batches(path, manifest.file_schema)
+        elif manifest.file_format == "PARQUET":
+            yield from _iter_parquet_batches(path)
+        elif manifest.file_format == "ORC":
+            yield from _iter_orc_batches(path)
+        else:
+            raise ValueError(f"Unsupported S3 Inventory format: {manifest.file_format}")
+
+
+def _iter_csv_batches(path: str, file_schema: Tuple[str, ...]) -> Iterator[pa.RecordBatch]:
+    columns = [column for column in INVENTORY_COLUMNS.values() if column in file_schema]
+    column_types = {
+        "Key": pa.string(),
+        "Size": pa.int64(),
+        "LastModifiedDate": pa.timestamp("ms", tz="UTC"),
+        "StorageClass": pa.string(),
+        "IsDeleteMarker": pa.bool_(),
+    }
+    # The .gz extension makes the reader decompress on the fly
+    reader = pcsv.open_csv(
+        path,
+        read_options=pcsv.ReadOptions(column_names=list(file_schema), block_size=S3_INVENTORY_CSV_BLOCK_BYTES),
+        convert_options=pcsv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: column_types[column] for column in columns},
+            strings_can_be_null=True,
+        ),
+    )
+    yield from reader
+
+
+def _rename_columns(batch: pa.RecordBatch) -> pa.RecordBatch:
+    return batch.rename_columns([INVENTORY_COLUMNS.get(name, name) for name in batch.schema.names])
+
+
+def _iter_parquet_batches(path: str) -> Iterator[pa.RecordBatch]:
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    columns = [name for name in INVENTORY_COLUMNS if name in parquet_file.schema_arrow.names]
+    for batch in parquet_file.iter_batches(batch_size=S3_INVENTORY_BATCH_ROWS, columns=columns):
+        yield _rename_columns(batch)
+
+
+def _iter_orc_batches(path: str) -> Iterator[pa.RecordBatch]:
+    orc_file = porc.ORCFile(path)
+    columns = [name for name in INVENTORY_COLUMNS if name in orc_file.schema.names]
+    for stripe in range(orc_file.nstripes):
+        yield _rename_columns(orc_file.read_stripe(stripe, columns=columns))
+
+
+@dataclass(slots=True)
+class InventoryGroup:
+    """Objects sharing a prefix, storage class and age bucket."""
+
+    objects: int = 0
+    size_bytes: int = 0
+    # Epoch milliseconds of the most recently modified object
+    newest_modified: Optional[int] = None
+
+    def add(self, objects: int, size_bytes: int, newest_modified: Optional[int]):
+        self.objects += objects
+        self.size_bytes += size_bytes
+        if newest_modified is not None and (self.newest_modified is None or newest_modified > self.newest_modified):
+            self.newest_modified = newest_modified
+
+
+@dataclass
+class InventoryAnalysis:
+    """Object counts and sizes of one inventory, keyed by (prefix, storage class, age bucket)."""
+
+    bucket: str
+    groups: Dict[Tuple[str, str, int], InventoryGroup] = field(default_factory=dict)
+
+    def add_batch(self, batch: pa.RecordBatch, prefix_depth: int, now_ms: int, url_encoded: bool = False):
+        """Aggregate one record batch with vectorized kernels; only the per-group totals are kept."""
+        if "IsDeleteMarker" in batch.schema.names:
+            batch = batch.filter(pc.invert(pc.fill_null(batch.column("IsDeleteMarker"), False)))
+        if batch.num_rows == 0:
+            return
+
+        # Keys without a "/" are stored at the top of the bucket and get the empty prefix, as does
+        # every key at depth 0, which groups the whole bucket together
+        if prefix_depth > 0:
+            prefixes = pc.struct_field(
+                pc.extract_regex(batch.column("Key"), rf"^(?P<prefix>(?:[^/]*/){{1,{prefix_depth}}})"), [0]
+            )
+            prefixes = pc.if_else(pc.is_valid(prefixes), prefixes, "")
+        else:
+            prefixes = pa.repeat("", batch.num_rows)
+
+        modified = batch.column("LastModifiedDate").cast(pa.timestamp("ms", tz="UTC")).cast(pa.int64())
+        modified = pc.fill_null(modified, now_ms).to_numpy()
+        age_buckets = np.searchsorted(
+            np.asarray(S3_INVENTORY_AGE_BUCKET_DAYS, dtype=np.int64) * MS_PER_DAY, now_ms - modified, side="right"
+        )
+
+        table = pa.table(
+            {
+                "Prefix": prefixes,
+                "StorageClass": pc.fill_null(batch.column("StorageClass"), "STANDARD"),
+                "AgeBucket": age_buckets,
+                "Size": pc.fill_null(batch.column("Size"), 0),
+                "Modified": modified,
+            }
+        )
+        grouped = table.group_by(["Prefix", "StorageClass", "AgeBucket"]).aggregate(
+            [("Size", "count"), ("Size", "sum"), ("Modified", "max")]
+        )
+
+        for prefix, storage_class, age_bucket, objects, size_bytes, newest_modified in zip(
+            *(grouped.column(name).to_pylist() for name in grouped.column_names)
+        ):
+            if url_encoded:
+                prefix = unquote_plus(prefix)
+            key = (prefix, storage_class, age_bucket)
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = InventoryGroup()
+            group.add(objects, size_bytes, newest_modified)
+
+
+def analyze_inventory(manifest_path: str, prefix_depth: int = 1, now: Optional[datetime] = None) -> InventoryAnalysis:
+    """Stream every data file of an inventory through the aggregation, chunk by chunk."""
+    manifest = InventoryManifest.load(manifest_path)
+    now_ms = int((now or datetime.now(timezone.utc)).timestamp() * 1000)
+
+    analysis = InventoryAnalysis(manifest.source_bucket)
+    started = time.monotonic()
+    for batch in iter_inventory_batches(manifest):
+        # CSV inventories URL-encode object keys
+        analysis.add_batch(batch, prefix_depth, now_ms, url_encoded=manifest.file_format == "CSV")
+    logger.info(f"Analyzed inventory of {manifest.source_bucket} in {time.monotonic() - started:.1f}s")
+    return analysis
+
+
+def _transition_price(age_bucket: int) -> float:
+    """Storage price the lifecycle transitions give objects of an age bucket."""
+    age_days = ([0, *S3_INVENTORY_AGE_BUCKET_DAYS])[age_bucket]
+    price = S3_STORAGE_PRICES_PER_GB_MONTH["STANDARD"]
+    for days, storage_class in S3_LIFECYCLE_TRANSITIONS:
+        if age_days >= days:
+            price = S3_STORAGE_PRICES_PER_GB_MONTH[storage_class]
+    return price
+
+
+def recommend_lifecycle(analysis: InventoryAnalysis, region_name: str, now: Optional[datetime] = None) -> List[Finding]:
+    """
+    Lifecycle and tiering recommendations for the STANDARD objects of every prefix.
+
+    Prefixes that are no longer written to get a lifecycle rule following
+    S3_LIFECYCLE_TRANSITIONS. Prefixes still receiving new objects have an unknown access
+    pattern and get Intelligent-Tiering, whose infrequent and archive instant access tiers
+    are priced like the lifecycle targets but move objects back when they are read again.
+    Prefixes whose objects are smaller than S3_IA_MIN_OBJECT_BYTES on average are skipped,
+    since those classes bill every object as at least that size.
+    """
+    now_ms = int((now or datetime.now(timezone.utc)).timestamp() * 1000)
+    standard_price = S3_STORAGE_PRICES_PER_GB_MONTH["STANDARD"]
+
+    prefixes: Dict[str, Dict[int, InventoryGroup]] = {}
+    for (prefix, storage_class, age_bucket), group in analysis.groups.items():
+        if storage_class == "STANDARD":
+            prefixes.setdefault(prefix, {})[age_bucket] = group
+
+    findings = []
+    for prefix, age_groups in sorted(prefixes.items()):
+        objects = sum(group.objects for group in age_groups.values())
+        size_bytes = sum(group.size_bytes for group in age_groups.values())
+        if objects == 0 or size_bytes / objects < S3_IA_MIN_OBJECT_BYTES:
+            continue
+
+        savings = sum(
+            group.size_bytes / BYTES_PER_GB * (standard_price - _transition_price(age_bucket))
+            for age_bucket, group in age_groups.items()
+        )
+        newest_modified = max(
+            (group.newest_modified for group in age_groups.values() if group.newest_modified is not None), default=None
+        )
+        still_written = (
+            newest_modified is not None and now_ms - newest_modified < S3_LIFECYCLE_TRANSITIONS[0][0] * MS_PER_DAY
+        )
+        if still_written:
+            savings -= objects / 1000 * S3_INTELLIGENT_TIERING_MONITORING_PER_1000_OBJECTS
+            recommendation = "Move to INTELLIGENT_TIERING"
+            reason = "STANDARD objects in a prefix still written to, with an unknown access pattern"
+        else:
+            recommendation = "Lifecycle rule: " + ", ".join(
+                f"{storage_class} after {days} days" for days, storage_class in S3_LIFECYCLE_TRANSITIONS
+            )
+            reason = f"No new STANDARD objects in the last {S3_LIFECYCLE_TRANSITIONS[0][0]} days"
+
+        if savings < S3_MIN_MONTHLY_SAVINGS:
+            continue
+
+        findings.append(
+            Finding(
+                resource_id=f"s3://{analysis.bucket}/{prefix}",
+                resource_type="AWS::S3::Bucket",
+                region=region_name,
+                reason=reason,
+                metrics={
+                    "Objects": objects,
+                    "SizeGB": size_bytes / BYTES_PER_GB,
+                    "EstimatedMonthlySavings": round(savings, 2),
+                    **{
+                        f"SizeGB {age_bucket_label(age_bucket)}": (
+                            age_groups[age_bucket].size_bytes / BYTES_PER_GB if age_bucket in age_groups else 0.0
+                        )
+                        for age_bucket in range(len(S3_INVENTORY_AGE_BUCKET_DAYS) + 1)
+                    },
+                },
+                estimated_monthly_cost=round(size_bytes / BYTES_PER_GB * standard_price, 2),
+                attributes={
+                    "Bucket": analysis.bucket,
+                    "Prefix": prefix,
+                    "Recommendation": recommendation,
+                    "NewestObject": (
+                        datetime.fromtimestamp(newest_modified / 1000, tz=timezone.utc).isoformat()
+                        if newest_modified is not None
+                        else None
+                    ),
+                },
+            )
+        )
+    return findings
+
+
+@dataclass
+class S3InventoryAnalyzer(ResourceHandler):
+    """
+    Recommends lifecycle and tiering rules from S3 Inventory reports on local disk.
+
+    CloudWatch only reports a bucket's total size. The inventory lists every object, so it
+    shows which prefixes hold old STANDARD data. Inventories are analyzed in worker threads,
+    since pyarrow's kernels release the GIL, and never held in memory as a whole. Findings
+    carry the region of the inventoried bucket, taken from the bucket region cache or looked up.
+    """
+
+    resource_types = ("s3_lifecycle_recommendations", "errors")
+
+    def __init__(
+        self,
+        region_name: str,
+        inventory_paths: Optional[List[str]] = None,
+        prefix_depth: Optional[int] = None,
+        client_manager: Optional[AsyncClientManager] = None,
+        region_cache: Optional[BucketRegionCache] = None,
+    ):
+        config = Config()
+        self.region_name = region_name
+        self._inventory_paths = config.get_s3_inventory_paths if inventory_paths is None else inventory_paths
+        self._prefix_depth = config.get_s3_inventory_prefix_depth if prefix_depth is None else prefix_depth
+        self._client_manager = client_manager or AsyncClientManager(region_name)
+        self._region_cache = region_cache if region_cache is not None else get_bucket_region_cache()
+
+    async def _get_bucket_region(self, bucket_name: str) -> str:
+        cached = self._region_cache.get_regions([bucket_name]) if self._region_cache else {}
+        if bucket_name in cached:
+            return cached[bucket_name]
+
+        async with self._client_manager.get_client("s3") as s3:
+            region = await get_bucket_location(s3, bucket_name)
+        if self._region_cache:
+            self._region_cache.put_regions({bucket_name: region})
+        return region
+
+    async def _analyze(self, manifest_path: str) -> Tuple[str, Union[List[Finding], Exception]]:
+        try:
+            analysis = await asyncio.to_thread(analyze_inventory, manifest_path, self._prefix_depth)
+            region_name = await self._get_bucket_region(analysis.bucket)
+        except Exception as e:
+            return manifest_path, e
+        return manifest_path, recommend_lifecycle(analysis, region_name)
+
+    async def stream_under_utilized_resources(self) -> AsyncIterator[Tuple[str, Union[Finding, Dict]]]:
+        manifest_paths = [manifest for path in self._inventory_paths for manifest in find_manifests(path)]
+        tasks = [asyncio.create_task(self._analyze(manifest_path)) for manifest_path in manifest_paths]
+        try:
+            for next_analysis in asyncio.as_completed(tasks):
+                manifest_path, result = await next_analysis
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to analyze S3 Inventory {manifest_path}: {result}")
+                    yield "errors", {"Manifest": manifest_path, "Error": str(result)}
+                    continue
+
+                for finding in result:
+                    yield "s3_lifecycle_recommendations", finding
+        finally:
+            for task in tasks:
+                task.cancel()
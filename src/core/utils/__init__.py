@@ -1,7 +1,8 @@
 import logging
 from typing import List
 
-from .aws_utils import AsyncClientManager
+from .aws_utils import AsyncClientManager, ClientPool, close_client_pool, get_client_pool
+from .pagination import paginate
 
 
 def get_common_elements(list1: List[str], list2: List[str]) -> List[str]:
@@ -14,4 +15,12 @@ def get_logger():
     return logger
 
 
-__all__ = ["get_common_elements", "get_logger", "AsyncClientManager"]
+__all__ = [
+    "get_common_elements",
+    "get_logger",
+    "AsyncClientManager",
+    "ClientPool",
+    "close_client_pool",
+    "get_client_pool",
+    "paginate",
+]
@@ -1,26 +1,146 @@
-from contextlib import asynccontextmanager
+import asyncio
+import weakref
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 
 import aioboto3
+from aiobotocore.config import AioConfig
+
+from src.core.aws.config import Config
+from src.core.aws.constants import AWS_KEEPALIVE_TIMEOUT_SECONDS
+from src.core.utils.rate_limiter import RateLimitedClient, get_rate_limiter
+
+
+class ClientPool:
+    """
+    Process-wide pool of opened AWS clients keyed by service, region and session.
+
+    Clients stay open, with keep-alive connections, until close() is called, so every
+    handler reuses warm connections instead of paying for new TLS handshakes per call.
+    """
+
+    def __init__(self, max_pool_connections: int):
+        # Retries are handled by the shared rate limiter, which also adapts the request rate
+        self._client_config = AioConfig(
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=True,
+            connector_args={"keepalive_timeout": AWS_KEEPALIVE_TIMEOUT_SECONDS},
+            retries={"total_max_attempts": 1},
+        )
+        self._default_session: Optional[aioboto3.Session] = None
+        self._clients: Dict[Tuple[str, str, aioboto3.Session], object] = {}
+        self._account_ids: Dict[aioboto3.Session, asyncio.Future] = {}
+        self._exit_stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+
+    def _resolve_session(self, session: Optional[aioboto3.Session]) -> aioboto3.Session:
+        if session is None:
+            if self._default_session is None:
+                self._default_session = aioboto3.Session()
+            session = self._default_session
+        return session
+
+    async def get_client(self, service_name: str, region_name: str, session: Optional[aioboto3.Session] = None):
+        session = self._resolve_session(session)
+
+        # Sessions carry the credentials, so clients for different accounts never mix
+        key = (service_name, region_name, session)
+        client = self._clients.get(key)
+        if client is None:
+            async with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = await self._exit_stack.enter_async_context(
+                        session.client(service_name, region_name=region_name, config=self._client_config)
+                    )
+                    self._clients[key] = client
+        return client
+
+    async def get_account_id(
+        self, lookup: Callable[[], Awaitable[str]], session: Optional[aioboto3.Session] = None
+    ) -> str:
+        """Return the account of a session's credentials, running lookup once and sharing its result."""
+        session = self._resolve_session(session)
+        account_id = self._account_ids.get(session)
+        if account_id is None:
+            account_id = self._account_ids[session] = asyncio.ensure_future(lookup())
+
+        try:
+            return await account_id
+        except Exception:
+            # A failed lookup is retried by the next caller
+            if self._account_ids.get(session) is account_id:
+                del self._account_ids[session]
+            raise
+
+    async def close(self):
+        self._account_ids.clear()
+        self._clients.clear()
+        await self._exit_stack.aclose()
+
+
+_client_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientPool]" = weakref.WeakKeyDictionary()
+
+
+def get_client_pool() -> ClientPool:
+    """Return the client pool of the running event loop, creating it on first use."""
+    # aiohttp connections are bound to the event loop that opened them
+    loop = asyncio.get_running_loop()
+    client_pool = _client_pools.get(loop)
+    if client_pool is None:
+        client_pool = _client_pools[loop] = ClientPool(Config().get_max_pool_connections)
+    return client_pool
+
+
+async def close_client_pool():
+    """Close every pooled client of the running event loop."""
+    client_pool = _client_pools.pop(asyncio.get_running_loop(), None)
+    if client_pool is not None:
+        await client_pool.close()
 
 
 class AsyncClientManager:
-    """Manages async AWS clients with session reuse"""
+    """Hands out pooled, rate limited async AWS clients"""
 
-    def __init__(self, region_name: str):
+    def __init__(self, region_name: str, session: Optional[aioboto3.Session] = None, account_id: Optional[str] = None):
         self.region_name = region_name
-        self._session = None
+        self.account_id = account_id
+        self._session = session
+
+    @property
+    def scope(self) -> str:
+        """The account and region calls are made in, which AWS quotas and cached metrics are bound to."""
+        return f"{self.account_id}/{self.region_name}" if self.account_id else self.region_name
+
+    async def get_account_id(self) -> str:
+        """The account calls are made in, looked up once per session with sts:GetCallerIdentity if not given."""
+        if self.account_id:
+            return self.account_id
+        return await get_client_pool().get_account_id(self._get_caller_account_id, self._session)
+
+    async def _get_caller_account_id(self) -> str:
+        async with self.get_client("sts") as sts:
+            return (await sts.get_caller_identity())["Account"]
+
+    async def get_cache_scope(self) -> str:
+        """Like scope, but always naming the account, since data cached on disk outlives the credentials."""
+        return f"{await self.get_account_id()}/{self.region_name}"
+
+    def for_region(self, region_name: str) -> "AsyncClientManager":
+        """A client manager with the same credentials and account, calling another region."""
+        if region_name == self.region_name:
+            return self
+        return AsyncClientManager(region_name, session=self._session, account_id=self.account_id)
 
     async def __aenter__(self):
-        self._session = aioboto3.Session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        self._session = None
+        pass
 
     @asynccontextmanager
     async def get_client(self, service_name: str):
-        """Get an async client for the specified service"""
-        # Create a new client each time but reuse the session
-        client = self._session.client(service_name, region_name=self.region_name)
-        async with client as c:
-            yield c
+        """Get an async client for the specified service, rate limited and retried"""
+        # Clients come from the shared pool and outlive this context; close_client_pool() closes them
+        client = await get_client_pool().get_client(service_name, self.region_name, self._session)
+        yield RateLimitedClient(client, service_name, get_rate_limiter(), scope=self.scope)
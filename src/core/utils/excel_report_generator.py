@@ -1,154 +1,180 @@
 import os
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any, Optional
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 
+from src.core.utils.report_summary import ReportSummary, is_resource_list
+
+MAX_COLUMN_WIDTH = 50
+
+
+def get_default_report_path(region: str, extension: str = "xlsx") -> str:
+    """Timestamped report path under the project's reports directory."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    cwd = os.getcwd()
+    return f"{cwd.split('cloud-cost-optimizer')[0]}cloud-cost-optimizer/reports/aws_unused_resources_report_{region}_{timestamp}.{extension}"
+
+
+class _ColumnWidths:
+    """Tracks the widest value of every column while rows are measured."""
+
+    def __init__(self):
+        self._lengths: Dict[int, int] = {}
+
+    def measure(self, values: Iterable[Any]):
+        for col_idx, value in enumerate(values, 1):
+            if value is not None:
+                self._lengths[col_idx] = max(self._lengths.get(col_idx, 0), len(str(value)))
+
+    def apply(self, worksheet):
+        for col_idx, length in self._lengths.items():
+            worksheet.column_dimensions[get_column_letter(col_idx)].width = min(length + 2, MAX_COLUMN_WIDTH)
+
 
 class ExcelReportGenerator:
     """
     Generates Excel reports for AWS unused resources.
     Each service gets its own worksheet with formatted data.
+
+    Worksheets are write-only and rows are appended with shared named styles, so memory stays
+    flat however many resources are reported. Write-only sheets need their column widths before
+    the first row, so a first pass over the values measures them and a second one writes them.
     """
 
     def __init__(self):
-        self.workbook = Workbook()
-        self.header_font = Font(bold=True, color="FFFFFF")
-        self.header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        self.border = Border(
+        self.workbook = Workbook(write_only=True)
+        border = Border(
             left=Side(style="thin"), right=Side(style="thin"), top=Side(style="thin"), bottom=Side(style="thin")
         )
-        self.center_alignment = Alignment(horizontal="center", vertical="center")
+        center_alignment = Alignment(horizontal="center", vertical="center")
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        section_fill = PatternFill(start_color="D9E2F3", end_color="D9E2F3", fill_type="solid")
+
+        for style in [
+            NamedStyle("report_title", font=Font(bold=True, size=16)),
+            NamedStyle("report_generated_on", font=Font(italic=True)),
+            NamedStyle("sheet_title", font=Font(bold=True, size=14)),
+            NamedStyle("section_title", font=Font(bold=True, size=12), fill=section_fill),
+            NamedStyle(
+                "column_header",
+                font=Font(bold=True, color="FFFFFF"),
+                fill=header_fill,
+                alignment=center_alignment,
+                border=border,
+            ),
+            NamedStyle("data_cell", border=border),
+            NamedStyle("number_cell", border=border, alignment=center_alignment),
+            NamedStyle("total_label", font=Font(bold=True), border=border),
+            NamedStyle("total_count", font=Font(bold=True), border=border, alignment=center_alignment),
+        ]:
+            self.workbook.add_named_style(style)
+
+    @staticmethod
+    def _cell(worksheet, value: Any, style: Optional[str] = None) -> WriteOnlyCell:
+        cell = WriteOnlyCell(worksheet, value=value)
+        if style:
+            cell.style = style
+        return cell
 
     def _create_summary_sheet(self, unused_resources: List[Dict[str, Any]], region: str) -> None:
         """Create a summary sheet with overview of all services."""
-        # Remove default sheet and create summary
-        if "Sheet" in self.workbook.sheetnames:
-            self.workbook.remove(self.workbook["Sheet"])
-
-        summary_sheet = self.workbook.create_sheet("Summary", 0)
-
-        # Add title
-        summary_sheet["A1"] = f"AWS Unused Resources Report - {region}"
-        summary_sheet["A1"].font = Font(bold=True, size=16)
-        summary_sheet["A2"] = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        summary_sheet["A2"].font = Font(italic=True)
-
-        # Add summary table headers
-        summary_sheet["A4"] = "Service"
-        summary_sheet["B4"] = "Resource Type"
-        summary_sheet["C4"] = "Count"
-        summary_sheet["D4"] = "Details"
-
-        # Style headers
-        for col in ["A4", "B4", "C4", "D4"]:
-            summary_sheet[col].font = self.header_font
-            summary_sheet[col].fill = self.header_fill
-            summary_sheet[col].alignment = self.center_alignment
-            summary_sheet[col].border = self.border
-
-        row = 5
-        total_resources = 0
-
-        for service_data in unused_resources:
-            for service_name, resources in service_data.items():
-                if isinstance(resources, dict):
-                    for resource_type, resource_list in resources.items():
-                        if isinstance(resource_list, list) and resource_list:
-                            count = len(resource_list)
-                            total_resources += count
-
-                            summary_sheet[f"A{row}"] = service_name.upper()
-                            summary_sheet[f"B{row}"] = resource_type.replace("_", " ").title()
-                            summary_sheet[f"C{row}"] = count
-                            summary_sheet[f"D{row}"] = f"See {service_name.upper()} sheet for details"
-
-                            # Style data rows
-                            for col in ["A", "B", "C", "D"]:
-                                summary_sheet[f"{col}{row}"].border = self.border
-                                if col == "C":
-                                    summary_sheet[f"{col}{row}"].alignment = self.center_alignment
-
-                            row += 1
+        title = f"AWS Unused Resources Report - {region}"
+        generated_on = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        headers = ["Service", "Resource Type", "Count", "Details"]
+
+        summary = ReportSummary.from_unused_resources(unused_resources)
+        total_resources = summary.total
+        rows = [
+            [
+                service_name.upper(),
+                resource_type.replace("_", " ").title(),
+                count,
+                f"See {service_name.upper()} sheet for details",
+            ]
+            for service_name, resource_type, count in summary.rows
+        ]
+
+        column_widths = _ColumnWidths()
+        for values in [[title], [generated_on], headers, *rows, ["TOTAL", None, total_resources]]:
+            column_widths.measure(values)
+
+        summary_sheet = self.workbook.create_sheet("Summary")
+        column_widths.apply(summary_sheet)
+
+        summary_sheet.append([self._cell(summary_sheet, title, "report_title")])
+        summary_sheet.append([self._cell(summary_sheet, generated_on, "report_generated_on")])
+        summary_sheet.append([])
+        summary_sheet.append([self._cell(summary_sheet, header, "column_header") for header in headers])
+
+        for service, resource_type, count, details in rows:
+            summary_sheet.append(
+                [
+                    self._cell(summary_sheet, service, "data_cell"),
+                    self._cell(summary_sheet, resource_type, "data_cell"),
+                    self._cell(summary_sheet, count, "number_cell"),
+                    self._cell(summary_sheet, details, "data_cell"),
+                ]
+            )
 
         # Add total row (always add it, even if 0)
-        summary_sheet[f"A{row}"] = "TOTAL"
-        summary_sheet[f"A{row}"].font = Font(bold=True)
-        summary_sheet[f"C{row}"] = total_resources
-        summary_sheet[f"C{row}"].font = Font(bold=True)
-        summary_sheet[f"C{row}"].alignment = self.center_alignment
-
-        for col in ["A", "B", "C", "D"]:
-            summary_sheet[f"{col}{row}"].border = self.border
-
-        # Auto-adjust column widths
-        for column in summary_sheet.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            summary_sheet.column_dimensions[column_letter].width = adjusted_width
+        summary_sheet.append(
+            [
+                self._cell(summary_sheet, "TOTAL", "total_label"),
+                self._cell(summary_sheet, None, "data_cell"),
+                self._cell(summary_sheet, total_resources, "total_count"),
+                self._cell(summary_sheet, None, "data_cell"),
+            ]
+        )
 
     def _create_service_sheet(self, service_name: str, resources: Dict[str, Any]) -> None:
         """Create a detailed worksheet for a specific service."""
-        sheet_name = service_name.upper()
-        worksheet = self.workbook.create_sheet(sheet_name)
-
-        # Add title
-        worksheet["A1"] = f"{service_name.upper()} Unused Resources"
-        worksheet["A1"].font = Font(bold=True, size=14)
-
-        row = 3
-
+        title = f"{service_name.upper()} Unused Resources"
+        sections = []
         for resource_type, resource_list in resources.items():
-            if isinstance(resource_list, list) and resource_list:
-                # Add resource type header
-                worksheet[f"A{row}"] = f"{resource_type.replace('_', ' ').title()}"
-                worksheet[f"A{row}"].font = Font(bold=True, size=12)
-                worksheet[f"A{row}"].fill = PatternFill(start_color="D9E2F3", end_color="D9E2F3", fill_type="solid")
-                row += 1
-
-                # Add column headers
-                if resource_list:
-                    headers = list(resource_list[0].keys())
-                    for col_idx, header in enumerate(headers, 1):
-                        cell = worksheet.cell(row=row, column=col_idx, value=header.replace("_", " ").title())
-                        cell.font = self.header_font
-                        cell.fill = self.header_fill
-                        cell.alignment = self.center_alignment
-                        cell.border = self.border
-                    row += 1
-
-                    # Add data rows
-                    for resource in resource_list:
-                        for col_idx, header in enumerate(headers, 1):
-                            value = resource.get(header, "")
-                            cell = worksheet.cell(row=row, column=col_idx, value=str(value))
-                            cell.border = self.border
-                            if isinstance(value, (int, float)):
-                                cell.alignment = self.center_alignment
-                        row += 1
-
-                row += 1  # Add spacing between resource types
-
-        # Auto-adjust column widths
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+            if is_resource_list(resource_list) and resource_list:
+                # Filled in by the first pass, as records of one type (e.g. errors) can differ in shape
+                sections.append((resource_type.replace("_", " ").title(), [], resource_list))
+
+        # First pass: collect every column and measure every value so the widths are known before any row is written
+        column_widths = _ColumnWidths()
+        column_widths.measure([title])
+        for section_title, headers, resource_list in sections:
+            column_widths.measure([section_title])
+            columns = {}
+            for resource in resource_list:
+                # Columns keep the order they are first seen in, so earlier rows' widths stay in place
+                columns.update(dict.fromkeys(resource))
+                column_widths.measure(
+                    ["" if resource.get(header) is None else str(resource[header]) for header in columns]
+                )
+            headers.extend(columns)
+            column_widths.measure([header.replace("_", " ").title() for header in headers])
+
+        worksheet = self.workbook.create_sheet(service_name.upper())
+        column_widths.apply(worksheet)
+
+        worksheet.append([self._cell(worksheet, title, "sheet_title")])
+        worksheet.append([])
+
+        # Second pass: append the rows
+        for section_title, headers, resource_list in sections:
+            worksheet.append([self._cell(worksheet, section_title, "section_title")])
+            worksheet.append(
+                [self._cell(worksheet, header.replace("_", " ").title(), "column_header") for header in headers]
+            )
+
+            for resource in resource_list:
+                row = []
+                for header in headers:
+                    value = resource.get(header, "")
+                    style = "number_cell" if isinstance(value, (int, float)) else "data_cell"
+                    row.append(self._cell(worksheet, "" if value is None else str(value), style))
+                worksheet.append(row)
+
+            worksheet.append([])  # Add spacing between resource types
 
     def generate_report(self, unused_resources: List[Dict[str, Any]], region: str, output_path: str = None) -> str:
         """
@@ -163,10 +189,7 @@ class ExcelReportGenerator:
             Path to the generated Excel file
         """
         if not output_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            cwd = os.getcwd()
-            report_path = f"{cwd.split('cloud-cost-optimizer')[0]}cloud-cost-optimizer/reports/aws_unused_resources_report_{region}_{timestamp}.xlsx"
-            output_path = report_path
+            output_path = get_default_report_path(region)
 
         # Create summary sheet
         self._create_summary_sheet(unused_resources, region)
@@ -175,7 +198,7 @@ class ExcelReportGenerator:
         for service_data in unused_resources:
             for service_name, resources in service_data.items():
                 if isinstance(resources, dict) and any(
-                    isinstance(resource_list, list) and resource_list for resource_list in resources.values()
+                    is_resource_list(resource_list) and resource_list for resource_list in resources.values()
                 ):
                     self._create_service_sheet(service_name, resources)
 
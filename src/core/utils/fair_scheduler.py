@@ -0,0 +1,59 @@
+import asyncio
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class FairScheduler:
+    """
+    Runs jobs from many tenants on a fixed number of workers, taking turns between tenants.
+
+    Workers pick the next job round-robin across tenants, and no tenant runs more than
+    max_per_tenant jobs at once, so a tenant with thousands of jobs cannot starve the others.
+    Like asyncio.gather(return_exceptions=True), a job that raises has its exception returned
+    in place of its result.
+    """
+
+    def __init__(self, workers: int, max_per_tenant: Optional[int] = None):
+        self._workers = workers
+        self._max_per_tenant = max_per_tenant or workers
+
+    async def run(self, jobs: Dict[Hashable, List[Callable[[], Awaitable[Any]]]]) -> Dict[Hashable, List[Any]]:
+        results = {tenant: [None] * len(tenant_jobs) for tenant, tenant_jobs in jobs.items()}
+        pending = {tenant: deque(enumerate(tenant_jobs)) for tenant, tenant_jobs in jobs.items() if tenant_jobs}
+        turns = deque(pending)
+        running = Counter()
+        condition = asyncio.Condition()
+
+        def next_job():
+            for _ in range(len(turns)):
+                tenant = turns[0]
+                turns.rotate(-1)
+                if pending[tenant] and running[tenant] < self._max_per_tenant:
+                    return tenant, *pending[tenant].popleft()
+            return None
+
+        async def worker():
+            while True:
+                async with condition:
+                    job = next_job()
+                    while job is None:
+                        if not any(pending.values()):
+                            return
+                        # Every tenant with work left is at its limit; wait for one of its jobs to finish
+                        await condition.wait()
+                        job = next_job()
+                    tenant, idx, run_job = job
+                    running[tenant] += 1
+
+                try:
+                    results[tenant][idx] = await run_job()
+                except Exception as e:
+                    results[tenant][idx] = e
+                finally:
+                    async with condition:
+                        running[tenant] -= 1
+                        condition.notify_all()
+
+        await asyncio.gather(*(worker() for _ in range(self._workers)))
+
+        return results
@@ -0,0 +1,93 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Pagination:
+    """How a list/describe operation pages its results, following botocore's paginator models."""
+
+    result_key: str
+    input_tokens: Tuple[str, ...]
+    output_tokens: Tuple[str, ...]
+    limit_key: str
+    # Largest page the API accepts; botocore's models do not record it
+    max_page_size: int
+    # Response flag set while more pages follow; without one, a returned token means more pages
+    more_results: Optional[str] = None
+
+
+# Paginated operations, keyed like the rate limits by "service.operation".
+PAGINATIONS = {
+    "ec2.describe_volumes": Pagination("Volumes", ("NextToken",), ("NextToken",), "MaxResults", 500),
+    "elb.describe_load_balancers": Pagination(
+        "LoadBalancerDescriptions", ("Marker",), ("NextMarker",), "PageSize", 400
+    ),
+    "elbv2.describe_load_balancers": Pagination("LoadBalancers", ("Marker",), ("NextMarker",), "PageSize", 400),
+    "elbv2.describe_target_groups": Pagination("TargetGroups", ("Marker",), ("NextMarker",), "PageSize", 400),
+    "rds.describe_db_clusters": Pagination("DBClusters", ("Marker",), ("Marker",), "MaxRecords", 100),
+    "rds.describe_db_instances": Pagination("DBInstances", ("Marker",), ("Marker",), "MaxRecords", 100),
+    "s3.list_buckets": Pagination("Buckets", ("ContinuationToken",), ("ContinuationToken",), "MaxBuckets", 10000),
+    "s3.list_multipart_uploads": Pagination(
+        "Uploads",
+        ("KeyMarker", "UploadIdMarker"),
+        ("NextKeyMarker", "NextUploadIdMarker"),
+        "MaxUploads",
+        1000,
+        more_results="IsTruncated",
+    ),
+    "s3.list_object_versions": Pagination(
+        "Versions",
+        ("KeyMarker", "VersionIdMarker"),
+        ("NextKeyMarker", "NextVersionIdMarker"),
+        "MaxKeys",
+        1000,
+        more_results="IsTruncated",
+    ),
+    "s3.list_parts": Pagination(
+        "Parts", ("PartNumberMarker",), ("NextPartNumberMarker",), "MaxParts", 1000, more_results="IsTruncated"
+    ),
+}
+
+
+def _retrieve(request: asyncio.Future):
+    # A prefetched page nobody will read: cancel it, or consume its error so it is not logged as unretrieved
+    if not request.cancel() and not request.cancelled():
+        request.exception()
+
+
+async def paginate(client, service_name: str, operation: str, **kwargs: Any) -> AsyncIterator[List[Dict]]:
+    """
+    Yield every page of a paginated operation, requesting the largest page size the API allows.
+
+    The next page is requested as soon as the current one arrives, so it downloads while the
+    caller works through the current page. Requests go through the client's own methods,
+    so a rate-limited client paces and retries every page.
+    """
+    pagination = PAGINATIONS[f"{service_name}.{operation}"]
+    method = getattr(client, operation)
+    kwargs.setdefault(pagination.limit_key, pagination.max_page_size)
+
+    request = asyncio.ensure_future(method(**kwargs))
+    try:
+        while request is not None:
+            response = await request
+
+            if pagination.more_results:
+                has_more = response.get(pagination.more_results, False)
+            else:
+                has_more = bool(response.get(pagination.output_tokens[0]))
+
+            request = None
+            if has_more:
+                tokens = {
+                    input_token: response[output_token]
+                    for input_token, output_token in zip(pagination.input_tokens, pagination.output_tokens)
+                    if response.get(output_token)
+                }
+                request = asyncio.ensure_future(method(**{**kwargs, **tokens}))
+
+            yield response.get(pagination.result_key, [])
+    finally:
+        if request is not None:
+            _retrieve(request)
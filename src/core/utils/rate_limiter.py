@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import random
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+from src.core.aws.constants import AWS_DEFAULT_RATE_LIMIT, AWS_MAX_ATTEMPTS, AWS_RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "SlowDown",
+    "BandwidthLimitExceeded",
+}
+
+TRANSIENT_ERROR_CODES = {
+    "InternalError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "RequestTimeout",
+    "RequestTimeoutException",
+}
+
+
+def get_error_code(error: Exception) -> Optional[str]:
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code")
+    return None
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    if isinstance(error, ClientError):
+        return error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (EndpointConnectionError, ConnectionClosedError, ConnectTimeoutError, ReadTimeoutError)):
+        return True
+    error_code = get_error_code(error)
+    if error_code in THROTTLING_ERROR_CODES or error_code in TRANSIENT_ERROR_CODES:
+        return True
+    # Server errors are transient whatever code, if any, the service gives them
+    status_code = get_status_code(error)
+    return status_code is not None and status_code >= 500
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate adapts to throttling.
+
+    Each throttled call cuts the rate multiplicatively and each successful call raises it
+    additively (AIMD), so callers converge on the highest rate the API sustains.
+    """
+
+    def __init__(self, rate: float, min_rate: float = 0.5, increase: float = 0.1, decrease: float = 0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self._increase = increase
+        self._decrease = decrease
+        self._capacity = max(rate, 1.0)
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        # The lock queues waiters so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self._increase)
+        # The burst grows back with the rate after a throttle shrank it
+        self._capacity = max(self.rate, 1.0)
+
+    def on_throttle(self):
+        self.rate = max(self.min_rate, self.rate * self._decrease)
+        self._capacity = max(self.rate, 1.0)
+        self._tokens = min(self._tokens, self._capacity)
+
+
+class AdaptiveRateLimiter:
+    """
+    Rate limits and retries AWS API calls, with one token bucket per service and operation.
+
+    Rates come from a map keyed by "service" or "service.operation", the more specific key
+    winning. Throttled and transient errors are retried with exponential backoff and full
+    jitter; anything else, or the last failed attempt, is raised to the caller.
+    """
+
+    def __init__(
+        self,
+        rates: Dict[str, float],
+        default_rate: float,
+        max_attempts: int = 5,
+        base_delay: float = 0.2,
+        max_delay: float = 20.0,
+    ):
+        self._rates = rates
+        self._default_rate = default_rate
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._buckets: Dict[Tuple[str, str, str], AdaptiveTokenBucket] = {}
+
+    def get_bucket(self, service_name: str, operation_name: str, scope: str = "") -> AdaptiveTokenBucket:
+        # AWS quotas apply per region, so each scope (region) gets its own buckets
+        key = (scope, service_name, operation_name)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate = self._rates.get(
+                f"{service_name}.{operation_name}", self._rates.get(service_name, self._default_rate)
+            )
+            bucket = self._buckets[key] = AdaptiveTokenBucket(rate)
+        return bucket
+
+    async def call(
+        self,
+        service_name: str,
+        operation_name: str,
+        api_call: Callable[..., Awaitable[Any]],
+        *args,
+        scope: str = "",
+        **kwargs,
+    ) -> Any:
+        bucket = self.get_bucket(service_name, operation_name, scope)
+
+        for attempt in range(1, self._max_attempts + 1):
+            await bucket.acquire()
+            try:
+                result = await api_call(*args, **kwargs)
+            except Exception as e:
+                if get_error_code(e) in THROTTLING_ERROR_CODES:
+                    bucket.on_throttle()
+
+                if attempt == self._max_attempts or not is_retryable(e):
+                    raise
+
+                logger.warning(f"Retrying {service_name}.{operation_name} after attempt {attempt} failed: {e}")
+
+                await asyncio.sleep(random.uniform(0, min(self._max_delay, self._base_delay * 2**attempt)))
+                continue
+
+            bucket.on_success()
+            return result
+
+
+class RateLimitedClient:
+    """Proxy for an aiobotocore client that routes every API call through a rate limiter."""
+
+    def __init__(self, client, service_name: str, rate_limiter: AdaptiveRateLimiter, scope: str = ""):
+        self._client = client
+        self._service_name = service_name
+        self._rate_limiter = rate_limiter
+        self._scope = scope
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def api_call(*args, **kwargs):
+            return await self._rate_limiter.call(self._service_name, name, attr, *args, scope=self._scope, **kwargs)
+
+        return api_call
+
+
+_rate_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AdaptiveRateLimiter]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Return the limiter shared by every client on the running event loop."""
+    # Buckets hold asyncio locks, which cannot be shared across event loops
+    loop = asyncio.get_running_loop()
+    rate_limiter = _rate_limiters.get(loop)
+    if rate_limiter is None:
+        rate_limiter = _rate_limiters[loop] = AdaptiveRateLimiter(
+            AWS_RATE_LIMITS, AWS_DEFAULT_RATE_LIMIT, max_attempts=AWS_MAX_ATTEMPTS
+        )
+    return rate_limiter
@@ -0,0 +1,406 @@
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections.abc import Collection
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.core.aws.constants import MAX_REPORT_RENDER_WORKERS, PARQUET_ROW_GROUP_SIZE
+from src.core.utils.excel_report_generator import ExcelReportGenerator, get_default_report_path
+from src.core.utils.report_summary import ReportSummary
+from src.models.finding import Finding, to_record
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, json is the fallback
+    orjson = None
+
+
+def _to_json(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+def _to_json_line(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(value, default=str) + "\n").encode("utf-8")
+
+
+_report_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_report_executor() -> ProcessPoolExecutor:
+    """Process pool shared by every report rendered in a worker process, created on first use."""
+    global _report_executor
+    if _report_executor is None:
+        # Spawned workers do not inherit the event loop or the threads running next to it
+        _report_executor = ProcessPoolExecutor(
+            max_workers=MAX_REPORT_RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _report_executor
+
+
+def shutdown_report_executor():
+    global _report_executor
+    if _report_executor is not None:
+        _report_executor.shutdown()
+        _report_executor = None
+
+
+async def close_sinks(sinks: List["ReportSink"]) -> List[str]:
+    """Finish every sink concurrently, off the event loop, and return the paths of the reports."""
+    return list(await asyncio.gather(*(sink.aclose() for sink in sinks)))
+
+
+def _ensure_parent_directory(path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+class ReportSink(ABC):
+    """
+    Receives findings one at a time while a scan is still running.
+
+    The sink counts every finding in a ReportSummary as it arrives, so every format reports
+    the same overview.
+    """
+
+    def __init__(self):
+        self.summary = ReportSummary()
+
+    def write(self, service: str, resource_type: str, resource: Union[Finding, Dict]) -> None:
+        self.summary.add(service, resource_type)
+        self._write(service, resource_type, to_record(resource))
+
+    @abstractmethod
+    def _write(self, service: str, resource_type: str, resource: Dict) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> str:
+        """Finish the report and return its path."""
+        pass
+
+    async def aclose(self) -> str:
+        """Finish the report in a worker thread so the event loop keeps serving AWS calls."""
+        return await asyncio.to_thread(self.close)
+
+
+class RecordSpool(Collection):
+    """
+    Records spooled to a temporary file and read back lazily, in the order they were written.
+
+    A pickled spool reopens the same file read-only, so a worker process can read it while the
+    spool that owns the file deletes it on close.
+    """
+
+    def __init__(self):
+        self._file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8", suffix=".jsonl")
+        self._count = 0
+
+    def __getstate__(self) -> Dict:
+        self._file.flush()
+        return {"path": self._file.name, "count": self._count}
+
+    def __setstate__(self, state: Dict):
+        self._file = open(state["path"], encoding="utf-8")
+        self._count = state["count"]
+
+    def append(self, record: Dict):
+        self._file.write(_to_json(record) + "\n")
+        self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self._file.writable():
+            self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def __contains__(self, record: object) -> bool:
+        return any(spooled == record for spooled in self)
+
+    def close(self):
+        self._file.close()
+
+
+class ExcelReportSink(ReportSink):
+    """
+    Excel needs every finding of a sheet before it can lay it out, so findings are spooled
+    to temporary files per resource type and the workbook is rendered when the sink closes.
+    aclose() hands the spools to a worker process, which reads them back from disk.
+    """
+
+    def __init__(self, region: str, output_path: Optional[str] = None):
+        super().__init__()
+        self._region = region
+        self._output_path = output_path
+        self._spools: Dict[str, Dict[str, RecordSpool]] = {}
+
+    def _write(self, service: str, resource_type: str, resource: Dict) -> None:
+        self._spools.setdefault(service, {}).setdefault(resource_type, RecordSpool()).append(resource)
+
+    def close(self) -> str:
+        return render_excel_report(self._spools, self._region, self._output_path)
+
+    async def aclose(self) -> str:
+        """Render the workbook in the report process pool, so several reports build on separate cores."""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                get_report_executor(), render_excel_report, self._spools, self._region, self._output_path
+            )
+        finally:
+            self._close_spools()
+
+    def _close_spools(self):
+        for resources in self._spools.values():
+            for spool in resources.values():
+                spool.close()
+
+
+def render_excel_report(spools: Dict[str, Dict[str, RecordSpool]], region: str, output_path: Optional[str]) -> str:
+    """Render spooled findings into a workbook; runs in the calling process or a report worker."""
+    try:
+        report_generator = ExcelReportGenerator()
+        return report_generator.generate_report(
+            unused_resources=[{service: resources} for service, resources in spools.items()],
+            region=region,
+            output_path=output_path,
+        )
+    finally:
+        for resources in spools.values():
+            for spool in resources.values():
+                spool.close()
+
+
+class CsvReportSink(ReportSink):
+    """
+    Writes one CSV file per service and resource type, plus summary.csv, into a directory
+    named after the report path.
+
+    Columns come from the first finding of each file. Fields that later findings add are
+    kept as JSON in a trailing Extra column, and nested values are written as JSON.
+    """
+
+    def __init__(self, region: str, output_path: Optional[str] = None):
+        super().__init__()
+        self._output_path = os.path.splitext(output_path or get_default_report_path(region, "csv"))[0]
+        self._writers: Dict[str, tuple] = {}
+
+    def _write(self, service: str, resource_type: str, resource: Dict) -> None:
+        key = f"{service}_{resource_type}"
+        if key not in self._writers:
+            os.makedirs(self._output_path, exist_ok=True)
+            # Line buffering makes each finding visible in the file as soon as it is written
+            csv_file = open(os.path.join(self._output_path, f"{key}.csv"), "w", newline="", buffering=1)
+            headers = list(resource.keys())
+            writer = csv.writer(csv_file)
+            writer.writerow(headers + ["Extra"])
+            self._writers[key] = (csv_file, writer, headers)
+
+        _, writer, headers = self._writers[key]
+        extra = {field: value for field, value in resource.items() if field not in headers}
+        row = [self._to_cell(resource.get(header, "")) for header in headers]
+        writer.writerow(row + [_to_json(extra) if extra else ""])
+
+    @staticmethod
+    def _to_cell(value: Any) -> Any:
+        return _to_json(value) if isinstance(value, (dict, list, tuple)) else value
+
+    def close(self) -> str:
+        for csv_file, _, _ in self._writers.values():
+            csv_file.close()
+
+        os.makedirs(self._output_path, exist_ok=True)
+        with open(os.path.join(self._output_path, "summary.csv"), "w", newline="") as summary_file:
+            writer = csv.writer(summary_file)
+            writer.writerow(["Service", "Resource Type", "Count"])
+            writer.writerows(self.summary.rows)
+            writer.writerow(["TOTAL", "", self.summary.total])
+
+        return self._output_path
+
+
+class JsonlReportSink(ReportSink):
+    """
+    Writes every finding as one JSON line as soon as it arrives, serialized with orjson when
+    it is installed. The summary is written next to it as <report>.summary.json.
+    """
+
+    def __init__(self, region: str, output_path: Optional[str] = None):
+        super().__init__()
+        self._output_path = output_path or get_default_report_path(region, "jsonl")
+        _ensure_parent_directory(self._output_path)
+        self._file = open(self._output_path, "wb")
+
+    def _write(self, service: str, resource_type: str, resource: Dict) -> None:
+        self._file.write(_to_json_line({"service": service, "resource_type": resource_type, "resource": resource}))
+        self._file.flush()
+
+    def close(self) -> str:
+        self._file.close()
+        with open(f"{os.path.splitext(self._output_path)[0]}.summary.json", "wb") as summary_file:
+            summary_file.write(_to_json_line(self.summary.to_dict()))
+        return self._output_path
+
+
+class _ParquetTable:
+    """
+    Parquet writer for one resource type. The schema is inferred from the first row group;
+    values that do not fit their column, and fields that appear later, go to an Extra JSON column.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._rows: List[Dict] = []
+        self._schema = None
+        self._writer = None
+
+    @staticmethod
+    def _infer_type(values: List[Any]):
+        for value in values:
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                return pa.bool_()
+            if isinstance(value, int):
+                return pa.int64()
+            if isinstance(value, float):
+                return pa.float64()
+            if isinstance(value, datetime):
+                return pa.timestamp("us", tz="UTC") if value.tzinfo else pa.timestamp("us")
+            return pa.string()
+        return pa.string()
+
+    @staticmethod
+    def _fits(value: Any, field_type) -> bool:
+        if value is None or pa.types.is_string(field_type):
+            return True
+        if pa.types.is_boolean(field_type):
+            return isinstance(value, bool)
+        if pa.types.is_int64(field_type):
+            return isinstance(value, int) and not isinstance(value, bool)
+        if pa.types.is_float64(field_type):
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+        if pa.types.is_timestamp(field_type):
+            return isinstance(value, datetime) and (value.tzinfo is not None) == (field_type.tz is not None)
+        return False
+
+    @staticmethod
+    def _to_string(value: Any) -> Optional[str]:
+        if value is None or isinstance(value, str):
+            return value
+        return _to_json(value) if isinstance(value, (dict, list, tuple)) else str(value)
+
+    def append(self, resource: Dict):
+        self._rows.append(resource)
+        if len(self._rows) >= PARQUET_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+
+        if self._schema is None:
+            fields = list(dict.fromkeys(field for row in self._rows for field in row))
+            self._schema = pa.schema(
+                [(field, self._infer_type([row.get(field) for row in self._rows])) for field in fields]
+                + [("Extra", pa.string())]
+            )
+            self._writer = pq.ParquetWriter(self._path, self._schema)
+
+        columns = {field.name: [] for field in self._schema}
+        for row in self._rows:
+            extra = {field: value for field, value in row.items() if field not in columns}
+            for field in self._schema:
+                if field.name == "Extra":
+                    continue
+                value = row.get(field.name)
+                if not self._fits(value, field.type):
+                    extra[field.name] = value
+                    value = None
+                elif pa.types.is_string(field.type):
+                    value = self._to_string(value)
+                columns[field.name].append(value)
+            columns["Extra"].append(_to_json(extra) if extra else None)
+
+        self._writer.write_table(pa.table(columns, schema=self._schema))
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ParquetReportSink(ReportSink):
+    """
+    Writes one Parquet file per service and resource type, plus summary.parquet, into a
+    directory named after the report path.
+    """
+
+    def __init__(self, region: str, output_path: Optional[str] = None):
+        super().__init__()
+        self._output_path = os.path.splitext(output_path or get_default_report_path(region, "parquet"))[0]
+        self._tables: Dict[str, _ParquetTable] = {}
+
+    def _write(self, service: str, resource_type: str, resource: Dict) -> None:
+        key = f"{service}_{resource_type}"
+        if key not in self._tables:
+            os.makedirs(self._output_path, exist_ok=True)
+            self._tables[key] = _ParquetTable(os.path.join(self._output_path, f"{key}.parquet"))
+        self._tables[key].append(resource)
+
+    def close(self) -> str:
+        for table in self._tables.values():
+            table.close()
+
+        os.makedirs(self._output_path, exist_ok=True)
+        service, resource_type, count = zip(*self.summary.rows) if self.summary.rows else ((), (), ())
+        pq.write_table(
+            pa.table(
+                {"service": list(service), "resource_type": list(resource_type), "count": list(count)},
+                schema=pa.schema([("service", pa.string()), ("resource_type", pa.string()), ("count", pa.int64())]),
+            ),
+            os.path.join(self._output_path, "summary.parquet"),
+        )
+
+        return self._output_path
+
+
+REPORT_SINKS = {
+    "xlsx": ExcelReportSink,
+    "csv": CsvReportSink,
+    "jsonl": JsonlReportSink,
+    "parquet": ParquetReportSink,
+}
+
+
+def create_report_sink(region: str, output_path: Optional[str] = None) -> ReportSink:
+    """Create the sink matching the extension of output_path, or an Excel sink without one."""
+    report_format = os.path.splitext(output_path)[1].lstrip(".").lower() if output_path else "xlsx"
+    if report_format not in REPORT_SINKS:
+        raise ValueError(f"Unsupported report format: {output_path}")
+
+    return REPORT_SINKS[report_format](region, output_path)
+
+
+def create_report_sinks(formats: List[str], region: str) -> List[ReportSink]:
+    """Create one sink per requested format, each writing to its default report path."""
+    unsupported = [report_format for report_format in formats if report_format not in REPORT_SINKS]
+    if unsupported:
+        raise ValueError(f"Unsupported report formats: {', '.join(unsupported)}")
+
+    return [REPORT_SINKS[report_format](region) for report_format in formats]
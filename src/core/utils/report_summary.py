@@ -0,0 +1,51 @@
+from typing import Any, Dict, List, Tuple
+
+from collections.abc import Collection
+
+
+def is_resource_list(resource_list: Any) -> bool:
+    """Resource lists are lists, or any other sized collection of records such as a spooled one."""
+    return isinstance(resource_list, Collection) and not isinstance(resource_list, (str, bytes, dict))
+
+
+class ReportSummary:
+    """
+    Counts findings per service and resource type, in the order they are first seen.
+
+    Every report format builds its overview from this class. Failed checks ("errors") are
+    listed like any other resource type but are not unused resources, so the total skips them.
+    """
+
+    def __init__(self):
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    @classmethod
+    def from_unused_resources(cls, unused_resources: List[Dict[str, Any]]) -> "ReportSummary":
+        summary = cls()
+        for service_data in unused_resources:
+            for service_name, resources in service_data.items():
+                if isinstance(resources, dict):
+                    for resource_type, resource_list in resources.items():
+                        if is_resource_list(resource_list) and resource_list:
+                            summary.add(service_name, resource_type, len(resource_list))
+        return summary
+
+    def add(self, service: str, resource_type: str, count: int = 1):
+        self._counts[(service, resource_type)] = self._counts.get((service, resource_type), 0) + count
+
+    @property
+    def rows(self) -> List[Tuple[str, str, int]]:
+        return [(service, resource_type, count) for (service, resource_type), count in self._counts.items()]
+
+    @property
+    def total(self) -> int:
+        return sum(count for (_, resource_type), count in self._counts.items() if resource_type != "errors")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "resources": [
+                {"service": service, "resource_type": resource_type, "count": count}
+                for service, resource_type, count in self.rows
+            ],
+            "total": self.total,
+        }
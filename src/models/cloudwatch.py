@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import numpy as np
 
 
 def get_default_statistics():
@@ -17,3 +19,75 @@ class CloudWatchMetric:
     period: int = 600
     statistics: List[str] = field(default_factory=get_default_statistics)
     unit: str = "Count"
+
+
+@dataclass
+class FleetMetricQuery:
+    """A metric fetched for every resource of a namespace at once with a SEARCH expression."""
+
+    namespace: str
+    metric_name: str
+    # Dimension identifying the resource; returned series are keyed by its value
+    dimension_name: str
+    start_time: datetime
+    end_time: datetime
+    period: int = 600
+    statistic: str = "Maximum"
+    unit: str = "Count"
+    # Further dimensions of the metric schema, e.g. StorageType for BucketSizeBytes
+    schema_dimensions: List[str] = field(default_factory=list)
+    # Exact dimension values the series must match, e.g. {"StorageType": "StandardStorage"}
+    filters: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class MetricSeries:
+    """
+    Columnar datapoints of a single metric.
+
+    Timestamps are epoch seconds (int64) and values float64, aligned by position.
+    Aggregations are vectorized and return the given default for an empty series.
+    """
+
+    timestamps: np.ndarray
+    values: np.ndarray
+    unit: str = "Count"
+
+    @classmethod
+    def empty(cls, unit: str = "Count") -> "MetricSeries":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), unit)
+
+    @classmethod
+    def concat(cls, series: List["MetricSeries"], unit: str = "Count") -> "MetricSeries":
+        if not series:
+            return cls.empty(unit)
+        if len(series) == 1:
+            return series[0]
+        return cls(
+            np.concatenate([part.timestamps for part in series]),
+            np.concatenate([part.values for part in series]),
+            series[0].unit,
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def max(self, default: float = 0.0) -> float:
+        return float(self.values.max()) if len(self.values) else default
+
+    def sum(self) -> float:
+        return float(self.values.sum())
+
+    def mean(self, default: float = 0.0) -> float:
+        return float(self.values.mean()) if len(self.values) else default
+
+    def percentile(self, q: float, default: float = 0.0) -> float:
+        return float(np.percentile(self.values, q)) if len(self.values) else default
+
+    def fraction_above(self, threshold: float) -> float:
+        """Share of datapoints strictly above the threshold, 0.0 for an empty series."""
+        return float(np.count_nonzero(self.values > threshold) / len(self.values)) if len(self.values) else 0.0
+
+    def latest(self, default: Optional[float] = None) -> Optional[float]:
+        """Value of the most recent datapoint, whatever order the datapoints arrived in."""
+        return float(self.values[self.timestamps.argmax()]) if len(self.values) else default
@@ -0,0 +1,39 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Union
+
+
+@dataclass(slots=True)
+class Finding:
+    """
+    One under-utilized resource, reduced to the fields the reports show.
+
+    Handlers project a few attributes out of the describe responses instead of keeping the
+    whole boto dict, so every finding has the same small, fixed shape.
+    """
+
+    resource_id: str
+    # CloudFormation-style resource type, e.g. "AWS::EC2::Volume"
+    resource_type: str
+    region: str
+    reason: str
+    # Metric values the finding is based on, e.g. {"RequestCount": 0.0}
+    metrics: Dict[str, float] = field(default_factory=dict)
+    estimated_monthly_cost: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flatten the finding into one report row: fixed columns, then attributes, then metrics."""
+        return {
+            "ResourceId": self.resource_id,
+            "ResourceType": self.resource_type,
+            "Region": self.region,
+            "Reason": self.reason,
+            **self.attributes,
+            **self.metrics,
+            "EstimatedMonthlyCost": self.estimated_monthly_cost,
+        }
+
+
+def to_record(resource: Union[Finding, Dict]) -> Dict[str, Any]:
+    """Report row for a finding; error entries and other plain records are passed through."""
+    return resource.to_dict() if isinstance(resource, Finding) else resource
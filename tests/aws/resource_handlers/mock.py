@@ -1,3 +1,39 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+
+from src.models.cloudwatch import MetricSeries
+
+
+def series_of(*values, unit="Count"):
+    """Build a MetricSeries whose datapoints are one minute apart, newest first"""
+    timestamps = np.arange(len(values), 0, -1, dtype=np.int64) * 60
+    return MetricSeries(timestamps, np.asarray(values, dtype=np.float64), unit)
+
+
+def stream_of(*chunks):
+    """Build a stand-in for CloudWatch.stream_metric_series yielding one MetricSeries per chunk of values"""
+
+    async def stream_metric_series(cloudwatch_metric):
+        for chunk in chunks:
+            yield series_of(*chunk)
+
+    return stream_metric_series
+
+
+def client_manager_for(client):
+    """Build a stand-in for AsyncClientManager whose get_client() always yields the given client"""
+    client_manager = MagicMock()
+    client_manager.scope = "us-east-1"
+    client_manager.get_cache_scope = AsyncMock(return_value="123456789012/us-east-1")
+    client_manager.for_region.return_value = client_manager
+    client_manager.__aenter__ = AsyncMock(return_value=client_manager)
+    client_manager.__aexit__ = AsyncMock(return_value=None)
+    client_manager.get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+    client_manager.get_client.return_value.__aexit__ = AsyncMock(return_value=None)
+    return client_manager
+
+
 mock_volume_response = {
     "Volumes": [
         {
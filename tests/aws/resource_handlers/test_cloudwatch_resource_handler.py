@@ -1,9 +1,10 @@
+import asyncio
 import unittest
-from unittest.mock import patch, AsyncMock
-from datetime import datetime, timedelta
+from unittest.mock import patch, AsyncMock, MagicMock
+from datetime import datetime, timedelta, timezone
 
 from src.core.aws.resource_handlers.cloudwatch import CloudWatch
-from src.models.cloudwatch import CloudWatchMetric
+from src.models.cloudwatch import CloudWatchMetric, FleetMetricQuery
 from tests.aws.resource_handlers.mock import (
     mock_cloudwatch_metric_response,
     mock_cloudwatch_empty_response,
@@ -286,3 +287,364 @@ class TestCloudWatchResourceHandler(unittest.TestCase):
             {"Timestamp": "2023-10-01T12:20:00.000Z", "Sum": 0.0, "Unit": "Count"},
         ]
         self.assertEqual(result, expected_datapoints)
+
+
+def mock_client_manager(client):
+    """Build an AsyncClientManager stand-in whose get_client yields the given client"""
+    manager = MagicMock()
+    manager.get_cache_scope = AsyncMock(return_value="123456789012/us-east-1")
+    manager.__aenter__ = AsyncMock(return_value=manager)
+    manager.__aexit__ = AsyncMock(return_value=False)
+    manager.get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+    manager.get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+    return manager
+
+
+def echo_metric_data(MetricDataQueries, StartTime, EndTime, **kwargs):
+    """Answer every query with a single datapoint equal to its position in the request"""
+    return {
+        "MetricDataResults": [
+            {"Id": query["Id"], "Timestamps": [StartTime], "Values": [float(idx)], "StatusCode": "Complete"}
+            for idx, query in enumerate(MetricDataQueries)
+        ]
+    }
+
+
+class TestCloudWatchBatching(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.end_time = datetime(2025, 9, 10, 12, 0, 30)
+        self.start_time = self.end_time - timedelta(minutes=120)
+        self.mock_cw_client = AsyncMock()
+        self.mock_cw_client.get_metric_data.side_effect = echo_metric_data
+        self.cloudwatch = CloudWatch("us-east-1", batch_window=0)
+        self.cloudwatch._client_manager = mock_client_manager(self.mock_cw_client)
+
+    def _metric(self, instance_id: str, start_time=None, end_time=None):
+        return CloudWatchMetric(
+            namespace="AWS/RDS",
+            metric_name="DatabaseConnections",
+            dimensions=[{"Name": "DBInstanceIdentifier", "Value": instance_id}],
+            start_time=start_time or self.start_time,
+            end_time=end_time or self.end_time,
+        )
+
+    async def test_concurrent_calls_share_one_request(self):
+        """Concurrent get_metrics calls are packed into a single GetMetricData request"""
+        results = await asyncio.gather(*[self.cloudwatch.get_metrics(self._metric(f"db-{i}")) for i in range(10)])
+
+        self.mock_cw_client.get_metric_data.assert_called_once()
+        queries = self.mock_cw_client.get_metric_data.call_args[1]["MetricDataQueries"]
+        self.assertEqual([query["Id"] for query in queries], [f"m{i}" for i in range(1, 11)])
+        self.assertEqual([result[0]["Maximum"] for result in results], [float(i) for i in range(10)])
+
+    async def test_batches_are_capped_at_request_limit(self):
+        """More metrics than a single request can carry are split into maximal batches"""
+        metrics = [self._metric(f"db-{i}") for i in range(1201)]
+
+        results = await self.cloudwatch.get_metrics_batch(metrics)
+
+        batch_sizes = [len(call[1]["MetricDataQueries"]) for call in self.mock_cw_client.get_metric_data.call_args_list]
+        self.assertEqual(sorted(batch_sizes), [201, 500, 500])
+        self.assertEqual(len(results), 1201)
+        self.assertTrue(all(len(result) == 1 for result in results))
+
+    async def test_windows_are_aligned_to_the_minute(self):
+        """Windows differing only by seconds share a batch, distinct windows do not"""
+        other_end_time = self.end_time - timedelta(hours=1)
+        metrics = [
+            self._metric("db-1"),
+            self._metric("db-2", self.start_time + timedelta(seconds=5), self.end_time + timedelta(seconds=5)),
+            self._metric("db-3", other_end_time - timedelta(minutes=120), other_end_time),
+        ]
+
+        await self.cloudwatch.get_metrics_batch(metrics)
+
+        self.assertEqual(self.mock_cw_client.get_metric_data.call_count, 2)
+        windows = {call[1]["EndTime"] for call in self.mock_cw_client.get_metric_data.call_args_list}
+        self.assertEqual(windows, {datetime(2025, 9, 10, 12, 0), datetime(2025, 9, 10, 11, 0)})
+
+    async def test_missing_result_returns_empty_datapoints(self):
+        """A query without a matching MetricDataResults entry resolves to an empty list"""
+        self.mock_cw_client.get_metric_data.side_effect = None
+        self.mock_cw_client.get_metric_data.return_value = {"MetricDataResults": []}
+
+        result = await self.cloudwatch.get_metrics(self._metric("db-1"))
+
+        self.assertEqual(result, [])
+
+    async def test_api_error_is_raised_to_every_caller(self):
+        """A failed batch propagates the error to each waiting caller"""
+        self.mock_cw_client.get_metric_data.side_effect = Exception("CloudWatch API Error")
+
+        results = await asyncio.gather(
+            *[self.cloudwatch.get_metrics(self._metric(f"db-{i}")) for i in range(3)], return_exceptions=True
+        )
+
+        self.assertTrue(all(str(result) == "CloudWatch API Error" for result in results))
+
+
+class TestCloudWatchPagination(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.end_time = datetime(2025, 9, 10, 12, 0)
+        self.start_time = self.end_time - timedelta(days=30)
+        self.mock_cw_client = AsyncMock()
+        self.cloudwatch = CloudWatch("us-east-1", batch_window=0)
+        self.cloudwatch._client_manager = mock_client_manager(self.mock_cw_client)
+        self.metric = CloudWatchMetric(
+            namespace="AWS/RDS",
+            metric_name="DatabaseConnections",
+            dimensions=[{"Name": "DBInstanceIdentifier", "Value": "test-db"}],
+            start_time=self.start_time,
+            end_time=self.end_time,
+            period=60,
+        )
+
+    async def test_stream_follows_next_token(self):
+        """Each page is yielded as its own chunk and NextToken is followed to the end"""
+        self.mock_cw_client.get_metric_data.side_effect = [
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": ["t3", "t2"], "Values": [3.0, 2.0]}], "NextToken": "p2"},
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": ["t1"], "Values": [1.0]}]},
+        ]
+
+        chunks = [chunk async for chunk in self.cloudwatch.stream_metrics(self.metric)]
+
+        self.assertEqual([[point["Maximum"] for point in chunk] for chunk in chunks], [[3.0, 2.0], [1.0]])
+        calls = self.mock_cw_client.get_metric_data.call_args_list
+        self.assertNotIn("NextToken", calls[0][1])
+        self.assertEqual(calls[1][1]["NextToken"], "p2")
+        self.assertEqual(calls[0][1]["MaxDatapoints"], 100800)
+
+    async def test_get_metrics_collects_every_page(self):
+        """get_metrics returns the datapoints of all pages"""
+        self.mock_cw_client.get_metric_data.side_effect = [
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": ["t2"], "Values": [2.0]}], "NextToken": "p2"},
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": ["t1"], "Values": [1.0]}], "NextToken": "p3"},
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": [], "Values": []}]},
+        ]
+
+        result = await self.cloudwatch.get_metrics(self.metric)
+
+        self.assertEqual([point["Timestamp"] for point in result], ["t2", "t1"])
+        self.assertEqual(self.mock_cw_client.get_metric_data.call_count, 3)
+
+    async def test_error_on_later_page_is_raised(self):
+        """An error while paginating is raised to the consumer after the chunks already delivered"""
+        self.mock_cw_client.get_metric_data.side_effect = [
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": ["t2"], "Values": [2.0]}], "NextToken": "p2"},
+            Exception("CloudWatch API Error"),
+        ]
+
+        chunks = []
+        with self.assertRaises(Exception) as context:
+            async for chunk in self.cloudwatch.stream_metrics(self.metric):
+                chunks.append(chunk)
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual("CloudWatch API Error", str(context.exception))
+
+    def _paginate_endlessly(self, pages: int):
+        def get_metric_data(**kwargs):
+            page = int(kwargs.get("NextToken", "1"))
+            response = {"MetricDataResults": [{"Id": "m1", "Timestamps": [f"t{page}"], "Values": [float(page)]}]}
+            if page < pages:
+                response["NextToken"] = str(page + 1)
+            return response
+
+        self.mock_cw_client.get_metric_data.side_effect = get_metric_data
+
+    @patch("src.core.aws.resource_handlers.cloudwatch.CLOUDWATCH_SUBSCRIPTION_QUEUE_SIZE", 2)
+    async def test_slow_consumer_holds_pagination_back(self):
+        """Pages are not fetched further ahead than the subscriber's queue can buffer"""
+        self._paginate_endlessly(10)
+
+        stream = self.cloudwatch.stream_metrics(self.metric)
+        first = await stream.__anext__()
+        for _ in range(20):
+            await asyncio.sleep(0)
+
+        self.assertEqual(first[0]["Maximum"], 1.0)
+        # One page handed over, two buffered and one waiting for room in the queue
+        self.assertEqual(self.mock_cw_client.get_metric_data.call_count, 4)
+
+        remaining = [chunk async for chunk in stream]
+        self.assertEqual([chunk[0]["Maximum"] for chunk in remaining], [float(page) for page in range(2, 11)])
+
+    @patch("src.core.aws.resource_handlers.cloudwatch.CLOUDWATCH_SUBSCRIPTION_QUEUE_SIZE", 2)
+    async def test_consumer_stopping_early_releases_pagination(self):
+        """A subscriber that stops iterating no longer holds back the request it was queued on"""
+        self._paginate_endlessly(10)
+
+        stream = self.cloudwatch.stream_metrics(self.metric)
+        await stream.__anext__()
+        await stream.aclose()
+        for _ in range(50):
+            await asyncio.sleep(0)
+
+        self.assertEqual(self.mock_cw_client.get_metric_data.call_count, 10)
+        self.assertEqual(self.cloudwatch._in_flight, {})
+
+
+class TestCloudWatchSingleFlight(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.end_time = datetime(2025, 9, 10, 12, 0)
+        self.start_time = self.end_time - timedelta(minutes=120)
+        self.mock_cw_client = AsyncMock()
+        self.mock_cw_client.get_metric_data.side_effect = echo_metric_data
+        self.cloudwatch = CloudWatch("us-east-1", batch_window=0)
+        self.cloudwatch._client_manager = mock_client_manager(self.mock_cw_client)
+
+    def _metric(self, cluster_id, start_time=None):
+        return CloudWatchMetric(
+            namespace="AWS/RDS",
+            metric_name="DatabaseConnections",
+            dimensions=[{"Name": "DBClusterIdentifier", "Value": cluster_id}],
+            start_time=start_time or self.start_time,
+            end_time=self.end_time,
+        )
+
+    async def test_identical_requests_share_one_query(self):
+        """Concurrent requests for the same metric and window are sent as one query"""
+        metrics = [self._metric("cluster-1") for _ in range(3)] + [self._metric("cluster-2")]
+        metrics.append(self._metric("cluster-1", self.start_time + timedelta(seconds=10)))
+
+        results = await self.cloudwatch.get_metrics_batch(metrics)
+
+        self.mock_cw_client.get_metric_data.assert_called_once()
+        self.assertEqual(len(self.mock_cw_client.get_metric_data.call_args[1]["MetricDataQueries"]), 2)
+        self.assertEqual([result[0]["Maximum"] for result in results], [0.0, 0.0, 0.0, 1.0, 0.0])
+        self.assertEqual(self.cloudwatch._in_flight, {})
+
+    async def test_finished_requests_are_not_shared(self):
+        """A request made after an identical one completed is sent again"""
+        await self.cloudwatch.get_metrics(self._metric("cluster-1"))
+        await self.cloudwatch.get_metrics(self._metric("cluster-1"))
+
+        self.assertEqual(self.mock_cw_client.get_metric_data.call_count, 2)
+
+    async def test_errors_reach_every_subscriber(self):
+        """All callers sharing a request receive its error"""
+        self.mock_cw_client.get_metric_data.side_effect = Exception("CloudWatch API Error")
+
+        results = await asyncio.gather(
+            *[self.cloudwatch.get_metrics(self._metric("cluster-1")) for _ in range(2)], return_exceptions=True
+        )
+
+        self.mock_cw_client.get_metric_data.assert_called_once()
+        self.assertTrue(all(str(result) == "CloudWatch API Error" for result in results))
+
+    async def test_invalid_dimension_values_skip_the_api(self):
+        """Missing dimension values resolve to no datapoints without a GetMetricData call"""
+        results = await self.cloudwatch.get_metrics_batch([self._metric(None), self._metric("")])
+
+        self.assertEqual(results, [[], []])
+        self.mock_cw_client.get_metric_data.assert_not_called()
+
+
+class TestCloudWatchFleetMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.end_time = datetime(2025, 9, 10, 12, 0)
+        self.mock_cw_client = AsyncMock()
+        self.cloudwatch = CloudWatch("us-east-1", batch_window=0)
+        self.cloudwatch._client_manager = mock_client_manager(self.mock_cw_client)
+        self.start_time = self.end_time - timedelta(minutes=120)
+        self.fleet_query = FleetMetricQuery(
+            namespace="AWS/RDS",
+            metric_name="DatabaseConnections",
+            dimension_name="DBInstanceIdentifier",
+            start_time=self.start_time,
+            end_time=self.end_time,
+        )
+
+    async def test_search_results_are_demultiplexed_by_label(self):
+        """Series from every page are merged per resource, and unseen resources map to no datapoints"""
+        self.mock_cw_client.get_metric_data.side_effect = [
+            {
+                "MetricDataResults": [
+                    {"Id": "fleet", "Label": "db-1", "Timestamps": [self.end_time], "Values": [4.0]},
+                    {"Id": "fleet", "Label": "db-2", "Timestamps": [self.end_time], "Values": [0.0]},
+                ],
+                "NextToken": "p2",
+            },
+            {"MetricDataResults": [{"Id": "fleet", "Label": "db-1", "Timestamps": [self.start_time], "Values": [2.0]}]},
+        ]
+
+        result = await self.cloudwatch.get_fleet_metrics(self.fleet_query, ["db-1", "db-2", "db-3"])
+
+        self.assertEqual(result["db-1"].values.tolist(), [4.0, 2.0])
+        self.assertEqual(result["db-1"].max(), 4.0)
+        self.assertEqual(result["db-2"].values.tolist(), [0.0])
+        self.assertEqual(len(result["db-3"]), 0)
+        query = self.mock_cw_client.get_metric_data.call_args_list[0][1]["MetricDataQueries"][0]
+        self.assertEqual(
+            query["Expression"],
+            "SEARCH('{AWS/RDS,DBInstanceIdentifier} MetricName=\"DatabaseConnections\"', 'Maximum', 600)",
+        )
+        self.assertEqual(query["Label"], "${PROP('Dim.DBInstanceIdentifier')}")
+
+    def test_search_expression_with_schema_and_filters(self):
+        """Schema dimensions and filters are part of the SEARCH expression"""
+        fleet_query = FleetMetricQuery(
+            namespace="AWS/S3",
+            metric_name="BucketSizeBytes",
+            dimension_name="BucketName",
+            start_time=self.end_time,
+            end_time=self.end_time,
+            period=86400,
+            statistic="Average",
+            schema_dimensions=["StorageType"],
+            filters={"StorageType": "StandardStorage"},
+        )
+
+        self.assertEqual(
+            CloudWatch._build_search_expression(fleet_query),
+            'SEARCH(\'{AWS/S3,BucketName,StorageType} MetricName="BucketSizeBytes" StorageType="StandardStorage"\','
+            " 'Average', 86400)",
+        )
+
+    async def test_truncated_search_falls_back_to_batched_queries(self):
+        """When SEARCH returns its maximum of series, missing resources are queried individually"""
+        full_page = {
+            "MetricDataResults": [
+                {"Id": "fleet", "Label": f"db-{i}", "Timestamps": [self.start_time], "Values": [1.0]}
+                for i in range(500)
+            ]
+        }
+        fallback_page = {"MetricDataResults": [{"Id": "m1", "Timestamps": [self.start_time], "Values": [9.0]}]}
+        self.mock_cw_client.get_metric_data.side_effect = [full_page, fallback_page]
+
+        result = await self.cloudwatch.get_fleet_metrics(self.fleet_query, ["db-0", "db-missing"])
+
+        self.assertEqual(result["db-0"].max(), 1.0)
+        self.assertEqual(result["db-missing"].max(), 9.0)
+        fallback_query = self.mock_cw_client.get_metric_data.call_args_list[1][1]["MetricDataQueries"][0]
+        self.assertEqual(
+            fallback_query["MetricStat"]["Metric"]["Dimensions"],
+            [{"Name": "DBInstanceIdentifier", "Value": "db-missing"}],
+        )
+
+
+class TestCloudWatchMetricSeries(unittest.IsolatedAsyncioTestCase):
+    async def test_get_metric_series_across_pages(self):
+        """Pages are converted to epoch timestamps and float values and concatenated"""
+        end_time = datetime(2025, 9, 10, 12, 0, tzinfo=timezone.utc)
+        mock_cw_client = AsyncMock()
+        mock_cw_client.get_metric_data.side_effect = [
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": [end_time], "Values": [2]}], "NextToken": "p2"},
+            {"MetricDataResults": [{"Id": "m1", "Timestamps": [end_time - timedelta(minutes=10)], "Values": [7]}]},
+        ]
+        cloudwatch = CloudWatch("us-east-1", batch_window=0)
+        cloudwatch._client_manager = mock_client_manager(mock_cw_client)
+        metric = CloudWatchMetric(
+            namespace="AWS/RDS",
+            metric_name="DatabaseConnections",
+            dimensions=[{"Name": "DBInstanceIdentifier", "Value": "test-db"}],
+            start_time=datetime(2025, 9, 10, 10, 0),
+            end_time=datetime(2025, 9, 10, 12, 0),
+        )
+
+        series = await cloudwatch.get_metric_series(metric)
+
+        self.assertEqual(series.timestamps.tolist(), [1757505600, 1757505000])
+        self.assertEqual(series.values.tolist(), [2.0, 7.0])
+        self.assertEqual(series.max(), 7.0)
+        self.assertEqual(series.latest(), 2.0)
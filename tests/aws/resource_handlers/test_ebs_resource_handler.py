@@ -1,7 +1,11 @@
 import unittest
+from datetime import datetime, timezone
 from unittest.mock import patch, AsyncMock
 
+import numpy as np
+
 from src.core.aws.resource_handlers.ebs import EbsResourceHandlers
+from src.models.cloudwatch import MetricSeries
 from tests.aws.resource_handlers.mock import mock_volume_response
 
 
@@ -78,3 +82,108 @@ class TestEbsResourceHandlers(unittest.TestCase):
             await ebs_handler.find_under_utilized_resource()
 
         self.assertEqual("API Error", str(context.exception))
+
+
+def daily_series(*values):
+    """One datapoint per day, newest first"""
+    return MetricSeries(np.arange(len(values), 0, -1, dtype=np.int64) * 86400, np.asarray(values, dtype=np.float64))
+
+
+def in_use_volume(volume_id, create_time=datetime(2024, 1, 1, tzinfo=timezone.utc)):
+    return {
+        "VolumeId": volume_id,
+        "VolumeType": "gp3",
+        "Size": 100,
+        "State": "in-use",
+        "AvailabilityZone": "us-east-1a",
+        "CreateTime": create_time,
+        "Attachments": [{"InstanceId": f"i-{volume_id}"}],
+    }
+
+
+class TestEbsIdleVolumes(unittest.IsolatedAsyncioTestCase):
+    def handler_with_volumes(self, *pages, use_fleet_metrics=False):
+        ebs_handler = EbsResourceHandlers("us-east-1", use_fleet_metrics=use_fleet_metrics, idle_iops_threshold=1.0)
+
+        async def stream_volumes(status):
+            for page in pages if status == "in-use" else []:
+                yield page
+
+        ebs_handler._stream_volumes = stream_volumes
+        return ebs_handler
+
+    def test_peak_daily_iops_adds_reads_and_writes_of_a_day(self):
+        peak = EbsResourceHandlers._peak_daily_iops([daily_series(86400.0, 0.0), daily_series(43200.0, 86400.0 * 0.9)])
+
+        self.assertEqual(peak, 1.5)
+        self.assertIsNone(EbsResourceHandlers._peak_daily_iops([daily_series(), daily_series()]))
+
+    async def test_idle_volumes_are_checked_with_one_batch_per_metric(self):
+        """Only volumes below the threshold every day are idle; volumes younger than the window are skipped"""
+        ebs_handler = self.handler_with_volumes(
+            [
+                in_use_volume("vol-idle"),
+                in_use_volume("vol-busy"),
+                in_use_volume("vol-new", create_time=datetime.now(timezone.utc)),
+            ]
+        )
+        io = {
+            "VolumeReadOps": [daily_series(100.0, 0.0), daily_series(0.0, 172800.0)],
+            "VolumeWriteOps": [daily_series(50.0), daily_series(0.0)],
+        }
+        ebs_handler._cw.get_metric_series_batch = AsyncMock(side_effect=lambda metrics: io[metrics[0].metric_name])
+
+        result = await ebs_handler.find_under_utilized_resource()
+
+        [finding] = result["idle_ebs_volumes"]
+        self.assertEqual(finding.resource_id, "vol-idle")
+        self.assertEqual(finding.metrics["VolumeReadOps"], 100.0)
+        self.assertEqual(finding.metrics["VolumeWriteOps"], 50.0)
+        self.assertEqual(finding.attributes["InstanceId"], "i-vol-idle")
+        self.assertEqual(ebs_handler._cw.get_metric_series_batch.await_count, 2)
+        self.assertEqual(
+            [metric.dimensions[0]["Value"] for metric in ebs_handler._cw.get_metric_series_batch.call_args.args[0]],
+            ["vol-idle", "vol-busy"],
+        )
+
+    async def test_fleet_mode_sends_one_search_per_metric(self):
+        ebs_handler = self.handler_with_volumes(
+            [in_use_volume("vol-1")], [in_use_volume("vol-2")], use_fleet_metrics=True
+        )
+        ebs_handler._cw.get_fleet_metrics = AsyncMock(
+            side_effect=lambda query, volume_ids: {volume_id: daily_series(0.0) for volume_id in volume_ids}
+        )
+
+        result = await ebs_handler.find_under_utilized_resource()
+
+        self.assertEqual([finding.resource_id for finding in result["idle_ebs_volumes"]], ["vol-1", "vol-2"])
+        self.assertEqual(
+            [call.args[0].metric_name for call in ebs_handler._cw.get_fleet_metrics.call_args_list],
+            ["VolumeReadOps", "VolumeWriteOps"],
+        )
+
+    async def test_metric_errors_are_reported_per_volume(self):
+        ebs_handler = self.handler_with_volumes([in_use_volume("vol-1"), in_use_volume("vol-2")])
+        ebs_handler._cw.get_metric_series_batch = AsyncMock(side_effect=RuntimeError("Throttled"))
+
+        result = await ebs_handler.find_under_utilized_resource()
+
+        self.assertEqual(
+            result["errors"],
+            [{"VolumeId": "vol-1", "Error": "Throttled"}, {"VolumeId": "vol-2", "Error": "Throttled"}],
+        )
+        self.assertEqual(result["idle_ebs_volumes"], [])
+
+    async def test_volumes_without_datapoints_are_not_idle(self):
+        """A volume CloudWatch has no I/O metrics for is skipped rather than flagged"""
+        ebs_handler = self.handler_with_volumes([in_use_volume("vol-quiet"), in_use_volume("vol-unknown")])
+        io = {
+            "VolumeReadOps": [daily_series(0.0), daily_series()],
+            "VolumeWriteOps": [daily_series(0.0), daily_series()],
+        }
+        ebs_handler._cw.get_metric_series_batch = AsyncMock(side_effect=lambda metrics: io[metrics[0].metric_name])
+
+        result = await ebs_handler.find_under_utilized_resource()
+
+        self.assertEqual([finding.resource_id for finding in result["idle_ebs_volumes"]], ["vol-quiet"])
+        self.assertEqual(result["errors"], [])
@@ -1,11 +1,14 @@
+import asyncio
 import unittest
 from unittest.mock import patch, AsyncMock
 
 from src.core.aws.resource_handlers.lb import LoadBalancerResourceHandlers
 from tests.aws.resource_handlers.mock import (
+    client_manager_for,
     mock_lb_response,
     mock_lb_health_response_all_unhealthy,
     mock_lb_health_response_healthy,
+    series_of,
 )
 
 
@@ -170,8 +173,233 @@ class TestLoadBalancerResourceHandlers(unittest.TestCase):
 
         handler = LoadBalancerResourceHandlers("us-east-1")
 
-        # Should raise the exception
-        with self.assertRaises(Exception) as context:
-            await handler.find_under_utilized_resource()
+        # The failed listing is reported as an error instead of ending the scan
+        result = await handler.find_under_utilized_resource()
+
+        self.assertIn({"LoadBalancerName": None, "Error": "API Error"}, result["errors"])
+
+
+class TestLoadBalancerIdleDetection(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.lb_list = mock_lb_response["LoadBalancerDescriptions"] + [
+            {
+                "LoadBalancerName": "test-lb-tcp",
+                "ListenerDescriptions": [{"Listener": {"Protocol": "TCP", "LoadBalancerPort": 5432}}],
+            }
+        ]
+
+    async def test_idle_lb_batched(self):
+        """HTTP load balancers without requests are flagged, TCP-only ones are not queried"""
+        lb_handler = LoadBalancerResourceHandlers("us-east-1")
+        lb_handler._cw.get_metric_series_batch = AsyncMock(return_value=[series_of(0.0), series_of(12.0), series_of()])
+
+        result = await lb_handler._get_idle_lb(self.lb_list)
+
+        metrics = lb_handler._cw.get_metric_series_batch.call_args[0][0]
+        self.assertEqual(
+            [metric.dimensions[0]["Value"] for metric in metrics],
+            ["test-lb-no-targets", "test-lb-all-unhealthy", "test-lb-healthy"],
+        )
+        self.assertEqual([lb["LoadBalancerName"] for lb in result], ["test-lb-no-targets", "test-lb-healthy"])
+
+    async def test_idle_lb_fleet(self):
+        """In fleet mode request counts come from a single fleet query"""
+        lb_handler = LoadBalancerResourceHandlers("us-east-1", use_fleet_metrics=True)
+        lb_handler._cw.get_fleet_metrics = AsyncMock(
+            return_value={
+                "test-lb-no-targets": series_of(),
+                "test-lb-all-unhealthy": series_of(3.0),
+                "test-lb-healthy": series_of(5.0),
+            }
+        )
+
+        result = await lb_handler._get_idle_lb(self.lb_list)
+
+        lb_handler._cw.get_fleet_metrics.assert_called_once()
+        self.assertEqual([lb["LoadBalancerName"] for lb in result], ["test-lb-no-targets"])
+
+
+class TestLoadBalancerHealthChecks(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.lb_list = [
+            {"LoadBalancerName": f"lb-{index}", "Instances": [{"InstanceId": f"i-{index}"}]} for index in range(6)
+        ]
+        self.elb = AsyncMock()
+        self.lb_handler = LoadBalancerResourceHandlers("us-east-1", client_manager=client_manager_for(self.elb))
+
+    async def test_checks_run_concurrently_within_the_limit(self):
+        """Health checks overlap, but never more than the semaphore allows"""
+        self.lb_handler._health_check_semaphore = asyncio.Semaphore(2)
+        running = []
+        peak = []
+
+        async def describe_instance_health(LoadBalancerName):
+            running.append(LoadBalancerName)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(LoadBalancerName)
+            return mock_lb_health_response_all_unhealthy
+
+        self.elb.describe_instance_health.side_effect = describe_instance_health
+
+        result = await self.lb_handler._get_lb_with_all_unhealthy_targets(self.lb_list)
+
+        self.assertCountEqual(
+            [lb["LoadBalancerName"] for lb in result], [lb["LoadBalancerName"] for lb in self.lb_list]
+        )
+        self.assertEqual(max(peak), 2)
+
+    async def test_failed_checks_are_reported_as_errors(self):
+        """A failed health check is recorded instead of treating the load balancer as healthy"""
+
+        async def describe_instance_health(LoadBalancerName):
+            if LoadBalancerName == "lb-1":
+                raise RuntimeError("Rate exceeded")
+            if LoadBalancerName == "lb-2":
+                return mock_lb_health_response_all_unhealthy
+            return mock_lb_health_response_healthy
+
+        self.elb.describe_instance_health.side_effect = describe_instance_health
+        errors = []
+
+        result = await self.lb_handler._get_lb_with_all_unhealthy_targets(self.lb_list, errors)
+
+        self.assertEqual([lb["LoadBalancerName"] for lb in result], ["lb-2"])
+        self.assertEqual(errors, [{"LoadBalancerName": "lb-1", "Error": "Rate exceeded"}])
+
+
+class TestElbv2ResourceHandlers(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.lb_list = [
+            {
+                "LoadBalancerName": name,
+                "LoadBalancerArn": f"arn:aws:elasticloadbalancing:us-east-1:123456789012:loadbalancer/{prefix}/{name}/1",
+                "Type": lb_type,
+            }
+            for name, prefix, lb_type in [
+                ("alb-busy", "app", "application"),
+                ("alb-idle", "app", "application"),
+                ("nlb-idle", "net", "network"),
+            ]
+        ]
+        self.target_groups = [
+            {"TargetGroupArn": "tg-busy", "LoadBalancerArns": [self.lb_list[0]["LoadBalancerArn"]]},
+            {"TargetGroupArn": "tg-idle", "LoadBalancerArns": [self.lb_list[1]["LoadBalancerArn"]]},
+            {"TargetGroupArn": "tg-broken", "LoadBalancerArns": [self.lb_list[2]["LoadBalancerArn"]]},
+        ]
+        self.elbv2 = AsyncMock()
+        self.lb_handler = LoadBalancerResourceHandlers("us-east-1", client_manager=client_manager_for(self.elbv2))
+
+    async def test_flags_load_balancers_without_healthy_targets(self):
+        """Target health is summed per load balancer, and a failed lookup is reported instead of flagged"""
+
+        async def describe_target_health(TargetGroupArn):
+            if TargetGroupArn == "tg-broken":
+                raise RuntimeError("Rate exceeded")
+            state = "healthy" if TargetGroupArn == "tg-busy" else "unhealthy"
+            return {"TargetHealthDescriptions": [{"TargetHealth": {"State": state}}]}
+
+        self.elbv2.describe_target_health.side_effect = describe_target_health
+
+        findings = [
+            finding
+            async for finding in self.lb_handler._stream_elbv2_with_no_healthy_targets(self.lb_list, self.target_groups)
+        ]
+
+        self.assertEqual(
+            findings,
+            [
+                ("errors", {"TargetGroupArn": "tg-broken", "Error": "Rate exceeded"}),
+                ("elbv2_no_healthy_targets", self.lb_list[1]),
+            ],
+        )
+
+    async def test_idle_detection_batches_every_traffic_metric(self):
+        """Each load balancer type is checked against its own traffic metrics in one batch per metric"""
+        traffic = {"app/alb-busy/1": 120.0}
+
+        async def get_metric_series_batch(metrics):
+            return [series_of(traffic.get(metric.dimensions[0]["Value"], 0.0)) for metric in metrics]
+
+        self.lb_handler._cw.get_metric_series_batch = AsyncMock(side_effect=get_metric_series_batch)
+
+        idle = await self.lb_handler._get_idle_elbv2(self.lb_list)
+
+        self.assertEqual(
+            [(lb["LoadBalancerName"], metrics) for lb, metrics in idle],
+            [
+                ("alb-idle", {"RequestCount": 0.0, "ProcessedBytes": 0.0}),
+                ("nlb-idle", {"ActiveFlowCount": 0.0, "ProcessedBytes": 0.0}),
+            ],
+        )
+        queried = [
+            (metric.namespace, metric.metric_name, metric.unit)
+            for call in self.lb_handler._cw.get_metric_series_batch.call_args_list
+            for metric in call.args[0]
+        ]
+        self.assertIn(("AWS/ApplicationELB", "ProcessedBytes", "Bytes"), queried)
+        self.assertIn(("AWS/NetworkELB", "ActiveFlowCount", "Count"), queried)
+        self.assertEqual(self.lb_handler._cw.get_metric_series_batch.call_count, 4)
+
+    async def test_unavailable_targets_are_not_unhealthy(self):
+        """Lambda targets and groups without health checks report "unavailable" and are not flagged"""
+
+        async def describe_target_health(TargetGroupArn):
+            state = "unhealthy" if TargetGroupArn == "tg-idle" else "unavailable"
+            return {"TargetHealthDescriptions": [{"TargetHealth": {"State": state}}]}
+
+        self.elbv2.describe_target_health.side_effect = describe_target_health
+
+        findings = [
+            finding
+            async for finding in self.lb_handler._stream_elbv2_with_no_healthy_targets(self.lb_list, self.target_groups)
+        ]
 
-        self.assertEqual("API Error", str(context.exception))
+        self.assertEqual(findings, [("elbv2_no_healthy_targets", self.lb_list[1])])
+
+    async def test_failed_idle_checks_do_not_end_the_stream(self):
+        """A failed traffic check is reported per load balancer and the other pass still runs"""
+
+        async def stream_pages():
+            yield [{"LoadBalancerName": "classic"}]
+
+        self.lb_handler._stream_pages = stream_pages
+        self.lb_handler._get_idle_lb = AsyncMock(side_effect=RuntimeError("Rate exceeded"))
+        self.lb_handler._get_elbv2_list = AsyncMock(return_value=self.lb_list)
+        self.lb_handler._get_target_groups = AsyncMock(return_value=[])
+        self.lb_handler._get_idle_elbv2 = AsyncMock(side_effect=RuntimeError("Throttling"))
+
+        findings = [finding async for finding in self.lb_handler.stream_under_utilized_resources()]
+
+        errors = [resource for resource_type, resource in findings if resource_type == "errors"]
+        self.assertEqual(
+            errors,
+            [{"LoadBalancerName": "classic", "Error": "Rate exceeded"}]
+            + [{"LoadBalancerName": lb["LoadBalancerName"], "Error": "Throttling"} for lb in self.lb_list],
+        )
+        self.assertIn("elbv2_no_healthy_targets", [resource_type for resource_type, _ in findings])
+
+    async def test_failed_classic_listing_does_not_skip_elbv2(self):
+        """A denied classic listing is reported and the ELBv2 pass still runs"""
+
+        async def stream_pages():
+            raise RuntimeError("AccessDenied")
+            yield
+
+        self.lb_handler._stream_pages = stream_pages
+        self.lb_handler._get_elbv2_list = AsyncMock(return_value=self.lb_list)
+        self.lb_handler._get_target_groups = AsyncMock(return_value=self.target_groups)
+        self.lb_handler._get_idle_elbv2 = AsyncMock(return_value=[])
+        self.elbv2.describe_target_health.return_value = {"TargetHealthDescriptions": []}
+
+        findings = [finding async for finding in self.lb_handler.stream_under_utilized_resources()]
+
+        self.assertEqual(findings[0], ("errors", {"LoadBalancerName": None, "Error": "AccessDenied"}))
+        self.assertEqual(
+            [
+                resource.resource_id
+                for resource_type, resource in findings
+                if resource_type == "elbv2_no_healthy_targets"
+            ],
+            [lb["LoadBalancerName"] for lb in self.lb_list],
+        )
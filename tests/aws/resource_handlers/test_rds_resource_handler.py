@@ -1,10 +1,14 @@
+import asyncio
 import unittest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
 from src.core.aws.resource_handlers.rds import RdsHandler
 from tests.aws.resource_handlers.mock import (
+    client_manager_for,
     mock_rds_instances_response,
     mock_rds_empty_response,
+    series_of,
+    stream_of,
 )
 
 
@@ -92,50 +96,6 @@ class TestRdsResourceHandler(unittest.TestCase):
         # Should return the maximum value from the datapoints
         self.assertEqual(result, 5.0)
 
-    @patch("src.core.aws.resource_handlers.cloudwatch.CloudWatch.get_metrics")
-    async def test_get_rds_with_no_connections(self, mock_get_metrics):
-        """Test _get_rds_with_no_connections method"""
-        # Mock CloudWatch responses - first cluster has connections, second doesn't
-        mock_get_metrics.side_effect = [
-            [{"Maximum": 5.0}],  # First cluster has connections
-            [],  # Second cluster has no connections
-        ]
-
-        rds_handler = RdsHandler("us-east-1")
-
-        rds_list = [
-            {"DBInstanceIdentifier": "db1", "DBClusterIdentifier": "cluster1"},
-            {"DBInstanceIdentifier": "db2", "DBClusterIdentifier": "cluster2"},
-        ]
-
-        result = await rds_handler._get_rds_with_no_connections(rds_list)
-
-        # Should only return the RDS instance with no connections
-        self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]["DBInstanceIdentifier"], "db2")
-
-    @patch("src.core.aws.resource_handlers.cloudwatch.CloudWatch.get_metrics")
-    async def test_get_rds_instances_with_no_connections(self, mock_get_metrics):
-        """Test _get_rds_instances_with_no_connections method"""
-        # Mock CloudWatch responses - first instance has connections, second doesn't
-        mock_get_metrics.side_effect = [
-            [{"Maximum": 3.0}],  # First instance has connections
-            [],  # Second instance has no connections
-        ]
-
-        rds_handler = RdsHandler("us-east-1")
-
-        rds_list = [
-            {"DBInstanceIdentifier": "db-instance-1"},
-            {"DBInstanceIdentifier": "db-instance-2"},
-        ]
-
-        result = await rds_handler._get_rds_instances_with_no_connections(rds_list)
-
-        # Should only return the RDS instance with no connections
-        self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]["DBInstanceIdentifier"], "db-instance-2")
-
     @patch("src.core.utils.AsyncClientManager")
     @patch("src.core.aws.resource_handlers.cloudwatch.CloudWatch.get_metrics")
     async def test_find_under_utilized_resource_comprehensive(self, mock_get_metrics, mock_get_client):
@@ -247,3 +207,190 @@ class TestRdsResourceHandler(unittest.TestCase):
 
         # Should return 0 when Maximum key is missing
         self.assertEqual(result, 0)
+
+
+class TestRdsMetricStreaming(unittest.IsolatedAsyncioTestCase):
+    async def test_max_connection_across_pages(self):
+        """The maximum is taken over every streamed page"""
+        rds_handler = RdsHandler("us-east-1")
+        rds_handler._cw.stream_metric_series = stream_of([1.0, 0.0], [7.0])
+
+        result = await rds_handler._get_max_connection_for_instance("test-db-instance-1")
+
+        self.assertEqual(result, 7.0)
+
+    async def test_max_connection_without_datapoints(self):
+        """No datapoints at all means the connections are unknown, not zero"""
+        rds_handler = RdsHandler("us-east-1")
+        rds_handler._cw.stream_metric_series = stream_of([])
+
+        result = await rds_handler._get_max_connections_for_cluster("test-cluster-1")
+
+        self.assertIsNone(result)
+
+    def handler_with_inventory(self, use_fleet_metrics=False):
+        rds_handler = RdsHandler("us-east-1", use_fleet_metrics=use_fleet_metrics)
+        rds_handler._get_clusters = AsyncMock(
+            return_value=[
+                {
+                    "DBClusterIdentifier": "cluster1",
+                    "DBClusterMembers": [{"DBInstanceIdentifier": "db1"}, {"DBInstanceIdentifier": "db3"}],
+                }
+            ]
+        )
+
+        async def stream_pages():
+            yield [
+                {"DBInstanceIdentifier": "db1", "DBClusterIdentifier": "cluster1"},
+                {"DBInstanceIdentifier": "db3", "DBClusterIdentifier": "cluster1"},
+            ]
+            yield [{"DBInstanceIdentifier": "db2"}]
+
+        rds_handler._stream_pages = stream_pages
+        return rds_handler
+
+    async def test_each_cluster_and_instance_is_queried_once(self):
+        """Clusters come from describe_db_clusters, so a cluster is queried once however many members it has"""
+        rds_handler = self.handler_with_inventory()
+        queried = []
+
+        async def stream_metric_series(cloudwatch_metric):
+            queried.append(cloudwatch_metric.dimensions[0]["Value"])
+            yield series_of(0.0 if cloudwatch_metric.dimensions[0]["Value"] != "db3" else 4.0)
+
+        rds_handler._cw.stream_metric_series = stream_metric_series
+
+        result = await rds_handler.find_under_utilized_resource()
+
+        self.assertCountEqual(queried, ["cluster1", "db1", "db2", "db3"])
+        self.assertEqual([finding.resource_id for finding in result["rds_with_no_connections"]], ["cluster1"])
+        self.assertEqual(result["rds_with_no_connections"][0].resource_type, "AWS::RDS::DBCluster")
+        self.assertEqual(result["rds_with_no_connections"][0].attributes["DBClusterMembers"], "db1, db3")
+        self.assertCountEqual(
+            [finding.resource_id for finding in result["rds_instances_with_no_connections"]], ["db1", "db2"]
+        )
+
+    async def test_clusters_and_instances_are_checked_together(self):
+        """Cluster and instance queries are in flight at the same time"""
+        rds_handler = self.handler_with_inventory()
+        in_flight = set()
+        overlapped = []
+
+        async def stream_metric_series(cloudwatch_metric):
+            dimension_name = cloudwatch_metric.dimensions[0]["Name"]
+            in_flight.add(dimension_name)
+            await asyncio.sleep(0.01)
+            overlapped.append(len(in_flight))
+            yield series_of(1.0)
+
+        rds_handler._cw.stream_metric_series = stream_metric_series
+
+        await rds_handler.find_under_utilized_resource()
+
+        self.assertIn(2, overlapped)
+
+    async def test_fleet_mode_uses_one_search_per_pass(self):
+        """In fleet mode clusters and instances read connections from a single fleet query each"""
+        rds_handler = self.handler_with_inventory(use_fleet_metrics=True)
+        fleet_metrics = {
+            "DBClusterIdentifier": {"cluster1": series_of(3.0)},
+            "DBInstanceIdentifier": {"db1": series_of(0.0), "db2": series_of(1.0), "db3": series_of(2.0)},
+        }
+        rds_handler._cw.get_fleet_metrics = AsyncMock(
+            side_effect=lambda fleet_query, resource_ids: {
+                resource_id: fleet_metrics[fleet_query.dimension_name].get(resource_id, series_of())
+                for resource_id in resource_ids
+            }
+        )
+
+        result = await rds_handler.find_under_utilized_resource()
+
+        self.assertEqual(rds_handler._cw.get_fleet_metrics.call_count, 2)
+        self.assertEqual(result["rds_with_no_connections"], [])
+        self.assertEqual([finding.resource_id for finding in result["rds_instances_with_no_connections"]], ["db1"])
+
+    async def test_failed_lookups_are_reported_not_dropped(self):
+        """A lookup that fails is recorded as an error instead of silently skipping the resource"""
+        rds_handler = self.handler_with_inventory()
+
+        async def stream_metric_series(cloudwatch_metric):
+            if cloudwatch_metric.dimensions[0]["Value"] in ("db2", "cluster1"):
+                raise RuntimeError("Rate exceeded")
+            yield series_of(0.0)
+
+        rds_handler._cw.stream_metric_series = stream_metric_series
+
+        findings = [finding async for finding in rds_handler.stream_under_utilized_resources()]
+
+        self.assertCountEqual(
+            [(resource_type, resource) for resource_type, resource in findings if resource_type == "errors"],
+            [
+                ("errors", {"DBInstanceIdentifier": "db2", "Error": "Rate exceeded"}),
+                ("errors", {"DBClusterIdentifier": "cluster1", "Error": "Rate exceeded"}),
+            ],
+        )
+        self.assertCountEqual(
+            [resource.resource_id for resource_type, resource in findings if resource_type != "errors"], ["db1", "db3"]
+        )
+
+    async def test_resources_without_datapoints_are_skipped(self):
+        """Resources without DatabaseConnections datapoints are neither idle nor errors"""
+        rds_handler = self.handler_with_inventory()
+
+        async def stream_metric_series(cloudwatch_metric):
+            if cloudwatch_metric.dimensions[0]["Value"] == "db1":
+                yield series_of(0.0)
+
+        rds_handler._cw.stream_metric_series = stream_metric_series
+
+        findings = [finding async for finding in rds_handler.stream_under_utilized_resources()]
+
+        self.assertEqual([resource.resource_id for _, resource in findings], ["db1"])
+
+    async def test_cluster_listing_failure_keeps_checking_instances(self):
+        """A failed describe_db_clusters is reported while the instances are still checked"""
+        for use_fleet_metrics in (False, True):
+            with self.subTest(use_fleet_metrics=use_fleet_metrics):
+                rds_handler = self.handler_with_inventory(use_fleet_metrics=use_fleet_metrics)
+                rds_handler._get_clusters = AsyncMock(side_effect=RuntimeError("Access Denied"))
+                rds_handler._cw.stream_metric_series = stream_of([0.0])
+                rds_handler._cw.get_fleet_metrics = AsyncMock(
+                    side_effect=lambda fleet_query, resource_ids: {
+                        resource_id: series_of(0.0) for resource_id in resource_ids
+                    }
+                )
+
+                findings = [finding async for finding in rds_handler.stream_under_utilized_resources()]
+
+                self.assertIn(("errors", {"DBClusterIdentifier": None, "Error": "Access Denied"}), findings)
+                self.assertCountEqual(
+                    [resource.resource_id for resource_type, resource in findings if resource_type != "errors"],
+                    ["db1", "db2", "db3"],
+                )
+
+    async def test_documentdb_and_neptune_are_not_checked(self):
+        """DocumentDB and Neptune resources are listed by the RDS API but have no AWS/RDS metrics"""
+        rds = MagicMock()
+        rds.describe_db_instances = AsyncMock(
+            return_value={
+                "DBInstances": [
+                    {"DBInstanceIdentifier": "postgres", "Engine": "postgres"},
+                    {"DBInstanceIdentifier": "docs", "Engine": "docdb"},
+                ]
+            }
+        )
+        rds.describe_db_clusters = AsyncMock(
+            return_value={
+                "DBClusters": [
+                    {"DBClusterIdentifier": "aurora", "Engine": "aurora-mysql"},
+                    {"DBClusterIdentifier": "graph", "Engine": "neptune"},
+                ]
+            }
+        )
+        rds_handler = RdsHandler("us-east-1", client_manager=client_manager_for(rds))
+
+        instances = await rds_handler._list_get()
+        clusters = await rds_handler._get_clusters()
+
+        self.assertEqual([instance["DBInstanceIdentifier"] for instance in instances], ["postgres"])
+        self.assertEqual([cluster["DBClusterIdentifier"] for cluster in clusters], ["aurora"])
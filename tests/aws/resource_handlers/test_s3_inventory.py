@@ -0,0 +1,243 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.core.aws.bucket_region_cache import BucketRegionCache
+from src.core.aws.resource_handlers.s3_inventory import (
+    S3InventoryAnalyzer,
+    analyze_inventory,
+    find_manifests,
+    recommend_lifecycle,
+)
+from tests.aws.resource_handlers.mock import client_manager_for
+
+NOW = datetime(2025, 9, 10, tzinfo=timezone.utc)
+MB = 1024 * 1024
+
+# (key, size, age in days, storage class, is delete marker)
+OBJECTS = [
+    ("logs/2024/a.gz", 300 * MB, 400, "STANDARD", False),
+    ("logs/2024/b.gz", 100 * MB, 45, "STANDARD", False),
+    ("logs/2025/c.gz", 100 * MB, 40, "GLACIER_IR", False),
+    ("logs/gone.gz", 0, 10, None, True),
+    ("uploads/new file.bin", 200 * MB, 1, "STANDARD", False),
+    ("uploads/old.bin", 200 * MB, 200, "STANDARD", False),
+    ("tiny/1.json", 1024, 500, "STANDARD", False),
+    ("root.txt", 10, 100, "STANDARD", False),
+]
+
+
+def write_inventory(directory, file_format):
+    """Lay an inventory out like S3 delivers it: <bucket>/<config>/data/ and <bucket>/<config>/<date>/manifest.json"""
+    configuration = os.path.join(directory, "my-bucket", "daily")
+    os.makedirs(os.path.join(configuration, "data"))
+    os.makedirs(os.path.join(configuration, "2025-09-10T01-00Z"))
+    rows = [
+        (key, size, NOW - timedelta(days=age), storage_class, is_delete_marker)
+        for key, size, age, storage_class, is_delete_marker in OBJECTS
+    ]
+
+    if file_format == "CSV":
+        data_file = "data/part-0.csv.gz"
+        with gzip.open(os.path.join(configuration, data_file), "wt", newline="") as csv_file:
+            writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
+            for key, size, modified, storage_class, is_delete_marker in rows:
+                writer.writerow(
+                    [
+                        "my-bucket",
+                        key.replace(" ", "+"),
+                        "" if is_delete_marker else size,
+                        modified.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                        storage_class or "",
+                        str(is_delete_marker).lower(),
+                    ]
+                )
+        file_schema = "Bucket, Key, Size, LastModifiedDate, StorageClass, IsDeleteMarker"
+    else:
+        data_file = "data/part-0.parquet"
+        table = pa.table(
+            {
+                "bucket": ["my-bucket"] * len(rows),
+                "key": [row[0] for row in rows],
+                "size": [None if row[4] else row[1] for row in rows],
+                "last_modified_date": pa.array([row[2] for row in rows], pa.timestamp("ms", tz="UTC")),
+                "storage_class": [row[3] for row in rows],
+                "is_delete_marker": [row[4] for row in rows],
+            }
+        )
+        pq.write_table(table, os.path.join(configuration, data_file), row_group_size=3)
+        file_schema = "message s3.inventory { }"
+
+    manifest_path = os.path.join(configuration, "2025-09-10T01-00Z", "manifest.json")
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(
+            {
+                "sourceBucket": "my-bucket",
+                "fileFormat": file_format,
+                "fileSchema": file_schema,
+                "files": [{"key": f"my-bucket/daily/{data_file}", "size": 1}],
+            },
+            manifest_file,
+        )
+    return manifest_path
+
+
+class TestInventoryAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def summarize(self, analysis):
+        return {key: (group.objects, group.size_bytes) for key, group in analysis.groups.items()}
+
+    def test_csv_inventory_is_grouped_by_prefix_class_and_age(self):
+        """Keys are decoded per prefix, delete markers skipped and ages bucketed"""
+        manifest_path = write_inventory(self.temp_dir.name, "CSV")
+
+        analysis = analyze_inventory(manifest_path, prefix_depth=1, now=NOW)
+
+        self.assertEqual(analysis.bucket, "my-bucket")
+        self.assertEqual(
+            self.summarize(analysis),
+            {
+                ("logs/", "STANDARD", 4): (1, 300 * MB),
+                ("logs/", "STANDARD", 1): (1, 100 * MB),
+                ("logs/", "GLACIER_IR", 1): (1, 100 * MB),
+                ("uploads/", "STANDARD", 0): (1, 200 * MB),
+                ("uploads/", "STANDARD", 3): (1, 200 * MB),
+                ("tiny/", "STANDARD", 4): (1, 1024),
+                ("", "STANDARD", 2): (1, 10),
+            },
+        )
+
+    def test_parquet_inventory_matches_csv_across_batches(self):
+        """Parquet files are read in several batches and aggregate to the same totals"""
+        csv_analysis = analyze_inventory(write_inventory(os.path.join(self.temp_dir.name, "csv"), "CSV"), now=NOW)
+
+        with patch("src.core.aws.resource_handlers.s3_inventory.S3_INVENTORY_BATCH_ROWS", 2):
+            parquet_analysis = analyze_inventory(
+                write_inventory(os.path.join(self.temp_dir.name, "parquet"), "Parquet"), now=NOW
+            )
+
+        self.assertEqual(self.summarize(parquet_analysis), self.summarize(csv_analysis))
+
+    def test_deeper_prefixes(self):
+        """The prefix depth decides how many key components are grouped together"""
+        analysis = analyze_inventory(write_inventory(self.temp_dir.name, "CSV"), prefix_depth=2, now=NOW)
+
+        self.assertIn(("logs/2024/", "STANDARD", 4), analysis.groups)
+        self.assertIn(("uploads/", "STANDARD", 0), analysis.groups)
+
+    def test_prefix_depth_zero_groups_the_whole_bucket(self):
+        """At depth 0 every key falls under the empty prefix"""
+        analysis = analyze_inventory(write_inventory(self.temp_dir.name, "CSV"), prefix_depth=0, now=NOW)
+
+        self.assertEqual({prefix for prefix, _, _ in analysis.groups}, {""})
+        self.assertEqual(analysis.groups[("", "STANDARD", 4)].objects, 2)
+
+    def test_recommendations(self):
+        """Cold prefixes get a lifecycle rule, active ones Intelligent-Tiering, tiny objects nothing"""
+        analysis = analyze_inventory(write_inventory(self.temp_dir.name, "CSV"), now=NOW)
+        analysis.groups[("logs/", "STANDARD", 4)].size_bytes = 300 * 1024**3
+        analysis.groups[("uploads/", "STANDARD", 3)].size_bytes = 200 * 1024**3
+
+        findings = {
+            finding.attributes["Prefix"]: finding for finding in recommend_lifecycle(analysis, "us-east-1", NOW)
+        }
+
+        self.assertEqual(set(findings), {"logs/", "uploads/"})
+        self.assertEqual(findings["logs/"].resource_id, "s3://my-bucket/logs/")
+        self.assertTrue(findings["logs/"].attributes["Recommendation"].startswith("Lifecycle rule"))
+        self.assertEqual(findings["uploads/"].attributes["Recommendation"], "Move to INTELLIGENT_TIERING")
+        # 300 GB moved from STANDARD to GLACIER_IR, plus 100 MB to STANDARD_IA
+        self.assertAlmostEqual(
+            findings["logs/"].metrics["EstimatedMonthlySavings"],
+            round(300 * (0.023 - 0.004) + 100 / 1024 * (0.023 - 0.0125), 2),
+        )
+        self.assertEqual(findings["logs/"].metrics["SizeGB 365d+"], 300.0)
+        self.assertEqual(findings["logs/"].metrics["SizeGB 0-30d"], 0.0)
+
+
+class TestManifestDiscovery(unittest.TestCase):
+    def test_newest_delivery_per_configuration(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for delivery in ("2025-09-08T01-00Z", "2025-09-09T01-00Z"):
+                for configuration in ("a/daily", "b/daily"):
+                    os.makedirs(os.path.join(directory, configuration, delivery))
+                    open(os.path.join(directory, configuration, delivery, "manifest.json"), "w").close()
+
+            manifests = find_manifests(directory)
+
+        self.assertEqual(
+            manifests,
+            [
+                os.path.join(directory, "a/daily/2025-09-09T01-00Z/manifest.json"),
+                os.path.join(directory, "b/daily/2025-09-09T01-00Z/manifest.json"),
+            ],
+        )
+
+
+class TestS3InventoryAnalyzer(unittest.IsolatedAsyncioTestCase):
+    async def test_streams_recommendations_and_errors(self):
+        """Findings are stamped with the bucket's cached region, not the region of the scan"""
+        with tempfile.TemporaryDirectory() as directory:
+            write_inventory(directory, "CSV")
+            region_cache = BucketRegionCache(os.path.join(directory, "regions.sqlite3"))
+            region_cache.put_regions({"my-bucket": "eu-west-1"})
+            s3 = MagicMock()
+            analyzer = S3InventoryAnalyzer(
+                "us-east-1",
+                inventory_paths=[directory, "missing/manifest.json"],
+                client_manager=client_manager_for(s3),
+                region_cache=region_cache,
+            )
+
+            with patch("src.core.aws.resource_handlers.s3_inventory.S3_MIN_MONTHLY_SAVINGS", 0.0):
+                result = await analyzer.find_under_utilized_resource()
+            region_cache.close()
+
+        self.assertEqual(
+            sorted(finding.attributes["Prefix"] for finding in result["s3_lifecycle_recommendations"]),
+            ["logs/", "uploads/"],
+        )
+        self.assertEqual({finding.region for finding in result["s3_lifecycle_recommendations"]}, {"eu-west-1"})
+        self.assertEqual([error["Manifest"] for error in result["errors"]], ["missing/manifest.json"])
+        s3.get_bucket_location.assert_not_called()
+
+    async def test_uncached_bucket_region_is_looked_up(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_inventory(directory, "CSV")
+            s3 = MagicMock()
+            s3.get_bucket_location = AsyncMock(return_value={"LocationConstraint": "EU"})
+            with patch("src.core.aws.resource_handlers.s3_inventory.get_bucket_region_cache", return_value=None):
+                analyzer = S3InventoryAnalyzer(
+                    "us-east-1", inventory_paths=[directory], client_manager=client_manager_for(s3)
+                )
+
+            with patch("src.core.aws.resource_handlers.s3_inventory.S3_MIN_MONTHLY_SAVINGS", 0.0):
+                result = await analyzer.find_under_utilized_resource()
+
+        self.assertEqual({finding.region for finding in result["s3_lifecycle_recommendations"]}, {"eu-west-1"})
+        s3.get_bucket_location.assert_awaited_once_with(Bucket="my-bucket")
+
+    async def test_explicit_prefix_depth_zero_is_kept(self):
+        with patch.dict(os.environ, {"S3_INVENTORY_PREFIX_DEPTH": "2"}):
+            self.assertEqual(S3InventoryAnalyzer("us-east-1", inventory_paths=[], prefix_depth=0)._prefix_depth, 0)
+            self.assertEqual(S3InventoryAnalyzer("us-east-1", inventory_paths=[])._prefix_depth, 2)
+
+    async def test_nothing_to_analyze(self):
+        analyzer = S3InventoryAnalyzer("us-east-1", inventory_paths=[])
+
+        result = await analyzer.find_under_utilized_resource()
+
+        self.assertEqual(result, {"s3_lifecycle_recommendations": [], "errors": []})
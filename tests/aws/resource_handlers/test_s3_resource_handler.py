@@ -1,7 +1,9 @@
 import unittest
-from unittest.mock import patch, AsyncMock
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, AsyncMock, MagicMock
 
-from src.core.aws.resource_handlers.s3 import S3ResourceHandlers
+from src.core.aws.resource_handlers.s3 import S3ResourceHandlers, S3StorageWasteHandlers
 from tests.aws.resource_handlers.mock import (
     mock_s3_buckets_response,
     mock_s3_empty_response,
@@ -9,7 +11,11 @@ from tests.aws.resource_handlers.mock import (
     mock_s3_no_requests_metrics_response,
     mock_s3_bucket_size_metrics_response,
     mock_s3_bucket_size_empty_response,
+    client_manager_for,
+    series_of,
+    stream_of,
 )
+from src.models.finding import Finding, to_record
 
 
 class TestS3ResourceHandlers(unittest.TestCase):
@@ -150,66 +156,6 @@ class TestS3ResourceHandlers(unittest.TestCase):
 
         self.assertEqual("CloudWatch Error", str(context.exception))
 
-    @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_number_of_requests")
-    @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_bucket_size")
-    async def test_get_s3_with_no_requests_success(self, mock_get_bucket_size, mock_get_requests):
-        """Test _get_s3_with_no_requests with mixed results"""
-        # Mock bucket list
-        s3_bucket_list = [
-            {"Name": "test-bucket-1", "CreationDate": "2023-10-01T12:34:56.000Z"},
-            {"Name": "test-bucket-2", "CreationDate": "2023-11-15T08:22:10.000Z"},
-            {"Name": "test-bucket-3", "CreationDate": "2023-12-01T15:45:30.000Z"},
-        ]
-
-        # Mock responses: first bucket has requests, second and third don't
-        mock_get_requests.side_effect = [100.0, 0.0, 0.0]
-        mock_get_bucket_size.side_effect = [1.5, 2.0, None]
-
-        s3_handler = S3ResourceHandlers("us-east-1")
-        result = await s3_handler._get_s3_with_no_requests(s3_bucket_list)
-
-        # Should return only buckets with 0 requests
-        self.assertEqual(len(result), 2)
-        self.assertEqual(result[0]["Name"], "test-bucket-2")
-        self.assertEqual(result[0]["Size"], 2.0)
-        self.assertEqual(result[1]["Name"], "test-bucket-3")
-        self.assertEqual(result[1]["Size"], None)
-
-    @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_number_of_requests")
-    @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_bucket_size")
-    async def test_get_s3_with_no_requests_all_have_requests(self, mock_get_bucket_size, mock_get_requests):
-        """Test _get_s3_with_no_requests when all buckets have requests"""
-        # Mock bucket list
-        s3_bucket_list = [
-            {"Name": "test-bucket-1", "CreationDate": "2023-10-01T12:34:56.000Z"},
-            {"Name": "test-bucket-2", "CreationDate": "2023-11-15T08:22:10.000Z"},
-        ]
-
-        # Mock responses: all buckets have requests
-        mock_get_requests.side_effect = [100.0, 50.0]
-        mock_get_bucket_size.side_effect = [1.5, 2.0]
-
-        s3_handler = S3ResourceHandlers("us-east-1")
-        result = await s3_handler._get_s3_with_no_requests(s3_bucket_list)
-
-        # Should return empty list
-        self.assertEqual(len(result), 0)
-
-    @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_number_of_requests")
-    @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_bucket_size")
-    async def test_get_s3_with_no_requests_empty_list(self, mock_get_bucket_size, mock_get_requests):
-        """Test _get_s3_with_no_requests with empty bucket list"""
-        s3_bucket_list = []
-
-        s3_handler = S3ResourceHandlers("us-east-1")
-        result = await s3_handler._get_s3_with_no_requests(s3_bucket_list)
-
-        # Should return empty list
-        self.assertEqual(len(result), 0)
-        # Should not call the mock methods
-        mock_get_requests.assert_not_called()
-        mock_get_bucket_size.assert_not_called()
-
     @patch("src.core.utils.AsyncClientManager")
     @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_number_of_requests")
     @patch("src.core.aws.resource_handlers.s3.S3ResourceHandlers.get_bucket_size")
@@ -327,4 +273,438 @@ class TestS3ResourceHandlers(unittest.TestCase):
         s3_handler = S3ResourceHandlers("us-east-1")
 
         with self.assertRaises(KeyError):
-            await s3_handler.get_bucket_size("test-bucket-1")
\ No newline at end of file
+            await s3_handler.get_bucket_size("test-bucket-1")
+
+
+class TestS3MetricStreaming(unittest.IsolatedAsyncioTestCase):
+    async def test_number_of_requests_sums_every_page(self):
+        """Request counts are summed across all streamed pages"""
+        s3_handler = S3ResourceHandlers("us-east-1")
+        s3_handler._cw.stream_metric_series = stream_of([100.0, 50.0], [25.0])
+
+        result = await s3_handler.get_number_of_requests("test-bucket-1")
+
+        self.assertEqual(result, 175.0)
+
+    async def test_number_of_requests_without_request_metrics(self):
+        """A bucket without a request metrics configuration has no known request count, not zero"""
+        s3_handler = S3ResourceHandlers("us-east-1")
+        s3_handler._cw.stream_metric_series = stream_of([])
+
+        result = await s3_handler.get_number_of_requests("test-bucket-1")
+
+        self.assertIsNone(result)
+
+    async def test_fleet_requests_without_request_metrics(self):
+        """In fleet mode a bucket missing from the SEARCH results has no known request count"""
+        s3_handler = S3ResourceHandlers("us-east-1", use_fleet_metrics=True)
+        s3_handler._cw.get_fleet_metrics = AsyncMock(
+            side_effect=[
+                {"quiet": series_of(0.0, 0.0), "unmetered": series_of()},
+                {"quiet": series_of(1073741824.0), "unmetered": series_of(1073741824.0)},
+            ]
+        )
+
+        requests, sizes = await s3_handler._get_fleet_requests_and_sizes(["quiet", "unmetered"], "us-east-1")
+
+        self.assertEqual(requests, [0.0, None])
+        self.assertEqual(sizes, [1.0, 1.0])
+
+    async def test_bucket_size_uses_latest_datapoint(self):
+        """Bucket size is read from the newest datapoint"""
+        s3_handler = S3ResourceHandlers("us-east-1")
+        s3_handler._cw.get_metric_series = AsyncMock(return_value=series_of(1073741824.0, 0.0))
+
+        result = await s3_handler.get_bucket_size("test-bucket-1")
+
+        self.assertEqual(result, 1.0)
+
+    async def test_bucket_size_without_datapoints(self):
+        """A bucket without size datapoints has no known size"""
+        s3_handler = S3ResourceHandlers("us-east-1")
+        s3_handler._cw.get_metric_series = AsyncMock(return_value=series_of())
+
+        result = await s3_handler.get_bucket_size("test-bucket-1")
+
+        self.assertIsNone(result)
+
+    async def test_number_of_requests_reads_entire_bucket_filter(self):
+        """Request metrics are queried through the EntireBucket metrics filter"""
+        s3_handler = S3ResourceHandlers("us-east-1")
+        s3_handler._cw.stream_metric_series = MagicMock(side_effect=stream_of())
+
+        await s3_handler.get_number_of_requests("test-bucket-1")
+
+        [metric] = s3_handler._cw.stream_metric_series.call_args.args
+        self.assertIn({"Name": "FilterId", "Value": "EntireBucket"}, metric.dimensions)
+
+    async def test_bucket_size_is_queried_in_bytes(self):
+        """BucketSizeBytes is published in Bytes, so the query must not ask for Count"""
+        s3_handler = S3ResourceHandlers("us-east-1")
+        s3_handler._cw.get_metric_series = AsyncMock(return_value=series_of())
+
+        await s3_handler.get_bucket_size("test-bucket-1")
+
+        [metric] = s3_handler._cw.get_metric_series.call_args.args
+        self.assertEqual(metric.unit, "Bytes")
+
+
+class TestS3UnderUtilizedStreaming(unittest.IsolatedAsyncioTestCase):
+    def handler_with_buckets(self, *pages):
+        s3_handler = S3ResourceHandlers("us-east-1")
+
+        async def stream_pages():
+            for page in pages:
+                yield page
+
+        s3_handler._stream_pages = stream_pages
+        return s3_handler
+
+    async def test_lists_only_buckets_in_own_region(self):
+        """list_buckets is filtered on the handler's region"""
+        s3 = MagicMock()
+        s3.list_buckets = AsyncMock(return_value={"Buckets": [{"Name": "test-bucket-1"}]})
+        s3_handler = S3ResourceHandlers("eu-west-1", client_manager=client_manager_for(s3))
+
+        result = await s3_handler._get_list()
+
+        self.assertEqual(result, [{"Name": "test-bucket-1"}])
+        self.assertEqual(s3.list_buckets.call_args.kwargs["BucketRegion"], "eu-west-1")
+
+    async def test_streams_findings_and_errors(self):
+        """Unused buckets become findings; failed lookups are reported, not dropped"""
+        s3_handler = self.handler_with_buckets(
+            [{"Name": "used", "CreationDate": "2023-10-01"}, {"Name": "unused", "CreationDate": "2023-11-15"}],
+            [{"Name": "broken", "CreationDate": "2023-12-01"}],
+        )
+        requests = {"used": 10.0, "unused": 0.0}
+
+        async def get_number_of_requests(bucket_name, region_name):
+            if bucket_name == "broken":
+                raise RuntimeError("CloudWatch Error")
+            return requests[bucket_name]
+
+        s3_handler.get_number_of_requests = get_number_of_requests
+        s3_handler.get_bucket_size = AsyncMock(return_value=2.0)
+
+        result = [item async for item in s3_handler.stream_under_utilized_resources()]
+
+        self.assertCountEqual(
+            result,
+            [
+                (
+                    "s3_with_no_requests",
+                    Finding(
+                        resource_id="unused",
+                        resource_type="AWS::S3::Bucket",
+                        region="us-east-1",
+                        reason="No requests in the last 7 days",
+                        metrics={"NumberOfRequests": 0.0, "SizeGB": 2.0},
+                        attributes={"CreationDate": "2023-11-15"},
+                    ),
+                ),
+                ("errors", {"BucketName": "broken", "Error": "CloudWatch Error"}),
+            ],
+        )
+
+    async def test_buckets_without_request_metrics_are_skipped(self):
+        """Buckets without request metrics are neither unused nor errors"""
+        s3_handler = self.handler_with_buckets([{"Name": "unmetered", "CreationDate": "2023-10-01"}])
+        s3_handler.get_number_of_requests = AsyncMock(return_value=None)
+        s3_handler.get_bucket_size = AsyncMock(return_value=2.0)
+
+        result = [item async for item in s3_handler.stream_under_utilized_resources()]
+
+        self.assertEqual(result, [])
+
+    async def test_bucket_checks_are_bounded(self):
+        """No more bucket checks run at once than the semaphore allows"""
+        s3_handler = self.handler_with_buckets([{"Name": f"bucket-{i}"} for i in range(10)])
+        s3_handler._bucket_check_semaphore = asyncio.Semaphore(3)
+        running = peak = 0
+
+        async def get_number_of_requests(bucket_name, region_name):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return 0.0
+
+        s3_handler.get_number_of_requests = get_number_of_requests
+        s3_handler.get_bucket_size = AsyncMock(return_value=None)
+
+        result = [item async for item in s3_handler.stream_under_utilized_resources()]
+
+        self.assertEqual(len(result), 10)
+        self.assertEqual(peak, 3)
+
+    async def test_find_groups_findings_by_type(self):
+        """The collected result is keyed by resource type like every other handler"""
+        s3_handler = self.handler_with_buckets([{"Name": "unused"}])
+        s3_handler.get_number_of_requests = AsyncMock(return_value=0.0)
+        s3_handler.get_bucket_size = AsyncMock(return_value=None)
+
+        result = await s3_handler.find_under_utilized_resource()
+
+        self.assertEqual([finding.resource_id for finding in result["s3_with_no_requests"]], ["unused"])
+        self.assertEqual(result["errors"], [])
+
+
+class TestS3BucketRegions(unittest.IsolatedAsyncioTestCase):
+    def handler_with_client(self, s3, region_cache=None, use_fleet_metrics=False):
+        s3_handler = S3ResourceHandlers(
+            "us-east-1",
+            use_fleet_metrics=use_fleet_metrics,
+            client_manager=client_manager_for(s3),
+            all_regions=True,
+            region_cache=region_cache,
+        )
+        return s3_handler
+
+    async def test_resolves_missing_regions(self):
+        """Listed regions are kept, cached ones reused and only the rest looked up"""
+        s3 = MagicMock()
+        s3.list_buckets = AsyncMock(
+            return_value={
+                "Buckets": [
+                    {"Name": "listed", "BucketRegion": "ap-south-1"},
+                    {"Name": "cached"},
+                    {"Name": "legacy"},
+                    {"Name": "eu"},
+                    {"Name": "denied"},
+                ]
+            }
+        )
+        locations = {"legacy": {"LocationConstraint": None}, "eu": {"LocationConstraint": "EU"}}
+
+        async def get_bucket_location(Bucket):
+            if Bucket == "denied":
+                raise RuntimeError("Access Denied")
+            return locations[Bucket]
+
+        s3.get_bucket_location = get_bucket_location
+        region_cache = MagicMock()
+        region_cache.get_regions.return_value = {"cached": "eu-central-1"}
+
+        result = await self.handler_with_client(s3, region_cache)._get_list()
+
+        self.assertNotIn("BucketRegion", s3.list_buckets.call_args.kwargs)
+        self.assertEqual(
+            [bucket.get("BucketRegion") for bucket in result],
+            ["ap-south-1", "eu-central-1", "us-east-1", "eu-west-1", None],
+        )
+        self.assertEqual(str(result[4]["BucketRegionError"]), "Access Denied")
+        region_cache.get_regions.assert_called_once_with(["listed", "cached", "legacy", "eu", "denied"])
+        region_cache.put_regions.assert_called_once_with({"legacy": "us-east-1", "eu": "eu-west-1"})
+
+    async def test_listed_regions_replace_stale_cache_entries(self):
+        """A cached region that list_buckets contradicts is overwritten, e.g. after a name was reused"""
+        s3 = MagicMock()
+        s3.list_buckets = AsyncMock(
+            return_value={
+                "Buckets": [
+                    {"Name": "moved", "BucketRegion": "eu-west-1"},
+                    {"Name": "kept", "BucketRegion": "us-east-1"},
+                ]
+            }
+        )
+        region_cache = MagicMock()
+        region_cache.get_regions.return_value = {"moved": "us-west-2", "kept": "us-east-1"}
+
+        result = await self.handler_with_client(s3, region_cache)._get_list()
+
+        self.assertEqual([bucket["BucketRegion"] for bucket in result], ["eu-west-1", "us-east-1"])
+        region_cache.put_regions.assert_called_once_with({"moved": "eu-west-1"})
+
+    async def test_metrics_are_queried_in_the_bucket_region(self):
+        """Every bucket's metrics go to the CloudWatch of its own region"""
+        s3 = MagicMock()
+        s3.list_buckets = AsyncMock(
+            return_value={
+                "Buckets": [
+                    {"Name": "home", "BucketRegion": "us-east-1"},
+                    {"Name": "away", "BucketRegion": "eu-west-1"},
+                ]
+            }
+        )
+        s3_handler = self.handler_with_client(s3)
+        queried = []
+
+        def stream_metric_series_in(region_name):
+            def stream_metric_series(metric):
+                queried.append((metric.dimensions[0]["Value"], region_name))
+                return stream_of([0.0])(metric)
+
+            return stream_metric_series
+
+        for region_name in ("us-east-1", "eu-west-1"):
+            s3_handler._cloudwatch_for(region_name).stream_metric_series = stream_metric_series_in(region_name)
+        s3_handler.get_bucket_size = AsyncMock(return_value=None)
+
+        result = [item async for item in s3_handler.stream_under_utilized_resources()]
+
+        self.assertCountEqual(queried, [("home", "us-east-1"), ("away", "eu-west-1")])
+        self.assertCountEqual([finding.region for _, finding in result], ["us-east-1", "eu-west-1"])
+
+    async def test_fleet_queries_are_grouped_by_region(self):
+        """Fleet mode sends one query set per region and reports buckets whose region is unknown"""
+        s3 = MagicMock()
+        s3.list_buckets = AsyncMock(
+            return_value={
+                "Buckets": [
+                    {"Name": "a", "BucketRegion": "us-east-1"},
+                    {"Name": "b", "BucketRegion": "eu-west-1"},
+                    {"Name": "c", "BucketRegion": "eu-west-1"},
+                    {"Name": "d"},
+                ]
+            }
+        )
+        s3.get_bucket_location = AsyncMock(side_effect=RuntimeError("Access Denied"))
+        s3_handler = self.handler_with_client(s3, use_fleet_metrics=True)
+        s3_handler._get_fleet_requests_and_sizes = AsyncMock(
+            side_effect=lambda names, region_name: ([0.0] * len(names), [None] * len(names))
+        )
+
+        result = [item async for item in s3_handler.stream_under_utilized_resources()]
+
+        self.assertCountEqual(
+            [call.args for call in s3_handler._get_fleet_requests_and_sizes.call_args_list],
+            [(["a"], "us-east-1"), (["b", "c"], "eu-west-1")],
+        )
+        self.assertCountEqual(
+            [(resource_type, to_record(resource).get("ResourceId")) for resource_type, resource in result],
+            [
+                ("s3_with_no_requests", "a"),
+                ("s3_with_no_requests", "b"),
+                ("s3_with_no_requests", "c"),
+                ("errors", None),
+            ],
+        )
+
+
+GB = 1024**3
+
+
+class TestS3StorageWaste(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.s3 = MagicMock()
+        self.s3.list_multipart_uploads = AsyncMock(return_value={"Uploads": []})
+        self.s3.get_bucket_versioning = AsyncMock(return_value={})
+        self.s3.list_object_versions = AsyncMock(return_value={"Versions": []})
+        self.s3_handler = S3StorageWasteHandlers("us-east-1", client_manager=client_manager_for(self.s3))
+
+    async def test_abandoned_uploads_are_sized_from_their_parts(self):
+        """Only uploads older than the age limit count, with every page of their parts"""
+        now = datetime.now(timezone.utc)
+        self.s3.list_multipart_uploads.return_value = {
+            "Uploads": [
+                {"Key": "old.bin", "UploadId": "1", "Initiated": now - timedelta(days=30)},
+                {"Key": "new.bin", "UploadId": "2", "Initiated": now - timedelta(hours=1)},
+            ]
+        }
+        self.s3.list_parts = AsyncMock(
+            side_effect=[
+                {"Parts": [{"Size": GB}], "IsTruncated": True, "NextPartNumberMarker": 1},
+                {"Parts": [{"Size": GB}], "IsTruncated": False},
+            ]
+        )
+
+        [(resource_type, finding)] = await self.s3_handler._check_bucket_waste({"Name": "my-bucket"})
+
+        self.assertEqual(resource_type, "s3_incomplete_multipart_uploads")
+        self.assertEqual(finding.metrics, {"IncompleteUploads": 1, "ReclaimableGB": 2.0})
+        self.assertEqual(finding.estimated_monthly_cost, 0.05)
+        self.assertTrue(finding.attributes["Complete"])
+        self.assertEqual(self.s3.list_parts.call_args.kwargs["PartNumberMarker"], 1)
+        self.s3.list_object_versions.assert_not_called()
+
+    async def test_noncurrent_versions_of_versioned_buckets(self):
+        """Listing stops early once the scan limit is reached, and the finding says so"""
+        self.s3.get_bucket_versioning.return_value = {"Status": "Enabled"}
+        self.s3.list_object_versions.return_value = {
+            "Versions": [
+                {"Key": "a", "Size": 5 * GB, "IsLatest": True},
+                {"Key": "a", "Size": 3 * GB, "IsLatest": False, "StorageClass": "STANDARD_IA"},
+            ],
+            "IsTruncated": True,
+            "NextKeyMarker": "a",
+            "NextVersionIdMarker": "v1",
+        }
+
+        with patch("src.core.aws.resource_handlers.s3.S3_MAX_RECLAIMABLE_SCAN_BYTES", 2 * GB):
+            [(resource_type, finding)] = await self.s3_handler._check_bucket_waste({"Name": "my-bucket"})
+
+        self.assertEqual(resource_type, "s3_noncurrent_versions")
+        self.assertEqual(finding.metrics, {"NoncurrentVersions": 1, "ReclaimableGB": 3.0})
+        self.assertEqual(finding.estimated_monthly_cost, 0.04)
+        self.assertFalse(finding.attributes["Complete"])
+        self.s3.list_object_versions.assert_awaited_once()
+
+    async def test_small_waste_is_not_reported(self):
+        self.s3.get_bucket_versioning.return_value = {"Status": "Suspended"}
+        self.s3.list_object_versions.return_value = {"Versions": [{"Key": "a", "Size": 10, "IsLatest": False}]}
+
+        self.assertEqual(await self.s3_handler._check_bucket_waste({"Name": "my-bucket"}), [])
+
+    async def test_listing_errors_are_reported(self):
+        self.s3.get_bucket_versioning.side_effect = RuntimeError("Access Denied")
+
+        result = await self.s3_handler._check_bucket_waste({"Name": "my-bucket"})
+
+        self.assertEqual(result, [("errors", {"BucketName": "my-bucket", "Error": "Access Denied"})])
+
+    async def test_part_listings_are_capped_and_stop_at_the_scan_limit(self):
+        """Parts are listed a batch of uploads at a time, and no batch starts once enough waste was found"""
+        initiated = datetime.now(timezone.utc) - timedelta(days=30)
+        self.s3.list_multipart_uploads.return_value = {
+            "Uploads": [{"Key": f"{idx}.bin", "UploadId": str(idx), "Initiated": initiated} for idx in range(25)]
+        }
+        in_flight, peak = 0, 0
+
+        async def list_parts(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return {"Parts": [{"Size": GB}], "IsTruncated": False}
+
+        self.s3.list_parts = AsyncMock(side_effect=list_parts)
+
+        with patch("src.core.aws.resource_handlers.s3.MAX_CONCURRENT_PART_LISTINGS", 10), patch(
+            "src.core.aws.resource_handlers.s3.S3_MAX_RECLAIMABLE_SCAN_BYTES", 15 * GB
+        ):
+            [(_, finding)] = await self.s3_handler._check_bucket_waste({"Name": "my-bucket"})
+
+        self.assertEqual(peak, 10)
+        self.assertEqual(self.s3.list_parts.await_count, 20)
+        self.assertEqual(finding.metrics["IncompleteUploads"], 20)
+        self.assertFalse(finding.attributes["Complete"])
+
+    async def test_buckets_without_a_region_are_reported(self):
+        """A bucket whose region lookup failed is an error, not a bucket without waste"""
+        bucket = {"Name": "my-bucket", "BucketRegionError": RuntimeError("Access Denied")}
+
+        result = await self.s3_handler._check_bucket_waste(bucket)
+
+        self.assertEqual(result, [("errors", {"BucketName": "my-bucket", "Error": "Access Denied"})])
+        self.s3.list_multipart_uploads.assert_not_called()
+
+    async def test_waste_findings_are_streamed_without_request_checks(self):
+        """The waste service lists every bucket but leaves request metrics to the s3 service"""
+
+        async def stream_pages():
+            yield [{"Name": "my-bucket"}]
+
+        self.s3_handler._stream_pages = stream_pages
+        self.s3_handler.get_number_of_requests = AsyncMock(return_value=0.0)
+        self.s3_handler._check_bucket_waste = AsyncMock(return_value=[("s3_noncurrent_versions", "finding")])
+
+        result = await self.s3_handler.find_under_utilized_resource()
+
+        self.assertEqual(
+            result, {"s3_incomplete_multipart_uploads": [], "s3_noncurrent_versions": ["finding"], "errors": []}
+        )
+        self.s3_handler._check_bucket_waste.assert_awaited_once_with({"Name": "my-bucket"})
+        self.s3_handler.get_number_of_requests.assert_not_awaited()
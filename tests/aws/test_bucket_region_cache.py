@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from src.core.aws.bucket_region_cache import BucketRegionCache
+
+
+class TestBucketRegionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "nested", "bucket_regions.sqlite3")
+        self.cache = BucketRegionCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_returns_only_cached_buckets(self):
+        """Unknown buckets are left out of the result"""
+        self.cache.put_regions({"bucket-a": "eu-west-1", "bucket-b": "us-east-1"})
+
+        self.assertEqual(self.cache.get_regions(["bucket-a", "bucket-c"]), {"bucket-a": "eu-west-1"})
+        self.assertEqual(self.cache.get_regions([]), {})
+
+    def test_many_buckets_in_one_lookup(self):
+        """Lookups larger than SQLite's parameter limit are split up"""
+        regions = {f"bucket-{i}": "eu-west-1" for i in range(1200)}
+        self.cache.put_regions(regions)
+
+        self.assertEqual(self.cache.get_regions(regions), regions)
+
+    def test_regions_survive_reopening(self):
+        """A later run reads the regions resolved by an earlier one"""
+        self.cache.put_regions({"bucket-a": "ap-south-1"})
+        self.cache.close()
+
+        self.cache = BucketRegionCache(self.path)
+
+        self.assertEqual(self.cache.get_regions(["bucket-a"]), {"bucket-a": "ap-south-1"})
+
+    def test_expired_regions_are_not_returned(self):
+        """Entries older than the TTL are resolved again, since a deleted bucket's name can be reused"""
+        self.cache.put_regions({"bucket-a": "eu-west-1"})
+        self.cache.close()
+
+        self.cache = BucketRegionCache(self.path, ttl=-1)
+
+        self.assertEqual(self.cache.get_regions(["bucket-a"]), {})
+
+    def test_caches_without_resolution_times_are_dropped(self):
+        """A cache written before entries expired is discarded instead of trusted forever"""
+        self.cache.close()
+        connection = sqlite3.connect(self.path)
+        connection.executescript(
+            "DROP TABLE bucket_regions;"
+            "CREATE TABLE bucket_regions (bucket TEXT PRIMARY KEY, region TEXT NOT NULL);"
+            "INSERT INTO bucket_regions VALUES ('bucket-a', 'eu-west-1');"
+        )
+        connection.close()
+
+        self.cache = BucketRegionCache(self.path)
+
+        self.assertEqual(self.cache.get_regions(["bucket-a"]), {})
+        self.cache.put_regions({"bucket-a": "us-east-1"})
+        self.assertEqual(self.cache.get_regions(["bucket-a"]), {"bucket-a": "us-east-1"})
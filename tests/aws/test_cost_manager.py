@@ -1,7 +1,15 @@
+import asyncio
 import unittest
 from unittest.mock import patch, AsyncMock, MagicMock
 
-from src.core.aws.cost_manager import AwsCostManager
+from src.core.aws.cost_manager import (
+    AwsCostManager,
+    MultiRegionCostManager,
+    OrganizationCostManager,
+    collect_findings,
+)
+from src.core.aws.resource_handlers.ebs import EbsResourceHandlers
+from src.models.finding import Finding
 from tests.aws.resource_handlers.mock import (
     mock_volume_response,
     mock_lb_response,
@@ -320,3 +328,348 @@ class TestAwsCostManager(unittest.TestCase):
         self.assertIn("ebs", unused_resources[0])
 
         self.assertEqual(report_path, "ebs_report.xlsx")
+
+
+class TestAwsCostManagerConcurrency(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._aws_cost_manager = AwsCostManager("us-east-1")
+
+    def _set_handler(self, service, find_under_utilized_resource):
+        handler = MagicMock()
+        handler.find_under_utilized_resource = find_under_utilized_resource
+        self._aws_cost_manager._resource_strategy[service] = handler
+
+    async def test_services_run_concurrently(self):
+        """Handlers overlap instead of running one after another"""
+        running = []
+        max_running = 0
+
+        async def scan():
+            nonlocal max_running
+            running.append(1)
+            max_running = max(max_running, len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            return {"found": []}
+
+        for service in ["ebs", "lb", "rds"]:
+            self._set_handler(service, scan)
+
+        unused_resources = await self._aws_cost_manager.get_unused_resources(["ebs", "lb", "rds"])
+
+        self.assertEqual(max_running, 3)
+        self.assertCountEqual([service for result in unused_resources for service in result], ["ebs", "lb", "rds"])
+
+    async def test_semaphore_limits_concurrent_scans(self):
+        """A shared semaphore caps how many services are scanned at once"""
+        self._aws_cost_manager._scan_semaphore = asyncio.Semaphore(1)
+        running = []
+        max_running = 0
+
+        async def scan():
+            nonlocal max_running
+            running.append(1)
+            max_running = max(max_running, len(running))
+            await asyncio.sleep(0)
+            running.pop()
+            return {}
+
+        for service in ["ebs", "lb", "rds"]:
+            self._set_handler(service, scan)
+
+        await self._aws_cost_manager.get_unused_resources(["ebs", "lb", "rds"])
+
+        self.assertEqual(max_running, 1)
+
+    async def test_failing_service_produces_partial_report(self):
+        """One service raising becomes an error entry while the others still report"""
+        self._set_handler("ebs", AsyncMock(return_value={"unused_ebs_volumes": [{"VolumeId": "vol-1"}]}))
+        self._set_handler("rds", AsyncMock(side_effect=RuntimeError("AccessDenied")))
+
+        unused_resources = await self._aws_cost_manager.get_unused_resources(["ebs", "rds"])
+
+        self.assertCountEqual(
+            unused_resources,
+            [
+                {"ebs": {"unused_ebs_volumes": [{"VolumeId": "vol-1"}]}},
+                {"rds": {"errors": [{"Error": "AccessDenied"}]}},
+            ],
+        )
+
+    async def test_slow_service_times_out(self):
+        """A service exceeding its timeout is cut off and reported as an error"""
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        self._set_handler("lb", hang)
+        self._aws_cost_manager._config.get_service_timeout = MagicMock(return_value=0.01)
+
+        unused_resources = await self._aws_cost_manager.get_unused_resources(["lb"])
+
+        self.assertEqual(unused_resources, [{"lb": {"errors": [{"Error": "Timed out after 0.01 seconds"}]}}])
+
+
+class TestAwsCostManagerStreaming(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._aws_cost_manager = AwsCostManager("us-east-1")
+
+    def _set_handler(self, service, stream_under_utilized_resources):
+        handler = MagicMock()
+        handler.stream_under_utilized_resources = stream_under_utilized_resources
+        self._aws_cost_manager._resource_strategy[service] = handler
+
+    async def test_findings_arrive_before_slow_services_finish(self):
+        """A fast service's findings are yielded while a slow service is still scanning"""
+        slow_service_done = asyncio.Event()
+
+        async def fast():
+            yield "unused_ebs_volumes", {"VolumeId": "vol-1"}
+
+        async def slow():
+            await slow_service_done.wait()
+            yield "idle_lb", {"LoadBalancerName": "lb-1"}
+
+        self._set_handler("ebs", fast)
+        self._set_handler("lb", slow)
+
+        stream = self._aws_cost_manager.stream_unused_resources(["ebs", "lb"])
+        first = await anext(stream)
+        slow_service_done.set()
+        rest = [finding async for finding in stream]
+
+        self.assertEqual(first, ("ebs", "unused_ebs_volumes", {"VolumeId": "vol-1"}))
+        self.assertEqual(rest, [("lb", "idle_lb", {"LoadBalancerName": "lb-1"})])
+
+    async def test_failing_service_streams_an_error(self):
+        async def fail():
+            raise RuntimeError("AccessDenied")
+            yield
+
+        self._set_handler("rds", fail)
+
+        findings = [finding async for finding in self._aws_cost_manager.stream_unused_resources(["rds"])]
+
+        self.assertEqual(findings, [("rds", "errors", {"Error": "AccessDenied"})])
+
+    async def test_write_unused_resources_feeds_every_sink(self):
+        async def scan():
+            yield "unused_ebs_volumes", {"VolumeId": "vol-1"}
+            yield "unused_ebs_volumes", {"VolumeId": "vol-2"}
+
+        self._set_handler("ebs", scan)
+        sinks = [MagicMock(), MagicMock()]
+        sinks[0].aclose = AsyncMock(return_value="report.xlsx")
+        sinks[1].aclose = AsyncMock(return_value="report.jsonl")
+
+        report_paths = await self._aws_cost_manager.write_unused_resources(sinks, ["ebs"])
+
+        self.assertEqual(report_paths, ["report.xlsx", "report.jsonl"])
+        for sink in sinks:
+            self.assertEqual(
+                [call.args for call in sink.write.call_args_list],
+                [
+                    ("ebs", "unused_ebs_volumes", {"VolumeId": "vol-1"}),
+                    ("ebs", "unused_ebs_volumes", {"VolumeId": "vol-2"}),
+                ],
+            )
+
+
+class TestMultiRegionCostManager(unittest.IsolatedAsyncioTestCase):
+    async def test_collect_findings_merges_records_per_service(self):
+        async def findings():
+            yield "ebs", "unused_ebs_volumes", {"Region": "us-east-1", "VolumeId": "vol-1"}
+            yield "rds", "errors", {"Region": "us-east-1", "Error": "Throttled"}
+            yield "ebs", "unused_ebs_volumes", {"Region": "eu-west-1", "VolumeId": "vol-2"}
+
+        collected = await collect_findings(findings())
+
+        self.assertEqual(
+            collected,
+            [
+                {
+                    "ebs": {
+                        "unused_ebs_volumes": [
+                            {"Region": "us-east-1", "VolumeId": "vol-1"},
+                            {"Region": "eu-west-1", "VolumeId": "vol-2"},
+                        ]
+                    }
+                },
+                {"rds": {"errors": [{"Region": "us-east-1", "Error": "Throttled"}]}},
+            ],
+        )
+
+    async def test_discovers_enabled_regions(self):
+        ec2 = AsyncMock()
+        ec2.describe_regions.return_value = {"Regions": [{"RegionName": "us-west-2"}, {"RegionName": "eu-west-1"}]}
+        client_manager = MagicMock()
+        client_manager.__aenter__ = AsyncMock(return_value=client_manager)
+        client_manager.__aexit__ = AsyncMock(return_value=None)
+        client_manager.get_client.return_value.__aenter__ = AsyncMock(return_value=ec2)
+        client_manager.get_client.return_value.__aexit__ = AsyncMock(return_value=None)
+
+        with patch("src.core.aws.cost_manager.AsyncClientManager", return_value=client_manager):
+            regions = await MultiRegionCostManager().get_enabled_regions()
+
+        self.assertEqual(regions, ["eu-west-1", "us-west-2"])
+        ec2.describe_regions.assert_awaited_once_with(
+            Filters=[{"Name": "opt-in-status", "Values": ["opt-in-not-required", "opted-in"]}]
+        )
+
+    async def test_regions_are_scanned_concurrently_within_the_limit(self):
+        running = []
+        max_running = 0
+
+        async def feed_service(cost_manager, service, queue, tags=None):
+            nonlocal max_running
+            running.append(cost_manager._region)
+            max_running = max(max_running, len(running))
+            await asyncio.sleep(0.01)
+            running.remove(cost_manager._region)
+            await queue.put((service, "unused_ebs_volumes", {**tags, "VolumeId": f"vol-{cost_manager._region}"}))
+
+        regions = ["us-east-1", "us-west-2", "eu-west-1"]
+        manager = MultiRegionCostManager(regions, max_concurrent_regions=2)
+
+        with patch.object(AwsCostManager, "feed_service", autospec=True, side_effect=feed_service):
+            unused_resources = await manager.get_unused_resources(["ebs"])
+
+        self.assertEqual(max_running, 2)
+        self.assertCountEqual(
+            [volume["Region"] for volume in unused_resources[0]["ebs"]["unused_ebs_volumes"]],
+            regions,
+        )
+
+    async def test_regions_share_the_service_scan_budget(self):
+        manager = MultiRegionCostManager(["us-east-1", "eu-west-1"])
+        semaphores = []
+
+        async def feed_service(cost_manager, service, queue, tags=None):
+            semaphores.append(cost_manager._scan_semaphore)
+
+        with patch.object(AwsCostManager, "feed_service", autospec=True, side_effect=feed_service):
+            await manager.get_unused_resources()
+
+        self.assertTrue(all(semaphore is semaphores[0] for semaphore in semaphores))
+
+    async def test_only_a_lone_region_covers_every_bucket_region(self):
+        """A lone regional scan checks every bucket, each region of a multi-region scan only its own"""
+        self.assertTrue(AwsCostManager("us-east-1")._resource_strategy["s3"]._all_regions)
+        manager = MultiRegionCostManager(["us-east-1", "eu-west-1"])
+
+        with patch.object(AwsCostManager, "feed_service", AsyncMock()):
+            with patch("src.core.aws.cost_manager.AwsCostManager", wraps=AwsCostManager) as cost_manager_class:
+                await manager.get_unused_resources()
+
+        self.assertEqual(
+            [call.kwargs["all_bucket_regions"] for call in cost_manager_class.call_args_list], [False, False]
+        )
+
+    async def test_write_streams_tagged_findings_into_the_sinks(self):
+        """Every region's findings reach the sinks tagged with their region, without a merged result in between"""
+        manager = MultiRegionCostManager(["us-east-1", "eu-west-1"])
+
+        async def feed_service(cost_manager, service, queue, tags=None):
+            await queue.put((service, "unused_ebs_volumes", {**tags, "VolumeId": f"vol-{cost_manager._region}"}))
+
+        sink = MagicMock()
+        sink.aclose = AsyncMock(return_value="report.jsonl")
+
+        with patch.object(AwsCostManager, "feed_service", autospec=True, side_effect=feed_service):
+            with patch.object(MultiRegionCostManager, "get_unused_resources") as get_unused_resources:
+                report_paths = await manager.write_unused_resources([sink], ["ebs"])
+
+        get_unused_resources.assert_not_called()
+        self.assertEqual(report_paths, ["report.jsonl"])
+        self.assertCountEqual(
+            [call.args for call in sink.write.call_args_list],
+            [
+                ("ebs", "unused_ebs_volumes", {"Region": "us-east-1", "VolumeId": "vol-us-east-1"}),
+                ("ebs", "unused_ebs_volumes", {"Region": "eu-west-1", "VolumeId": "vol-eu-west-1"}),
+            ],
+        )
+
+
+class TestOrganizationCostManager(unittest.IsolatedAsyncioTestCase):
+    async def test_scans_every_account_with_its_own_session(self):
+        sessions = {"111111111111": MagicMock(name="session-1"), "222222222222": MagicMock(name="session-2")}
+        scanned = []
+
+        async def feed_service(cost_manager, service, queue, tags=None):
+            client_manager = cost_manager._resource_strategy[service]._client_manager
+            scanned.append((client_manager.account_id, client_manager.region_name, service))
+            self.assertIs(client_manager._session, sessions[client_manager.account_id])
+            await queue.put((service, "unused_ebs_volumes", {**tags, "VolumeId": f"vol-{client_manager.account_id}"}))
+
+        manager = OrganizationCostManager(list(sessions), "OptimizerReadOnly", regions=["us-east-1", "eu-west-1"])
+        manager._sessions.get_session = AsyncMock(side_effect=lambda account_id: sessions[account_id])
+
+        with patch.object(AwsCostManager, "feed_service", autospec=True, side_effect=feed_service):
+            unused_resources = await manager.get_unused_resources(["ebs"])
+
+        self.assertCountEqual(
+            scanned,
+            [
+                ("111111111111", "us-east-1", "ebs"),
+                ("111111111111", "eu-west-1", "ebs"),
+                ("222222222222", "us-east-1", "ebs"),
+                ("222222222222", "eu-west-1", "ebs"),
+            ],
+        )
+        volumes = unused_resources[0]["ebs"]["unused_ebs_volumes"]
+        self.assertCountEqual(
+            [(volume["Account"], volume["Region"], volume["VolumeId"]) for volume in volumes],
+            [
+                ("111111111111", "us-east-1", "vol-111111111111"),
+                ("111111111111", "eu-west-1", "vol-111111111111"),
+                ("222222222222", "us-east-1", "vol-222222222222"),
+                ("222222222222", "eu-west-1", "vol-222222222222"),
+            ],
+        )
+
+    async def test_inaccessible_account_is_reported(self):
+        manager = OrganizationCostManager(["111111111111"], "OptimizerReadOnly", regions=["us-east-1"])
+        manager._sessions.get_session = AsyncMock(side_effect=RuntimeError("AccessDenied"))
+
+        unused_resources = await manager.get_unused_resources(["ebs"])
+
+        self.assertEqual(
+            unused_resources, [{"sts": {"errors": [{"Account": "111111111111", "Error": "AccessDenied"}]}}]
+        )
+
+    async def test_findings_are_streamed_with_account_and_region(self):
+        """Streamed findings carry their account and region, and an inaccessible account streams an error"""
+        session = MagicMock(name="session")
+        manager = OrganizationCostManager(
+            ["111111111111", "222222222222"], "OptimizerReadOnly", regions=["us-east-1", "eu-west-1"]
+        )
+
+        async def get_session(account_id):
+            if account_id == "222222222222":
+                raise RuntimeError("AccessDenied")
+            return session
+
+        manager._sessions.get_session = AsyncMock(side_effect=get_session)
+
+        async def scan(handler):
+            yield "unused_ebs_volumes", Finding(
+                resource_id=f"vol-{handler.region_name}",
+                resource_type="AWS::EC2::Volume",
+                region=handler.region_name,
+                reason="Volume is not attached to any instance",
+            )
+
+        with patch.object(EbsResourceHandlers, "stream_under_utilized_resources", autospec=True, side_effect=scan):
+            findings = [finding async for finding in manager.stream_unused_resources(["ebs"])]
+
+        self.assertEqual(findings[0], ("sts", "errors", {"Account": "222222222222", "Error": "AccessDenied"}))
+        self.assertCountEqual(
+            [
+                (service, resource_type, record["Account"], record["Region"], record["ResourceId"])
+                for service, resource_type, record in findings[1:]
+            ],
+            [
+                ("ebs", "unused_ebs_volumes", "111111111111", "us-east-1", "vol-us-east-1"),
+                ("ebs", "unused_ebs_volumes", "111111111111", "eu-west-1", "vol-eu-west-1"),
+            ],
+        )
@@ -271,3 +271,70 @@ class TestExcelReportGenerator(unittest.TestCase):
         # Clean up
         if os.path.exists(report_path):
             os.unlink(report_path)
+
+
+class TestExcelReportLayout(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.output_path = os.path.join(self._directory.name, "report.xlsx")
+
+    def test_styles_and_widths(self):
+        """Header styles and column widths match the values written"""
+        unused_resources = [
+            {"ebs": {"unused_ebs_volumes": [{"VolumeId": "vol-0123456789abcdef0", "Size": 8}]}},
+            {"rds": {"errors": [{"Error": "Rate exceeded"}]}},
+        ]
+
+        ExcelReportGenerator().generate_report(unused_resources, region="us-east-1", output_path=self.output_path)
+
+        workbook = load_workbook(self.output_path)
+        summary_sheet = workbook["Summary"]
+        self.assertTrue(summary_sheet["A4"].font.bold)
+        self.assertEqual(summary_sheet["A4"].fill.start_color.rgb, "00366092")
+        # Errors are listed but not counted in the total
+        self.assertEqual([summary_sheet[f"A{row}"].value for row in (5, 6, 7)], ["EBS", "RDS", "TOTAL"])
+        self.assertEqual(summary_sheet["C7"].value, 1)
+
+        ebs_sheet = workbook["EBS"]
+        self.assertEqual(ebs_sheet["A3"].value, "Unused Ebs Volumes")
+        self.assertEqual(ebs_sheet["A4"].value, "Volumeid")
+        self.assertEqual(ebs_sheet["B5"].alignment.horizontal, "center")
+        # Column A is as wide as its longest value, the volume id, plus padding
+        self.assertEqual(ebs_sheet.column_dimensions["A"].width, len("vol-0123456789abcdef0") + 2)
+        workbook.close()
+
+    def test_large_report(self):
+        """Many thousands of rows are written, with long values capped at the maximum width"""
+        volumes = [{"VolumeId": f"vol-{idx:017d}", "Description": "x" * 80} for idx in range(20000)]
+
+        ExcelReportGenerator().generate_report(
+            [{"ebs": {"unused_ebs_volumes": volumes}}], region="us-east-1", output_path=self.output_path
+        )
+
+        workbook = load_workbook(self.output_path)
+        ebs_sheet = workbook["EBS"]
+        self.assertEqual(ebs_sheet.max_row, 4 + len(volumes))
+        self.assertEqual(ebs_sheet[f"A{ebs_sheet.max_row}"].value, volumes[-1]["VolumeId"])
+        self.assertEqual(ebs_sheet.column_dimensions["B"].width, 50)
+        workbook.close()
+
+    def test_columns_of_every_record_are_kept(self):
+        """Records of one type with different keys get the union of their columns, in first-seen order"""
+        errors = [
+            {"DBInstanceIdentifier": "db1", "Error": "Rate exceeded"},
+            {"DBClusterIdentifier": "cluster1", "Error": "Access Denied"},
+        ]
+
+        ExcelReportGenerator().generate_report(
+            [{"rds": {"errors": errors}}], region="us-east-1", output_path=self.output_path
+        )
+
+        workbook = load_workbook(self.output_path)
+        rds_sheet = workbook["RDS"]
+        self.assertEqual(
+            [cell.value for cell in rds_sheet[4]], ["Dbinstanceidentifier", "Error", "Dbclusteridentifier"]
+        )
+        self.assertEqual([cell.value for cell in rds_sheet[6]], [None, "Access Denied", "cluster1"])
+        self.assertEqual(rds_sheet.column_dimensions["C"].width, len("Dbclusteridentifier") + 2)
+        workbook.close()
@@ -0,0 +1,226 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from src.core.aws.metric_cache import MetricCache, to_epoch, from_epoch
+from src.core.aws.resource_handlers.cloudwatch import CloudWatch
+from src.models.cloudwatch import CloudWatchMetric
+from tests.aws.resource_handlers.test_cloudwatch_resource_handler import mock_client_manager
+
+
+class TestMetricCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = MetricCache(os.path.join(self.temp_dir.name, "nested", "metrics.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_epoch_round_trip(self):
+        """Naive datetimes are treated as UTC"""
+        naive = datetime(2025, 9, 10, 12, 0)
+        self.assertEqual(to_epoch(naive), to_epoch(naive.replace(tzinfo=timezone.utc)))
+        self.assertEqual(from_epoch(to_epoch(naive)), naive.replace(tzinfo=timezone.utc))
+
+    def test_key_ignores_dimension_order(self):
+        """Dimension order does not change the cache key, the statistic does"""
+        start_time = datetime(2025, 9, 10)
+        dimensions = [{"Name": "BucketName", "Value": "b"}, {"Name": "StorageType", "Value": "StandardStorage"}]
+        metric = CloudWatchMetric("AWS/S3", "BucketSizeBytes", dimensions, start_time, start_time)
+        reordered = CloudWatchMetric("AWS/S3", "BucketSizeBytes", dimensions[::-1], start_time, start_time)
+        other_stat = CloudWatchMetric(
+            "AWS/S3", "BucketSizeBytes", dimensions, start_time, start_time, statistics=["Sum"]
+        )
+
+        self.assertEqual(MetricCache.key(metric), MetricCache.key(reordered))
+        self.assertNotEqual(MetricCache.key(metric), MetricCache.key(other_stat))
+
+    def test_datapoints_and_coverage(self):
+        """Datapoints are returned newest first within the half-open range"""
+        self.assertIsNone(self.cache.get_coverage("k"))
+
+        self.cache.put_datapoints("k", [(100, 1.0), (200, 2.0), (300, 3.0)])
+        self.cache.put_datapoints("k", [(300, 4.0)])
+        self.cache.set_coverage("k", 100, 300)
+        self.cache.commit()
+
+        self.assertEqual(self.cache.get_coverage("k"), (100, 300))
+        self.assertEqual(self.cache.get_datapoints("k", 100, 300), [(200, 2.0), (100, 1.0)])
+        self.assertEqual(self.cache.get_datapoints("k", 0, 400), [(300, 4.0), (200, 2.0), (100, 1.0)])
+
+    def test_cached_datapoints_off_the_period_grid_are_skipped(self):
+        """With a period, only datapoints on the window's grid are read back"""
+        self.cache.put_datapoints("k", [(0, 1.0), (100, 2.0), (150, 3.0), (200, 4.0)])
+
+        self.assertEqual(self.cache.get_datapoints("k", 0, 300, period=100), [(200, 4.0), (100, 2.0), (0, 1.0)])
+
+    def test_writes_are_committed_in_batches(self):
+        """Series are committed every CLOUDWATCH_CACHE_COMMIT_INTERVAL updates, and the rest on close"""
+        path = os.path.join(self.temp_dir.name, "batched.sqlite3")
+        cache = MetricCache(path)
+        readers = []
+
+        def committed():
+            reader = MetricCache(path)
+            readers.append(reader)
+            return [reader.get_coverage(key) for key in ("a", "b", "c")]
+
+        with patch("src.core.aws.metric_cache.CLOUDWATCH_CACHE_COMMIT_INTERVAL", 2):
+            for key in ("a", "b", "c"):
+                cache.set_coverage(key, 0, 100)
+                cache.series_updated()
+                if key == "a":
+                    self.assertEqual(committed(), [None, None, None])
+
+        self.assertEqual(committed(), [(0, 100), (0, 100), None])
+        cache.close()
+        self.assertEqual(committed(), [(0, 100), (0, 100), (0, 100)])
+        for reader in readers:
+            reader.close()
+
+
+class TestCloudWatchWithMetricCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = MetricCache(os.path.join(self.temp_dir.name, "metrics.sqlite3"))
+        self.mock_cw_client = AsyncMock()
+        self.cloudwatch = CloudWatch("us-east-1", batch_window=0, cache=self.cache)
+        self.cloudwatch._client_manager = mock_client_manager(self.mock_cw_client)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def _metric(self, end_time: datetime):
+        return CloudWatchMetric(
+            namespace="AWS/RDS",
+            metric_name="DatabaseConnections",
+            dimensions=[{"Name": "DBInstanceIdentifier", "Value": "test-db"}],
+            start_time=end_time - timedelta(days=30),
+            end_time=end_time,
+            period=3600,
+        )
+
+    @staticmethod
+    def _response(*timestamps):
+        return {
+            "MetricDataResults": [
+                {"Id": "m1", "Timestamps": list(timestamps), "Values": [float(ts.hour) for ts in timestamps]}
+            ]
+        }
+
+    async def test_second_run_fetches_only_the_gap(self):
+        """A repeated scan asks CloudWatch only for the window after the cached range"""
+        first_end = datetime(2025, 9, 10, 12, 0)
+        second_end = first_end + timedelta(hours=2)
+        old_point = (first_end - timedelta(hours=5)).replace(tzinfo=timezone.utc)
+        new_point = (first_end + timedelta(hours=1)).replace(tzinfo=timezone.utc)
+        self.mock_cw_client.get_metric_data.side_effect = [self._response(old_point), self._response(new_point)]
+
+        first = await self.cloudwatch.get_metrics(self._metric(first_end))
+        second = await self.cloudwatch.get_metrics(self._metric(second_end))
+
+        calls = self.mock_cw_client.get_metric_data.call_args_list
+        self.assertEqual(calls[0][1]["StartTime"], first_end - timedelta(days=30))
+        self.assertEqual(calls[1][1]["StartTime"], first_end)
+        self.assertEqual([point["Timestamp"] for point in first], [old_point])
+        self.assertEqual([point["Timestamp"] for point in second], [new_point, old_point])
+        self.assertEqual(second[1]["Maximum"], float(old_point.hour))
+
+    async def test_window_older_than_cache_is_fetched_in_full(self):
+        """A window starting before the cached range is requested from CloudWatch again"""
+        end_time = datetime(2025, 9, 10, 12, 0)
+        self.mock_cw_client.get_metric_data.side_effect = [self._response(), self._response()]
+
+        await self.cloudwatch.get_metrics(self._metric(end_time))
+        await self.cloudwatch.get_metrics(self._metric(end_time - timedelta(days=1)))
+
+        calls = self.mock_cw_client.get_metric_data.call_args_list
+        self.assertEqual(calls[1][1]["StartTime"], end_time - timedelta(days=31))
+
+    async def test_accounts_do_not_share_cached_series(self):
+        """The same resource id in another account is fetched instead of read from the cache"""
+        end_time = datetime(2025, 9, 10, 12, 0)
+        self.mock_cw_client.get_metric_data.side_effect = [self._response(), self._response()]
+        other_account = CloudWatch("us-east-1", batch_window=0, cache=self.cache)
+        other_account._client_manager = mock_client_manager(self.mock_cw_client)
+        other_account._client_manager.get_cache_scope.return_value = "210987654321/us-east-1"
+
+        await self.cloudwatch.get_metrics(self._metric(end_time))
+        await other_account.get_metrics(self._metric(end_time))
+
+        self.assertEqual(self.mock_cw_client.get_metric_data.call_count, 2)
+
+    def _daily_metric(self, end_time: datetime):
+        return CloudWatchMetric(
+            namespace="AWS/S3",
+            metric_name="NumberOfRequests",
+            dimensions=[{"Name": "BucketName", "Value": "test-bucket"}],
+            start_time=end_time - timedelta(days=7),
+            end_time=end_time,
+            period=86400,
+            statistics=["Sum"],
+        )
+
+    @staticmethod
+    def _daily_response(start_time: datetime, days: int, value: float):
+        timestamps = [(start_time + timedelta(days=day)).replace(tzinfo=timezone.utc) for day in range(days)]
+        return {"MetricDataResults": [{"Id": "m1", "Timestamps": timestamps[::-1], "Values": [value] * days}]}
+
+    async def test_runs_hours_apart_reuse_the_cached_days(self):
+        """Windows are floored to the period grid, so a later run on the same day needs no request"""
+        first_end = datetime(2025, 9, 10, 12, 7)
+        midnight = datetime(2025, 9, 10)
+        self.mock_cw_client.get_metric_data.side_effect = [self._daily_response(midnight - timedelta(days=7), 7, 10.0)]
+
+        first = await self.cloudwatch.get_metric_series(self._daily_metric(first_end))
+        second = await self.cloudwatch.get_metric_series(self._daily_metric(first_end + timedelta(hours=3)))
+
+        calls = self.mock_cw_client.get_metric_data.call_args_list
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][1]["StartTime"], midnight - timedelta(days=7))
+        self.assertEqual(calls[0][1]["EndTime"], midnight)
+        self.assertEqual(first.sum(), 70.0)
+        self.assertEqual(second.sum(), 70.0)
+
+    async def test_next_day_fetches_only_the_new_day(self):
+        """A run a day and some minutes later asks only for the day completed since"""
+        first_end = datetime(2025, 9, 10, 12, 7)
+        midnight = datetime(2025, 9, 10)
+        self.mock_cw_client.get_metric_data.side_effect = [
+            self._daily_response(midnight - timedelta(days=7), 7, 10.0),
+            self._daily_response(midnight, 1, 30.0),
+        ]
+
+        await self.cloudwatch.get_metric_series(self._daily_metric(first_end))
+        second = await self.cloudwatch.get_metric_series(self._daily_metric(first_end + timedelta(days=1, minutes=7)))
+
+        calls = self.mock_cw_client.get_metric_data.call_args_list
+        self.assertEqual(calls[1][1]["StartTime"], midnight)
+        self.assertEqual(calls[1][1]["EndTime"], midnight + timedelta(days=1))
+        self.assertEqual(len(second), 7)
+        self.assertEqual(second.sum(), 6 * 10.0 + 30.0)
+
+    async def test_last_partial_period_is_fetched_again(self):
+        """A cached range ending inside a period is cut back to that period, which is refetched and overwritten"""
+        first_end = datetime(2025, 9, 10, 12, 7)
+        midnight = datetime(2025, 9, 10)
+        self.mock_cw_client.get_metric_data.side_effect = [
+            self._daily_response(midnight - timedelta(days=7), 7, 10.0),
+            self._daily_response(midnight - timedelta(days=1), 2, 30.0),
+        ]
+
+        await self.cloudwatch.get_metric_series(self._daily_metric(first_end))
+        # As if the first run had only settled until shortly before its end, inside the last daily bucket
+        key = MetricCache.key(self._daily_metric(first_end), await self.cloudwatch._client_manager.get_cache_scope())
+        covered_from, _ = self.cache.get_coverage(key)
+        self.cache.set_coverage(key, covered_from, to_epoch(midnight) - 600)
+        second = await self.cloudwatch.get_metric_series(self._daily_metric(first_end + timedelta(days=1)))
+
+        calls = self.mock_cw_client.get_metric_data.call_args_list
+        self.assertEqual(calls[1][1]["StartTime"], midnight - timedelta(days=1))
+        self.assertEqual(len(second), 7)
+        self.assertEqual(second.sum(), 5 * 10.0 + 2 * 30.0)
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.core.aws.organization import AssumedRoleSessions, load_accounts
+
+
+def assume_role_response(access_key: str, expires_in: timedelta = timedelta(hours=1)):
+    return {
+        "Credentials": {
+            "AccessKeyId": access_key,
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": datetime.now(timezone.utc) + expires_in,
+        }
+    }
+
+
+def mock_sts_manager(sts):
+    client_manager = MagicMock()
+    client_manager.__aenter__ = AsyncMock(return_value=client_manager)
+    client_manager.__aexit__ = AsyncMock(return_value=None)
+    client_manager.get_client.return_value.__aenter__ = AsyncMock(return_value=sts)
+    client_manager.get_client.return_value.__aexit__ = AsyncMock(return_value=None)
+    return client_manager
+
+
+class TestLoadAccounts(unittest.TestCase):
+    def test_skips_blank_lines_and_comments(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "accounts.txt")
+            with open(path, "w") as accounts_file:
+                accounts_file.write("# production\n111111111111\n\n222222222222  # data\n")
+
+            self.assertEqual(load_accounts(path), ["111111111111", "222222222222"])
+
+
+class TestAssumedRoleSessions(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.sts = AsyncMock()
+        patcher = patch("src.core.aws.organization.AsyncClientManager", return_value=mock_sts_manager(self.sts))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_role_is_assumed_once_per_account(self):
+        self.sts.assume_role.side_effect = lambda **kwargs: assume_role_response("AKIA1")
+        sessions = AssumedRoleSessions("OptimizerReadOnly", external_id="ext")
+
+        first = await sessions.get_session("111111111111")
+        second = await sessions.get_session("111111111111")
+
+        self.assertIs(first, second)
+        self.sts.assume_role.assert_awaited_once_with(
+            RoleArn="arn:aws:iam::111111111111:role/OptimizerReadOnly",
+            RoleSessionName="cloud-cost-optimizer",
+            DurationSeconds=3600,
+            ExternalId="ext",
+        )
+
+    async def test_credentials_refresh_before_expiry(self):
+        # The first credentials are inside the refresh window, so reading them assumes the role again
+        self.sts.assume_role.side_effect = [
+            assume_role_response("AKIA1", expires_in=timedelta(minutes=5)),
+            assume_role_response("AKIA2"),
+        ]
+        sessions = AssumedRoleSessions("OptimizerReadOnly")
+
+        session = await sessions.get_session("111111111111")
+        credentials = await session.get_credentials()
+        frozen = await credentials.get_frozen_credentials()
+
+        self.assertEqual(frozen.access_key, "AKIA2")
+        self.assertEqual(self.sts.assume_role.await_count, 2)
@@ -0,0 +1,42 @@
+import unittest
+
+from src.models.finding import Finding, to_record
+
+
+class TestFinding(unittest.TestCase):
+    def setUp(self):
+        self.finding = Finding(
+            resource_id="lb-1",
+            resource_type="AWS::ElasticLoadBalancing::LoadBalancer",
+            region="us-east-1",
+            reason="No requests in the last 7 days",
+            metrics={"RequestCount": 0.0},
+            attributes={"Scheme": "internal"},
+        )
+
+    def test_to_dict_flattens_into_a_report_row(self):
+        """Fixed columns come first, then attributes, metrics and the cost estimate"""
+        self.assertEqual(
+            list(self.finding.to_dict().items()),
+            [
+                ("ResourceId", "lb-1"),
+                ("ResourceType", "AWS::ElasticLoadBalancing::LoadBalancer"),
+                ("Region", "us-east-1"),
+                ("Reason", "No requests in the last 7 days"),
+                ("Scheme", "internal"),
+                ("RequestCount", 0.0),
+                ("EstimatedMonthlyCost", None),
+            ],
+        )
+
+    def test_slots_instead_of_instance_dict(self):
+        """Findings carry no per-instance __dict__"""
+        self.assertFalse(hasattr(self.finding, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.finding.description = "not a field"
+
+    def test_to_record_passes_plain_records_through(self):
+        """Error entries are already report rows"""
+        error = {"DBInstanceIdentifier": "db1", "Error": "Rate exceeded"}
+        self.assertIs(to_record(error), error)
+        self.assertEqual(to_record(self.finding)["ResourceId"], "lb-1")
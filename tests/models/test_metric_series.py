@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from src.models.cloudwatch import MetricSeries
+
+
+class TestMetricSeries(unittest.TestCase):
+    def setUp(self):
+        self.series = MetricSeries(
+            np.array([300, 100, 200], dtype=np.int64), np.array([5.0, 1.0, 3.0], dtype=np.float64)
+        )
+        self.empty = MetricSeries.empty()
+
+    def test_aggregations(self):
+        """Aggregations are computed over every datapoint"""
+        self.assertEqual(self.series.max(), 5.0)
+        self.assertEqual(self.series.sum(), 9.0)
+        self.assertEqual(self.series.mean(), 3.0)
+        self.assertEqual(self.series.percentile(50), 3.0)
+        self.assertAlmostEqual(self.series.fraction_above(2.0), 2 / 3)
+        self.assertEqual(self.series.latest(), 5.0)
+
+    def test_empty_series_defaults(self):
+        """An empty series returns the defaults instead of raising"""
+        self.assertEqual(len(self.empty), 0)
+        self.assertEqual(self.empty.max(), 0.0)
+        self.assertEqual(self.empty.max(default=-1.0), -1.0)
+        self.assertEqual(self.empty.sum(), 0.0)
+        self.assertEqual(self.empty.mean(), 0.0)
+        self.assertEqual(self.empty.percentile(99), 0.0)
+        self.assertEqual(self.empty.fraction_above(0), 0.0)
+        self.assertIsNone(self.empty.latest())
+
+    def test_concat(self):
+        """Chunks are concatenated in order and keep their dtypes"""
+        other = MetricSeries(np.array([400], dtype=np.int64), np.array([0.5]))
+
+        combined = MetricSeries.concat([self.series, other])
+
+        self.assertEqual(combined.timestamps.tolist(), [300, 100, 200, 400])
+        self.assertEqual(combined.values.dtype, np.float64)
+        self.assertEqual(combined.latest(), 0.5)
+        self.assertIs(MetricSeries.concat([self.series]), self.series)
+        self.assertEqual(len(MetricSeries.concat([], unit="Bytes")), 0)
@@ -0,0 +1,140 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.core.utils.aws_utils import AsyncClientManager, ClientPool, close_client_pool, get_client_pool
+from src.core.utils.rate_limiter import RateLimitedClient
+
+
+def mock_session():
+    """aioboto3 session whose client() context managers track how often they are opened and closed"""
+    session = MagicMock()
+    session.opened = []
+    session.closed = []
+
+    def client(service_name, region_name, config):
+        client_context = MagicMock()
+        opened_client = MagicMock(name=f"{service_name}-{region_name}")
+
+        async def aenter(*args):
+            session.opened.append((service_name, region_name))
+            return opened_client
+
+        async def aexit(*args):
+            session.closed.append((service_name, region_name))
+
+        client_context.__aenter__ = AsyncMock(side_effect=aenter)
+        client_context.__aexit__ = AsyncMock(side_effect=aexit)
+        return client_context
+
+    session.client = MagicMock(side_effect=client)
+    return session
+
+
+class TestClientPool(unittest.IsolatedAsyncioTestCase):
+    async def test_clients_are_opened_once_per_service_and_region(self):
+        session = mock_session()
+        client_pool = ClientPool(max_pool_connections=10)
+
+        first = await client_pool.get_client("cloudwatch", "us-east-1", session)
+        second = await client_pool.get_client("cloudwatch", "us-east-1", session)
+        await client_pool.get_client("cloudwatch", "eu-west-1", session)
+        await client_pool.get_client("rds", "us-east-1", session)
+
+        self.assertIs(first, second)
+        self.assertEqual(
+            session.opened, [("cloudwatch", "us-east-1"), ("cloudwatch", "eu-west-1"), ("rds", "us-east-1")]
+        )
+
+    async def test_sessions_do_not_share_clients(self):
+        client_pool = ClientPool(max_pool_connections=10)
+        account_a, account_b = mock_session(), mock_session()
+
+        client_a = await client_pool.get_client("ec2", "us-east-1", account_a)
+        client_b = await client_pool.get_client("ec2", "us-east-1", account_b)
+
+        self.assertIsNot(client_a, client_b)
+
+    async def test_client_config(self):
+        session = mock_session()
+        client_pool = ClientPool(max_pool_connections=25)
+
+        await client_pool.get_client("s3", "us-east-1", session)
+
+        config = session.client.call_args.kwargs["config"]
+        self.assertEqual(config.max_pool_connections, 25)
+        self.assertTrue(config.tcp_keepalive)
+        self.assertEqual(config.retries, {"total_max_attempts": 1})
+
+    async def test_close_closes_every_client(self):
+        session = mock_session()
+        client_pool = ClientPool(max_pool_connections=10)
+        await client_pool.get_client("ec2", "us-east-1", session)
+        await client_pool.get_client("elb", "us-east-1", session)
+
+        await client_pool.close()
+
+        self.assertCountEqual(session.closed, session.opened)
+
+
+class TestAsyncClientManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await close_client_pool()
+
+    async def test_managers_share_pooled_clients(self):
+        session = mock_session()
+
+        async with AsyncClientManager("us-east-1", session) as manager:
+            async with manager.get_client("rds") as rds:
+                self.assertIsInstance(rds, RateLimitedClient)
+        async with AsyncClientManager("us-east-1", session) as manager:
+            async with manager.get_client("rds"):
+                pass
+
+        self.assertEqual(session.opened, [("rds", "us-east-1")])
+        self.assertEqual(session.closed, [])
+
+    async def test_regional_managers_share_the_session(self):
+        session = mock_session()
+        manager = AsyncClientManager("us-east-1", session, account_id="111111111111")
+
+        regional = manager.for_region("eu-west-1")
+        async with regional.get_client("cloudwatch"):
+            pass
+
+        self.assertIs(manager.for_region("us-east-1"), manager)
+        self.assertEqual(regional.scope, "111111111111/eu-west-1")
+        self.assertEqual(session.opened, [("cloudwatch", "eu-west-1")])
+
+    async def test_account_is_looked_up_once_per_session(self):
+        session = mock_session()
+        manager = AsyncClientManager("us-east-1", session)
+        lookup = AsyncMock(return_value="222222222222")
+
+        with patch.object(AsyncClientManager, "_get_caller_account_id", lookup):
+            scopes = await asyncio.gather(manager.get_cache_scope(), manager.for_region("eu-west-1").get_cache_scope())
+
+        self.assertEqual(scopes, ["222222222222/us-east-1", "222222222222/eu-west-1"])
+        lookup.assert_awaited_once()
+
+    async def test_given_account_skips_the_lookup(self):
+        manager = AsyncClientManager("us-east-1", mock_session(), account_id="111111111111")
+        lookup = AsyncMock()
+
+        with patch.object(AsyncClientManager, "_get_caller_account_id", lookup):
+            self.assertEqual(await manager.get_cache_scope(), "111111111111/us-east-1")
+
+        lookup.assert_not_awaited()
+
+    async def test_pool_is_shared_within_an_event_loop(self):
+        self.assertIs(get_client_pool(), get_client_pool())
+
+    async def test_default_session_is_created_once(self):
+        with patch("src.core.utils.aws_utils.aioboto3.Session", return_value=mock_session()) as session_cls:
+            async with AsyncClientManager("us-east-1") as manager:
+                async with manager.get_client("ec2"):
+                    pass
+                async with manager.get_client("rds"):
+                    pass
+
+        session_cls.assert_called_once()
@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+
+from src.core.utils.fair_scheduler import FairScheduler
+
+
+class TestFairScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_takes_turns_between_tenants(self):
+        started = []
+
+        def job(tenant, idx):
+            async def run():
+                started.append(tenant)
+                await asyncio.sleep(0)
+                return f"{tenant}-{idx}"
+
+            return run
+
+        jobs = {
+            "huge": [job("huge", idx) for idx in range(6)],
+            "small": [job("small", idx) for idx in range(2)],
+            "tiny": [job("tiny", 0)],
+        }
+
+        results = await FairScheduler(workers=1).run(jobs)
+
+        # The small accounts finish within the first rounds instead of after the huge one
+        self.assertEqual(started[:5], ["huge", "small", "tiny", "huge", "small"])
+        self.assertEqual(results["huge"], [f"huge-{idx}" for idx in range(6)])
+        self.assertEqual(results["tiny"], ["tiny-0"])
+
+    async def test_limits_jobs_per_tenant(self):
+        running = {"a": 0, "b": 0}
+        max_running = {"a": 0, "b": 0}
+
+        def job(tenant):
+            async def run():
+                running[tenant] += 1
+                max_running[tenant] = max(max_running[tenant], running[tenant])
+                await asyncio.sleep(0.001)
+                running[tenant] -= 1
+
+            return run
+
+        jobs = {"a": [job("a") for _ in range(10)], "b": [job("b") for _ in range(2)]}
+
+        await FairScheduler(workers=4, max_per_tenant=2).run(jobs)
+
+        self.assertEqual(max_running, {"a": 2, "b": 2})
+
+    async def test_failures_are_returned_in_place(self):
+        error = RuntimeError("boom")
+
+        async def fail():
+            raise error
+
+        async def succeed():
+            return "ok"
+
+        results = await FairScheduler(workers=2).run({"a": [fail, succeed], "b": []})
+
+        self.assertEqual(results, {"a": [error, "ok"], "b": []})
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+from src.core.utils.pagination import paginate
+
+
+class TestPaginate(unittest.IsolatedAsyncioTestCase):
+    async def test_follows_tokens_with_the_largest_page_size(self):
+        client = AsyncMock()
+        client.describe_load_balancers.side_effect = [
+            {"LoadBalancerDescriptions": [{"LoadBalancerName": "lb-1"}], "NextMarker": "page-2"},
+            {"LoadBalancerDescriptions": [{"LoadBalancerName": "lb-2"}]},
+        ]
+
+        pages = [page async for page in paginate(client, "elb", "describe_load_balancers")]
+
+        self.assertEqual(pages, [[{"LoadBalancerName": "lb-1"}], [{"LoadBalancerName": "lb-2"}]])
+        self.assertEqual(
+            [call.kwargs for call in client.describe_load_balancers.call_args_list],
+            [{"PageSize": 400}, {"PageSize": 400, "Marker": "page-2"}],
+        )
+
+    async def test_keeps_the_request_arguments_on_every_page(self):
+        client = AsyncMock()
+        client.describe_volumes.side_effect = [{"Volumes": [], "NextToken": "next"}, {"Volumes": []}]
+        filters = [{"Name": "status", "Values": ["available"]}]
+
+        pages = [page async for page in paginate(client, "ec2", "describe_volumes", Filters=filters, MaxResults=5)]
+
+        self.assertEqual(pages, [[], []])
+        self.assertEqual(
+            client.describe_volumes.call_args.kwargs, {"Filters": filters, "MaxResults": 5, "NextToken": "next"}
+        )
+
+    async def test_truncation_flag_and_compound_markers(self):
+        client = AsyncMock()
+        client.list_object_versions.side_effect = [
+            {"Versions": [{"Key": "a"}], "IsTruncated": True, "NextKeyMarker": "a", "NextVersionIdMarker": "v1"},
+            {"Versions": [{"Key": "b"}], "IsTruncated": False, "NextKeyMarker": "b"},
+        ]
+
+        pages = [page async for page in paginate(client, "s3", "list_object_versions", Bucket="my-bucket")]
+
+        self.assertEqual(pages, [[{"Key": "a"}], [{"Key": "b"}]])
+        self.assertEqual(
+            client.list_object_versions.call_args.kwargs,
+            {"Bucket": "my-bucket", "MaxKeys": 1000, "KeyMarker": "a", "VersionIdMarker": "v1"},
+        )
+
+    async def test_requests_the_next_page_before_the_current_one_is_processed(self):
+        requested = []
+        second_page = asyncio.Event()
+
+        async def describe_db_instances(**kwargs):
+            requested.append(kwargs.get("Marker"))
+            if kwargs.get("Marker"):
+                second_page.set()
+                return {"DBInstances": [{"DBInstanceIdentifier": "db2"}]}
+            return {"DBInstances": [{"DBInstanceIdentifier": "db1"}], "Marker": "page-2"}
+
+        client = AsyncMock()
+        client.describe_db_instances.side_effect = describe_db_instances
+
+        pages = paginate(client, "rds", "describe_db_instances")
+        await pages.__anext__()
+        # The second page downloads while the caller is still working on the first
+        await asyncio.wait_for(second_page.wait(), 1)
+        self.assertEqual(requested, [None, "page-2"])
+        await pages.aclose()
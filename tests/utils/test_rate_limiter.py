@@ -0,0 +1,155 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from botocore.exceptions import ClientError, ConnectTimeoutError
+
+from src.core.utils.rate_limiter import AdaptiveRateLimiter, AdaptiveTokenBucket, RateLimitedClient
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "GetMetricData")
+
+
+class TestAdaptiveTokenBucket(unittest.TestCase):
+    def test_throttle_halves_rate_down_to_minimum(self):
+        bucket = AdaptiveTokenBucket(8, min_rate=1)
+
+        bucket.on_throttle()
+        self.assertEqual(bucket.rate, 4)
+
+        for _ in range(10):
+            bucket.on_throttle()
+        self.assertEqual(bucket.rate, 1)
+
+    def test_success_recovers_rate_up_to_maximum(self):
+        bucket = AdaptiveTokenBucket(2, increase=0.5)
+        bucket.on_throttle()
+
+        bucket.on_success()
+        self.assertEqual(bucket.rate, 1.5)
+
+        for _ in range(10):
+            bucket.on_success()
+        self.assertEqual(bucket.rate, 2)
+
+    def test_success_restores_burst_capacity(self):
+        """A throttle shrinks the burst, and recovering the rate grows it back"""
+        bucket = AdaptiveTokenBucket(8, increase=1)
+        bucket.on_throttle()
+        self.assertEqual(bucket._capacity, 4)
+
+        for _ in range(4):
+            bucket.on_success()
+        self.assertEqual(bucket._capacity, 8)
+
+
+class TestAdaptiveRateLimiter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        sleep_patcher = patch("src.core.utils.rate_limiter.asyncio.sleep", new=AsyncMock())
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def test_most_specific_rate_wins(self):
+        limiter = AdaptiveRateLimiter({"cloudwatch": 5, "cloudwatch.get_metric_data": 20}, default_rate=1)
+
+        self.assertEqual(limiter.get_bucket("cloudwatch", "get_metric_data").rate, 20)
+        self.assertEqual(limiter.get_bucket("cloudwatch", "list_metrics").rate, 5)
+        self.assertEqual(limiter.get_bucket("rds", "describe_db_instances").rate, 1)
+
+    def test_scopes_have_separate_buckets(self):
+        limiter = AdaptiveRateLimiter({}, default_rate=10)
+
+        us_east = limiter.get_bucket("cloudwatch", "get_metric_data", "us-east-1")
+        eu_west = limiter.get_bucket("cloudwatch", "get_metric_data", "eu-west-1")
+        us_east.on_throttle()
+
+        self.assertIsNot(us_east, eu_west)
+        self.assertEqual(eu_west.rate, 10)
+
+    async def test_retries_throttling_and_adapts_rate(self):
+        limiter = AdaptiveRateLimiter({}, default_rate=100, max_attempts=3)
+        api_call = AsyncMock(side_effect=[client_error("Throttling"), client_error("Throttling"), "ok"])
+
+        result = await limiter.call("cloudwatch", "get_metric_data", api_call, Namespace="AWS/RDS")
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(api_call.call_count, 3)
+        api_call.assert_called_with(Namespace="AWS/RDS")
+        # Two halvings, then one additive step back up
+        self.assertAlmostEqual(limiter.get_bucket("cloudwatch", "get_metric_data").rate, 25.1)
+
+    async def test_backoff_is_jittered_and_capped(self):
+        limiter = AdaptiveRateLimiter({}, default_rate=100, max_attempts=4, base_delay=1, max_delay=3)
+        api_call = AsyncMock(side_effect=[client_error("SlowDown")] * 3 + ["ok"])
+
+        with patch("src.core.utils.rate_limiter.random.uniform", side_effect=lambda low, high: high) as uniform:
+            await limiter.call("s3", "list_objects_v2", api_call)
+
+        self.assertEqual([call.args for call in uniform.call_args_list], [(0, 2), (0, 3), (0, 3)])
+
+    async def test_gives_up_after_max_attempts(self):
+        limiter = AdaptiveRateLimiter({}, default_rate=100, max_attempts=2)
+        api_call = AsyncMock(side_effect=client_error("ThrottlingException"))
+
+        with self.assertRaises(ClientError):
+            await limiter.call("rds", "describe_db_instances", api_call)
+
+        self.assertEqual(api_call.call_count, 2)
+
+    async def test_connect_timeouts_and_server_errors_are_retried(self):
+        """Connection timeouts and 5xx responses are retried even without a known error code"""
+        limiter = AdaptiveRateLimiter({}, default_rate=100)
+        server_error = ClientError(
+            {"Error": {"Code": "UnknownError"}, "ResponseMetadata": {"HTTPStatusCode": 503}}, "ListBuckets"
+        )
+        api_call = AsyncMock(
+            side_effect=[ConnectTimeoutError(endpoint_url="https://s3.amazonaws.com"), server_error, "ok"]
+        )
+
+        self.assertEqual(await limiter.call("s3", "list_buckets", api_call), "ok")
+        self.assertEqual(api_call.call_count, 3)
+
+    async def test_non_retryable_errors_are_raised_immediately(self):
+        limiter = AdaptiveRateLimiter({}, default_rate=100)
+        api_call = AsyncMock(side_effect=client_error("AccessDenied"))
+
+        with self.assertRaises(ClientError):
+            await limiter.call("rds", "describe_db_instances", api_call)
+
+        api_call.assert_called_once()
+        self.mock_sleep.assert_not_called()
+
+
+class TestTokenBucketPacing(unittest.IsolatedAsyncioTestCase):
+    async def test_calls_beyond_burst_wait_for_tokens(self):
+        bucket = AdaptiveTokenBucket(50)
+        loop = asyncio.get_running_loop()
+
+        started = loop.time()
+        await asyncio.gather(*(bucket.acquire() for _ in range(55)))
+
+        # 50 tokens are available up front, the remaining 5 refill at 50 per second
+        self.assertGreaterEqual(loop.time() - started, 0.08)
+
+
+class TestRateLimitedClient(unittest.IsolatedAsyncioTestCase):
+    async def test_api_calls_go_through_limiter(self):
+        client = MagicMock()
+        client.describe_volumes = AsyncMock(return_value={"Volumes": []})
+        limiter = AdaptiveRateLimiter({}, default_rate=100)
+        limiter.call = AsyncMock(wraps=limiter.call)
+
+        result = await RateLimitedClient(client, "ec2", limiter, scope="us-east-1").describe_volumes(MaxResults=10)
+
+        self.assertEqual(result, {"Volumes": []})
+        limiter.call.assert_awaited_once_with(
+            "ec2", "describe_volumes", client.describe_volumes, MaxResults=10, scope="us-east-1"
+        )
+
+    def test_sync_attributes_pass_through(self):
+        client = MagicMock()
+        proxy = RateLimitedClient(client, "s3", AdaptiveRateLimiter({}, default_rate=1))
+
+        self.assertIs(proxy.get_paginator, client.get_paginator)
+        self.assertIs(proxy.meta, client.meta)
@@ -0,0 +1,212 @@
+import csv
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+from src.core.utils.report_sinks import (
+    CsvReportSink,
+    ExcelReportSink,
+    JsonlReportSink,
+    ParquetReportSink,
+    RecordSpool,
+    close_sinks,
+    create_report_sink,
+    create_report_sinks,
+    shutdown_report_executor,
+)
+from src.models.finding import Finding
+
+
+class TestRecordSpool(unittest.TestCase):
+    def test_reads_back_records_in_order(self):
+        spool = RecordSpool()
+        spool.append({"VolumeId": "vol-1", "Size": 8})
+        spool.append({"VolumeId": "vol-2", "CreateTime": datetime(2024, 1, 1)})
+
+        self.assertEqual(len(spool), 2)
+        self.assertEqual(
+            list(spool), [{"VolumeId": "vol-1", "Size": 8}, {"VolumeId": "vol-2", "CreateTime": "2024-01-01 00:00:00"}]
+        )
+        # Iterating again starts from the beginning
+        self.assertEqual(next(iter(spool)), {"VolumeId": "vol-1", "Size": 8})
+        spool.close()
+
+    def test_pickled_spool_reads_the_same_file(self):
+        spool = RecordSpool()
+        spool.append({"VolumeId": "vol-1"})
+
+        copy = pickle.loads(pickle.dumps(spool))
+        self.assertEqual(len(copy), 1)
+        self.assertEqual(list(copy), [{"VolumeId": "vol-1"}])
+        copy.close()
+        spool.close()
+
+
+class TestReportSinks(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+
+    def test_excel_sink_renders_spooled_findings(self):
+        output_path = os.path.join(self._directory.name, "report.xlsx")
+        sink = ExcelReportSink("us-east-1", output_path)
+
+        sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-1", "Size": 8})
+        sink.write("lb", "no_targets_lb", {"LoadBalancerName": "lb-1"})
+        sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-2", "Size": 20})
+
+        self.assertEqual(sink.close(), output_path)
+        workbook = load_workbook(output_path)
+        self.assertEqual(workbook.sheetnames, ["Summary", "EBS", "LB"])
+        self.assertEqual(workbook["EBS"]["A5"].value, "vol-1")
+        self.assertEqual(workbook["EBS"]["A6"].value, "vol-2")
+
+    def test_csv_sink_writes_one_file_per_resource_type(self):
+        sink = CsvReportSink("us-east-1", self._directory.name)
+
+        sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-1", "Tags": [{"Key": "team"}]})
+        sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-2", "Iops": 3000})
+        sink.write("rds", "errors", {"Error": "Rate exceeded"})
+
+        self.assertEqual(sink.close(), self._directory.name)
+        with open(os.path.join(self._directory.name, "ebs_unused_ebs_volumes.csv"), newline="") as csv_file:
+            rows = list(csv.reader(csv_file))
+        self.assertEqual(
+            rows,
+            [
+                ["VolumeId", "Tags", "Extra"],
+                ["vol-1", '[{"Key": "team"}]', ""],
+                ["vol-2", "", '{"Iops": 3000}'],
+            ],
+        )
+        self.assertTrue(os.path.exists(os.path.join(self._directory.name, "rds_errors.csv")))
+        with open(os.path.join(self._directory.name, "summary.csv"), newline="") as csv_file:
+            self.assertEqual(
+                list(csv.reader(csv_file)),
+                [
+                    ["Service", "Resource Type", "Count"],
+                    ["ebs", "unused_ebs_volumes", "2"],
+                    ["rds", "errors", "1"],
+                    ["TOTAL", "", "2"],
+                ],
+            )
+
+    def test_jsonl_sink_writes_findings_as_they_arrive(self):
+        output_path = os.path.join(self._directory.name, "report.jsonl")
+        sink = JsonlReportSink("us-east-1", output_path)
+
+        sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-1"})
+        with open(output_path) as jsonl_file:
+            # Visible before the sink is closed
+            self.assertEqual(
+                json.loads(jsonl_file.readline()),
+                {"service": "ebs", "resource_type": "unused_ebs_volumes", "resource": {"VolumeId": "vol-1"}},
+            )
+
+        self.assertEqual(sink.close(), output_path)
+        with open(os.path.join(self._directory.name, "report.summary.json")) as summary_file:
+            self.assertEqual(
+                json.load(summary_file),
+                {"resources": [{"service": "ebs", "resource_type": "unused_ebs_volumes", "count": 1}], "total": 1},
+            )
+
+    def test_parquet_sink_infers_a_schema_per_resource_type(self):
+        output_path = os.path.join(self._directory.name, "report.parquet")
+        sink = ParquetReportSink("us-east-1", output_path)
+        create_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-1", "Size": 8, "CreateTime": create_time})
+        sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-2", "Size": "unknown", "Tags": [{"Key": "team"}]})
+
+        report_directory = os.path.join(self._directory.name, "report")
+        self.assertEqual(sink.close(), report_directory)
+        table = pq.read_table(os.path.join(report_directory, "ebs_unused_ebs_volumes.parquet"))
+        self.assertEqual(table.schema.names, ["VolumeId", "Size", "CreateTime", "Tags", "Extra"])
+        self.assertEqual(str(table.schema.field("Size").type), "int64")
+        self.assertEqual(
+            table.to_pylist(),
+            [
+                {"VolumeId": "vol-1", "Size": 8, "CreateTime": create_time, "Tags": None, "Extra": None},
+                {
+                    "VolumeId": "vol-2",
+                    "Size": None,
+                    "CreateTime": None,
+                    "Tags": '[{"Key": "team"}]',
+                    "Extra": '{"Size": "unknown"}',
+                },
+            ],
+        )
+        self.assertEqual(
+            pq.read_table(os.path.join(report_directory, "summary.parquet")).to_pylist(),
+            [{"service": "ebs", "resource_type": "unused_ebs_volumes", "count": 2}],
+        )
+
+    def test_findings_are_written_as_flat_records(self):
+        output_path = os.path.join(self._directory.name, "report.jsonl")
+        sink = JsonlReportSink("us-east-1", output_path)
+
+        sink.write(
+            "ebs",
+            "unused_ebs_volumes",
+            Finding("vol-1", "AWS::EC2::Volume", "us-east-1", "Volume is not attached", attributes={"Size": 8}),
+        )
+        sink.close()
+
+        with open(output_path) as jsonl_file:
+            self.assertEqual(
+                json.loads(jsonl_file.readline())["resource"],
+                {
+                    "ResourceId": "vol-1",
+                    "ResourceType": "AWS::EC2::Volume",
+                    "Region": "us-east-1",
+                    "Reason": "Volume is not attached",
+                    "Size": 8,
+                    "EstimatedMonthlyCost": None,
+                },
+            )
+
+    def test_create_report_sink_picks_the_format_from_the_extension(self):
+        for extension, sink_class in [
+            ("xlsx", ExcelReportSink),
+            ("csv", CsvReportSink),
+            ("jsonl", JsonlReportSink),
+            ("parquet", ParquetReportSink),
+        ]:
+            sink = create_report_sink("us-east-1", os.path.join(self._directory.name, f"report.{extension}"))
+            self.assertIsInstance(sink, sink_class)
+            sink.close()
+
+        with self.assertRaises(ValueError):
+            create_report_sink("us-east-1", os.path.join(self._directory.name, "report.pdf"))
+
+    def test_create_report_sinks_rejects_unknown_formats(self):
+        with self.assertRaises(ValueError):
+            create_report_sinks(["xlsx", "pdf"], "us-east-1")
+
+        self.assertIsInstance(create_report_sinks(["xlsx"], "us-east-1")[0], ExcelReportSink)
+
+
+class TestCloseSinks(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.addCleanup(shutdown_report_executor)
+
+    async def test_renders_reports_off_the_event_loop(self):
+        excel_paths = [os.path.join(self._directory.name, f"report-{index}.xlsx") for index in range(2)]
+        jsonl_path = os.path.join(self._directory.name, "report.jsonl")
+        sinks = [ExcelReportSink("us-east-1", path) for path in excel_paths] + [
+            JsonlReportSink("us-east-1", jsonl_path)
+        ]
+        for sink in sinks:
+            sink.write("ebs", "unused_ebs_volumes", {"VolumeId": "vol-1", "Size": 8})
+
+        self.assertEqual(await close_sinks(sinks), excel_paths + [jsonl_path])
+        for path in excel_paths:
+            self.assertEqual(load_workbook(path)["EBS"]["A5"].value, "vol-1")